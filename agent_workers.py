@@ -1,24 +1,34 @@
+import asyncio
+import contextlib
 import os
-import sys
 import io
-import pandas as pd
-import vertexai
-from vertexai.generative_models import (
-    GenerativeModel,
-    Tool,
-    FunctionDeclaration,
-    SafetySetting,
-    HarmCategory,
-    HarmBlockThreshold,
-    Part
-)
+import threading
+import time
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import logging
 
+from llm_cache import cached_generate, cached_generate_async, cached_generate_stream, merge_chunks, response_text
+from dataset_store import get_store, active_dataset, active_dataset_id, NO_DATASET
+from analytics_tools import ANALYTICS_FUNCTIONS, ANALYTICS_SCHEMAS
+from sandbox_pool import get_pool, POOL_SIZE
+from observability import span
+from model_registry import get_model
+from model_tiering import get_policy, estimate_tokens
+from context_budget import bound_result, compact_history
+
 # --- CONFIGURATION ---
 load_dotenv()
 logger = logging.getLogger("Workers")
 MODEL_WORKER = "gemini-2.5-flash"
+MAX_TOOL_TURNS = int(os.getenv("WORKER_MAX_TOOL_TURNS", "8"))         # Model turns that may call tools
+TOOL_TIME_BUDGET = float(os.getenv("WORKER_TIME_BUDGET", "120"))     # Seconds per run before wrap-up
+
+# Tools requested in the same model turn run side by side
+_TOOL_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="boardroom-tool")
+_INPROCESS_LOCK = threading.Lock()  # Serializes the SANDBOX_WORKERS=0 fallback's stdout capture
 
 # ==============================================================================
 # 🛠️ ADVANCED TOOLS (High-Fidelity Simulation)
@@ -26,111 +36,429 @@ MODEL_WORKER = "gemini-2.5-flash"
 
 def execute_pandas_analysis(python_code: str) -> str:
     """
-    Executes Python code on the financials CSV.
-    Adapts to Cloud Run /tmp paths automatically.
+    Executes Python code on the caller's dataset.
+    The dataset comes from the dataset store (handle set by WorkerAgent.run);
+    without one the tool returns an error rather than guessing a file.
+    Code runs in the sandbox pool (timeout, memory cap, isolated stdout);
+    SANDBOX_WORKERS=0 runs it in-process instead, for local debugging.
     """
     try:
-        # CLOUD FIX: Check /tmp first, then local
-        file_path = "financials.csv"
-        if os.path.exists("/tmp/financials.csv"):
-            file_path = "/tmp/financials.csv"
-        elif not os.path.exists(file_path):
-            return "Error: financials.csv not found."
+        store = get_store()
+        dataset_id = active_dataset_id()
+        if not dataset_id:
+            return NO_DATASET
         
-        # 1. Load Data
-        df = pd.read_csv(file_path)
+        if POOL_SIZE > 0:
+            return get_pool().execute(python_code, store.data_path(dataset_id), dataset_id)
         
-        # 2. Sandbox IO
-        old_stdout = sys.stdout
-        redirected_output = io.StringIO()
-        sys.stdout = redirected_output
+        # 1. Load Data (parsed once per dataset, then served from memory)
+        import pandas as pd
+        df = store.load(dataset_id)
         
-        # 3. Execution Scope
-        local_scope = {"pd": pd, "df": df}
-        exec(python_code, {}, local_scope)
+        # 2. Sandbox IO: sys.stdout is process-wide, so parallel tool turns take
+        # turns here and the previous stream is always restored, even on error
+        redirected_output = io.StringIO()
+        with _INPROCESS_LOCK, contextlib.redirect_stdout(redirected_output):
+            # 3. Execution Scope
+            local_scope = {"pd": pd, "df": df}
+            exec(python_code, {}, local_scope)
         
-        # 4. Restore IO
-        sys.stdout = old_stdout
         return redirected_output.getvalue() or "Code executed successfully but printed nothing. Did you forget 'print()'?"
     except Exception as e:
-        sys.stdout = sys.__stdout__ 
         return f"Execution Error: {e}"
 
 def search_market_data(niche: str, location: str) -> str:
     """
-    Simulates a 'Deep Dive' market research report.
-    Returns rich, qualitative data so the CMO can write a better strategy.
-    """
-    return f"""
-    [DEEP MARKET INTELLIGENCE: {niche} in {location}]
-    
-    1. DOMINANT COMPETITOR: 'The {location} Collective'
-       - Strategy: High-end, expensive aesthetics.
-       - Weakness: Slow service and intimidating menu.
-       
-    2. SECONDARY COMPETITOR: '{location} Express'
-       - Strategy: Pure speed and drive-thru.
-       - Weakness: Low quality, no community connection.
-       
-    3. CONSUMER PSYCHOLOGY ({location}):
-       - Locals are currently valuing "Third Spaces" (places to sit and work) over grab-and-go.
-       - High demand for "Hyper-Local" ingredients (consumers want to know the farm name).
-       
-    4. 2025 VIRAL TREND: "The Deconstructed Experience"
-       - Customers want to customize the 'build' of their product.
-       - Sustainability is no longer a perk; it is a requirement.
+    Ranked market and competitor intelligence for a niche and location,
+    from the configured provider (MARKET_PROVIDER; by default the local
+    FTS5 corpus, see market_intel). Runs offline.
     """
+    from market_intel import get_provider
+    return get_provider().report(niche, location)
 
 # --- TOOL REGISTRY ---
+# The analytics library (analytics_tools) covers the standard CFO metrics;
+# execute_pandas_analysis stays as the fallback for anything else.
 TOOL_FUNCTIONS = {
     "execute_pandas_analysis": execute_pandas_analysis,
-    "search_market_data": search_market_data
+    "search_market_data": search_market_data,
+    **ANALYTICS_FUNCTIONS
 }
 
 # --- TOOL SCHEMAS ---
-pandas_func = FunctionDeclaration(
-    name="execute_pandas_analysis",
-    description="Analyze data using Python. 'df' is loaded. Use print() to output results.",
-    parameters={"type": "object", "properties": {"python_code": {"type": "string"}}, "required": ["python_code"]}
-)
-
-search_func = FunctionDeclaration(
-    name="search_market_data",
-    description="Research competitors and trends.",
-    parameters={"type": "object", "properties": {"niche": {"type": "string"}, "location": {"type": "string"}}, "required": ["niche", "location"]}
-)
+# Plain data at import; the SDK's FunctionDeclaration objects are built on
+# first use (importing vertexai dominates cold-start time).
+TOOL_SCHEMAS = {
+    "execute_pandas_analysis": {
+        "description": "Analyze data using Python. 'df' is loaded. Use print() to output results. "
+                       "Prefer the analytics tools for standard metrics.",
+        "parameters": {"type": "object", "properties": {"python_code": {"type": "string"}}, "required": ["python_code"]}
+    },
+    "search_market_data": {
+        "description": "Research competitors and trends.",
+        "parameters": {"type": "object", "properties": {"niche": {"type": "string"}, "location": {"type": "string"}}, "required": ["niche", "location"]}
+    },
+    **ANALYTICS_SCHEMAS
+}
+
+@functools.lru_cache(maxsize=None)
+def tool_declaration(name):
+    from vertexai.generative_models import FunctionDeclaration
+    return FunctionDeclaration(name=name, **TOOL_SCHEMAS[name])
+
+def tools_for(*names):
+    """[Tool] holding the named declarations."""
+    from vertexai.generative_models import Tool
+    return [Tool(function_declarations=[tool_declaration(n) for n in names])]
+
+def __getattr__(name):
+    # The old import-time schema objects, now built lazily
+    if name == "pandas_func":
+        return tool_declaration("execute_pandas_analysis")
+    if name == "search_func":
+        return tool_declaration("search_market_data")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ==============================================================================
 # 👷 WORKER AGENT BASE CLASS
 # ==============================================================================
 
+def _call_tool(fn_name, args):
+    """Runs one tool and returns (result, elapsed_seconds)."""
+    start = time.perf_counter()
+    if fn_name not in TOOL_FUNCTIONS:
+        return f"Error: unknown tool '{fn_name}'.", 0.0
+    with span(f"tool.{fn_name}") as s:
+        try:
+            result = TOOL_FUNCTIONS[fn_name](**args)
+        except Exception as e:
+            result = f"Error: {e}"
+        if isinstance(result, str) and result.startswith(("Error", "Execution Error")):
+            s.error = result[:200]
+    return result, time.perf_counter() - start
+
+def _turn_record(response, model_name, elapsed, prompt_tokens):
+    """Trace entry for one model turn ("calls" is filled in once the turn is read)."""
+    usage = getattr(response, "usage_metadata", None)
+    return {
+        "model": model_name,
+        "latency": elapsed,
+        "prompt_estimate": prompt_tokens,
+        "tokens_in": int(getattr(usage, "prompt_token_count", 0) or 0),
+        "tokens_out": int(getattr(usage, "candidates_token_count", 0) or 0),
+        "calls": 0,
+    }
+
 class WorkerAgent:
-    def __init__(self, name, instruction, tools):
+    def __init__(self, name, instruction, tools, max_turns=MAX_TOOL_TURNS, time_budget=TOOL_TIME_BUDGET):
         self.name = name
+        self.instruction = instruction
+        self.tools = tools
+        self.max_turns = max_turns
+        self.time_budget = time_budget
+        from vertexai.generative_models import HarmCategory, HarmBlockThreshold
         self.safety = {HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_ONLY_HIGH}
-        self.model = GenerativeModel(MODEL_WORKER, system_instruction=instruction, tools=tools)
+        self.model = get_model(MODEL_WORKER, system_instruction=instruction, tools=tools)
 
-    def run(self, task):
-        try:
-            chat = self.model.start_chat()
-            response = chat.send_message(task, safety_settings=self.safety)
+    def _generate(self, history, use_cache, model_name=MODEL_WORKER):
+        """One model turn over the full chat history, served from the response cache when possible."""
+        return cached_generate(
+            self._client(model_name), history,
+            model_name=model_name, system_instruction=self.instruction, tools=self.tools,
+            use_cache=use_cache, safety_settings=self.safety
+        )
+
+    def _client(self, model_name):
+        if model_name == MODEL_WORKER:
+            return self.model
+        return get_model(model_name, system_instruction=self.instruction, tools=self.tools)
+
+    def _turn(self, history, use_cache, stream, trace):
+        """
+        Generator for one model turn: yields text deltas when streaming and
+        returns the complete response. The tiering policy picks the model
+        per turn from the history size (and the meeting's hints); the turn's
+        model, latency and token usage are appended to trace["turns"].
+        """
+        model_name, reason, prompt_tokens = self._tier(history)
+        start = time.perf_counter()
+        with span(f"{self.name.lower()}.turn", model=model_name, tier=reason, stream=stream):
+            if not stream:
+                response = self._generate(history, use_cache, model_name)
+            else:
+                chunks = []
+                for chunk in cached_generate_stream(
+                    self._client(model_name), history,
+                    model_name=model_name, system_instruction=self.instruction, tools=self.tools,
+                    use_cache=use_cache, safety_settings=self.safety
+                ):
+                    chunks.append(chunk)
+                    delta = response_text(chunk)
+                    if delta:
+                        yield delta
+                response = merge_chunks(chunks)
+        self._record_turn(trace, response, model_name, reason, prompt_tokens, start)
+        return response
+
+    def _tier(self, history):
+        """(model_name, reason, prompt_tokens) for the next turn, from the tiering policy."""
+        prompt_tokens = estimate_tokens(history)
+        model_name, reason = get_policy().choose(self.name.lower(), prompt_tokens, default=MODEL_WORKER)
+        return model_name, reason, prompt_tokens
+
+    def _record_turn(self, trace, response, model_name, reason, prompt_tokens, start):
+        elapsed = time.perf_counter() - start
+        get_policy().record(self.name.lower(), model_name, reason, elapsed)
+        trace["turns"].append(_turn_record(response, model_name, elapsed, prompt_tokens))
+
+    def _run_tools(self, calls):
+        """
+        Executes every function call from one model turn concurrently.
+        Each call gets a copy of the caller's context so tools still see the
+        active dataset. Returns [(name, result, elapsed)] in call order.
+        """
+        futures = [
+            _TOOL_POOL.submit(contextvars.copy_context().run, _call_tool,
+                              call.name, {k: v for k, v in call.args.items()})
+            for call in calls
+        ]
+        return [(call.name, *future.result()) for call, future in zip(calls, futures)]
+
+    def _steps(self, task, cancel_event, trace, start):
+        """
+        The tool loop itself, shared by `_loop` and `_loop_async`, which
+        differ only in how they run each step. Yields ("turn", history) and
+        ("tools", calls) requests, is sent back the model response or the
+        tool results, and returns the final report.
+        
+        The chat history is kept here rather than in `start_chat()` so each turn
+        can be keyed on the exact history; tool results are part of that key,
+        so a changed CSV never replays a stale answer.
+        
+        All function calls in a turn run in parallel and their results go back
+        in one message. After `max_turns` tool turns or `time_budget` seconds
+        the model is asked once to answer with what it has.
+        Tool results are kept within the context budget (see context_budget):
+        oversized ones are summarized, and old ones compacted once the history
+        grows past it.
+        """
+        from vertexai.generative_models import Content, Part
+        history = [Content(role="user", parts=[Part.from_text(task)])]
+        response = yield "turn", history
+        
+        while True:
+            calls = self._calls(response, trace)
+            if not calls:
+                return response.text
+            if self._cancelled(cancel_event, trace):
+                return "Cancelled."
             
-            while response.candidates[0].content.parts[0].function_call:
-                part = response.candidates[0].content.parts[0]
-                fn_name = part.function_call.name
-                fn_args = part.function_call.args
-                
-                if fn_name in TOOL_FUNCTIONS:
-                    args = {k: v for k, v in fn_args.items()}
-                    result = TOOL_FUNCTIONS[fn_name](**args)
-                    response = chat.send_message(
-                        Part.from_function_response(name=fn_name, response={"content": result})
-                    )
+            results = yield "tools", calls
+            self._feed_results(history, response, results, trace, start)
+            response = yield "turn", history
+            if trace["stopped"]:
+                return self._wrap_up(response, trace)
+
+    def _loop(self, task, cancel_event, use_cache, dataset_id, stream, trace):
+        """
+        Runs `_steps` for `run` and `run_stream`. Yields text deltas
+        (streaming only) and returns the final report.
+        `trace` is filled with per-turn and per-tool latencies and prompt sizes.
+        """
+        token, start = self._begin(dataset_id, trace)
+        try:
+            steps, reply = self._steps(task, cancel_event, trace, start), None
+            while True:
+                kind, payload = steps.send(reply)
+                if kind == "turn":
+                    reply = yield from self._turn(payload, use_cache, stream, trace)
                 else:
-                    break
-            return response.text
+                    reply = self._run_tools(payload)
+        except StopIteration as done:
+            return done.value
         except Exception as e:
             return f"Error: {e}"
+        finally:
+            self._finish(trace, start, token)
+
+    # --- Tool-loop steps shared by the sync and async loops ---
+
+    def _begin(self, dataset_id, trace):
+        """Points the tools at `dataset_id` and resets `trace`; returns (context token, start time)."""
+        token = active_dataset.set(dataset_id) if dataset_id else None
+        trace.update({"turns": [], "tools": [], "stopped": None,
+                      "context": {"capped": 0, "compacted": 0, "tokens_saved": 0}})
+        return token, time.perf_counter()
+
+    def _calls(self, response, trace):
+        """Function calls of a model turn (counted on its trace entry)."""
+        calls = [p.function_call for p in response.candidates[0].content.parts if p.function_call]
+        trace["turns"][-1]["calls"] = len(calls)
+        return calls
+
+    def _cancelled(self, cancel_event, trace):
+        if cancel_event is not None and cancel_event.is_set():
+            logger.info(f"🛑 {self.name} cancelled.")
+            trace["stopped"] = "cancelled"
+            return True
+        return False
+
+    def _feed_results(self, history, response, results, trace, start):
+        """Appends the model turn and one message with every tool result (plus the budget note)."""
+        from vertexai.generative_models import Content, Part
+        trace["tools"].extend({"name": name, "latency": elapsed} for name, _, elapsed in results)
+        model_turn = response.candidates[0].content
+        model_turn.role = "model"
+        history.append(model_turn)
+        # Oversized results are summarized before they enter the history
+        context = trace["context"]
+        parts = []
+        for name, result, _ in results:
+            result, saved = bound_result(result)
+            context["capped"] += bool(saved)
+            context["tokens_saved"] += saved
+            parts.append(Part.from_function_response(name=name, response={"content": result}))
+        
+        # Budget check: one last turn to write the answer, no more tools
+        tool_turns = len(trace["turns"])
+        over_time = time.perf_counter() - start > self.time_budget
+        if tool_turns >= self.max_turns or over_time:
+            trace["stopped"] = "time_budget" if over_time else "max_turns"
+            logger.info(f"⏳ {self.name} hit its {trace['stopped']}; asking for a final answer.")
+            parts.append(Part.from_text(
+                "Tool budget exhausted. Do not call any more tools; write your final answer now."
+            ))
+        history.append(Content(role="user", parts=parts))
+        saved = compact_history(history)
+        if saved:
+            context["compacted"] += 1
+            context["tokens_saved"] += saved
+
+    def _wrap_up(self, response, trace):
+        """The answer to the budget note; any tool calls it still makes are ignored."""
+        trace["turns"][-1]["calls"] = sum(1 for p in response.candidates[0].content.parts if p.function_call)
+        text = response_text(response)
+        return text or "Error: tool budget exhausted before a final answer."
+
+    def _finish(self, trace, start, token):
+        trace["elapsed"] = time.perf_counter() - start
+        prompts = [t["prompt_estimate"] for t in trace["turns"]]
+        logger.info(f"⏱️ {self.name}: {len(trace['turns'])} turns, {len(trace['tools'])} tool calls, "
+                    f"{trace['elapsed']:.2f}s, prompt ~{max(prompts, default=0)} tokens at most "
+                    f"({trace['context']['tokens_saved']} saved)")
+        if token is not None:
+            active_dataset.reset(token)
+
+    def run(self, task, cancel_event=None, use_cache=True, dataset_id=None, trace=None):
+        """
+        Runs the tool loop for one task and returns the report.
+        cancel_event: optional threading.Event; when set (e.g. a speculative run
+        the router rejected) the loop stops before the next model turn.
+        use_cache: set False to force fresh model calls.
+        dataset_id: dataset store handle the tools should analyse.
+        trace: optional dict filled with {"turns": [{"model", "latency",
+        "prompt_estimate", "tokens_in", "tokens_out", "calls"}], "tools": [{"name",
+        "latency"}], "context": {"capped", "compacted", "tokens_saved"}, "stopped",
+        "elapsed"}. Cached turns report the original call's tokens.
+        """
+        with span(self.name.lower()) as s:
+            loop = self._loop(task, cancel_event, use_cache, dataset_id, stream=False,
+                              trace=trace if trace is not None else {})
+            try:
+                while True:
+                    next(loop)
+            except StopIteration as done:
+                if done.value.startswith("Error:"):
+                    s.error = done.value[:200]
+                return done.value
+
+    def run_stream(self, task, cancel_event=None, use_cache=True, dataset_id=None):
+        """
+        Streaming `run`. Yields {"stage", "delta"} events as tokens arrive, then
+        one {"stage", "done": True, "text", "ttft", "elapsed", "trace"} event
+        carrying the final report, time-to-first-token, total time (seconds)
+        and the turn/tool trace described in `run`.
+        """
+        start = time.perf_counter()
+        ttft = None
+        trace = {}
+        with span(self.name.lower(), stream=True) as s:
+            loop = self._loop(task, cancel_event, use_cache, dataset_id, stream=True, trace=trace)
+            try:
+                while True:
+                    delta = next(loop)
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                        s.set(ttft=ttft)
+                    yield {"stage": self.name, "delta": delta}
+            except StopIteration as done:
+                if done.value.startswith("Error:"):
+                    s.error = done.value[:200]
+                final = done.value
+        yield {"stage": self.name, "done": True, "text": final,
+               "ttft": ttft, "elapsed": time.perf_counter() - start, "trace": trace}
+
+    # --- Async API ---
+
+    async def _turn_async(self, history, use_cache, trace):
+        """`_turn` on `generate_content_async` (no streaming)."""
+        model_name, reason, prompt_tokens = self._tier(history)
+        start = time.perf_counter()
+        with span(f"{self.name.lower()}.turn", model=model_name, tier=reason, asynchronous=True):
+            response = await cached_generate_async(
+                self._client(model_name), history,
+                model_name=model_name, system_instruction=self.instruction, tools=self.tools,
+                use_cache=use_cache, safety_settings=self.safety
+            )
+        self._record_turn(trace, response, model_name, reason, prompt_tokens, start)
+        return response
+
+    async def _run_tools_async(self, calls):
+        """`_run_tools` awaited from the event loop; the tools themselves still run on the tool pool."""
+        loop = asyncio.get_running_loop()
+        futures = [
+            loop.run_in_executor(_TOOL_POOL, contextvars.copy_context().run, _call_tool,
+                                 call.name, {k: v for k, v in call.args.items()})
+            for call in calls
+        ]
+        return [(call.name, *result) for call, result in zip(calls, await asyncio.gather(*futures))]
+
+    async def _loop_async(self, task, cancel_event, use_cache, dataset_id, trace):
+        """Runs `_steps` for `run_async`: turns and tools are awaited on the event loop."""
+        token, start = self._begin(dataset_id, trace)
+        try:
+            steps, reply = self._steps(task, cancel_event, trace, start), None
+            while True:
+                kind, payload = steps.send(reply)
+                if kind == "turn":
+                    reply = await self._turn_async(payload, use_cache, trace)
+                else:
+                    reply = await self._run_tools_async(payload)
+        except StopIteration as done:
+            return done.value
+        except Exception as e:
+            return f"Error: {e}"
+        finally:
+            self._finish(trace, start, token)
+
+    async def run_async(self, task, cancel_event=None, use_cache=True, dataset_id=None, trace=None, timeout=None):
+        """
+        `run` for an event loop: model turns await `generate_content_async`,
+        tools run on the tool pool. Cancelling the awaiting task cancels the
+        in-flight model call. timeout: seconds for the whole run; on expiry
+        the report is an "Error: ..." string and trace["stopped"] is "timeout".
+        """
+        trace = trace if trace is not None else {}
+        with span(self.name.lower(), asynchronous=True) as s:
+            try:
+                report = await asyncio.wait_for(
+                    self._loop_async(task, cancel_event, use_cache, dataset_id, trace), timeout)
+            except asyncio.TimeoutError:
+                trace["stopped"] = "timeout"
+                report = f"Error: {self.name} timed out after {timeout:.0f}s."
+            if report.startswith("Error:"):
+                s.error = report[:200]
+            return report
 
 # ==============================================================================
 # 🏢 SPECIALIZED WORKERS (The "Deep Thinkers")
@@ -138,14 +466,16 @@ class WorkerAgent:
 
 class FinancialAnalyst(WorkerAgent):
     def __init__(self):
-        tools = [Tool(function_declarations=[pandas_func])]
+        tools = tools_for(*ANALYTICS_SCHEMAS, "execute_pandas_analysis")
         
         # UPGRADED INSTRUCTION: Wall Street Level Analysis
         instruction = """
         You are the Chief Financial Officer (CFO). You are not a strategic auditor.
         
         YOUR WORKFLOW:
-        1.  **Code Execution**: Use `execute_pandas_analysis` to calculate Total Revenue, Total Expenses, Net Profit, and Profit Margin %.
+        1.  **Analytics Tools**: Use `pnl_summary` for Total Revenue, Total Expenses, Net Profit and Profit Margin %,
+            and `monthly_rollup`, `burn_rate`, `runway_projection`, `category_pareto` or `period_deltas` for trends.
+            Call the ones you need in the same turn. Only use `execute_pandas_analysis` for anything they don't cover.
         2.  **Narrative Analysis**: Do not just list numbers. Explain the *health* of the business.
             - Is the Profit Margin healthy (>20%) or dangerous?
             - What is the "Burn Rate" (Total Expenses)?
@@ -160,7 +490,7 @@ class FinancialAnalyst(WorkerAgent):
 
 class MarketResearcher(WorkerAgent):
     def __init__(self):
-        tools = [Tool(function_declarations=[search_func])]
+        tools = tools_for("search_market_data")
         
         # UPGRADED INSTRUCTION: Creative Director Level Strategy
         instruction = """
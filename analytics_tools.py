@@ -0,0 +1,251 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from dataset_store import get_store, active_dataset_id, NO_DATASET
+
+logger = logging.getLogger("Analytics")
+
+# --- CONFIGURATION ---
+RESULT_ENTRIES = 1024  # Memoized tool results (dataset, tool, arguments)
+LEDGER_ENTRIES = 4     # Normalized ledgers kept per recent dataset
+RUNWAY_HORIZON = 120   # Months simulated before runway counts as "beyond horizon"
+PERIODS = {"M": "month", "Q": "quarter", "Y": "year"}
+
+# ==============================================================================
+# 🧮 CFO ANALYTICS LIBRARY
+# ==============================================================================
+# Standard metrics as typed, vectorized functions, so the CFO calls a tool
+# instead of writing (and rewriting) pandas code. Each reads the caller's
+# dataset, returns compact JSON, and is memoized per dataset digest and
+# arguments. pandas/numpy are imported on first call (cold start).
+
+_lock = threading.Lock()
+_results = OrderedDict()  # (digest, tool, args json) -> result
+_ledgers = OrderedDict()  # digest -> normalized ledger frame
+
+def _ledger(digest):
+    """
+    Month (period), Side (Revenue/Expense), Category, Amount (absolute) for
+    every row with a recognised Type, built once per dataset.
+    """
+    with _lock:
+        if digest in _ledgers:
+            _ledgers.move_to_end(digest)
+            return _ledgers[digest]
+
+    import pandas as pd
+    from financial_profile import REQUIRED_COLUMNS, _side
+
+    df = get_store().load(digest)
+    missing = REQUIRED_COLUMNS - set(df.columns)
+    if missing:
+        raise ValueError(f"dataset is missing columns {sorted(missing)}")
+    ledger = pd.DataFrame({
+        "Month": pd.to_datetime(df["Date"], errors="coerce").dt.to_period("M"),
+        "Side": _side(df["Type"]),
+        "Category": df["Category"].astype(str),
+        "Amount": pd.to_numeric(df["Amount"], errors="coerce").abs(),
+    }).dropna(subset=["Side", "Amount"])
+
+    with _lock:
+        _ledgers[digest] = ledger
+        while len(_ledgers) > LEDGER_ENTRIES:
+            _ledgers.popitem(last=False)
+    return ledger
+
+def _by_period(ledger, period="M"):
+    """Revenue / Expense / Net per period, oldest first, gaps filled with zero."""
+    dated = ledger.dropna(subset=["Month"])
+    keys = dated["Month"] if period == "M" else dated["Month"].dt.asfreq(period)
+    table = dated.groupby([keys, "Side"])["Amount"].sum().unstack("Side", fill_value=0.0)
+    table = table.reindex(columns=["Revenue", "Expense"], fill_value=0.0).sort_index()
+    if len(table):
+        import pandas as pd
+        table = table.reindex(pd.period_range(table.index[0], table.index[-1], freq=period), fill_value=0.0)
+    table["Net"] = table["Revenue"] - table["Expense"]
+    return table
+
+def _r(value):
+    return None if value is None or value != value else round(float(value), 2)
+
+def _analytic(fn):
+    """
+    Registers `fn` as a tool: resolves the active dataset, memoizes the
+    result per (digest, arguments) and returns it as compact JSON. Errors
+    come back as "Error: ..." strings like the other tools.
+    """
+    def tool(**kwargs):
+        digest = active_dataset_id()
+        if not digest:
+            return NO_DATASET
+        key = (digest, fn.__name__, json.dumps(kwargs, sort_keys=True, default=str))
+        with _lock:
+            if key in _results:
+                _results.move_to_end(key)
+                return _results[key]
+        try:
+            result = json.dumps(fn(_ledger(digest), **kwargs), separators=(",", ":"), default=str)
+        except Exception as e:
+            return f"Error: {e}"
+        with _lock:
+            _results[key] = result
+            while len(_results) > RESULT_ENTRIES:
+                _results.popitem(last=False)
+        return result
+    tool.__name__ = fn.__name__
+    tool.__doc__ = fn.__doc__
+    ANALYTICS_FUNCTIONS[fn.__name__] = tool
+    return tool
+
+ANALYTICS_FUNCTIONS = {}
+
+@_analytic
+def pnl_summary(ledger, top: int = 5):
+    """Totals, net profit, margin and the top revenue/expense categories."""
+    sides = ledger.groupby("Side")["Amount"].sum()
+    revenue, expenses = float(sides.get("Revenue", 0.0)), float(sides.get("Expense", 0.0))
+    by_category = ledger.groupby(["Side", "Category"])["Amount"].sum()
+    top_of = lambda side: {str(k): _r(v) for k, v in
+                           by_category.get(side, by_category.iloc[:0]).nlargest(int(top)).items()}
+    months = ledger["Month"].dropna()
+    return {
+        "period": [str(months.min()), str(months.max())] if len(months) else None,
+        "revenue": _r(revenue),
+        "expenses": _r(expenses),
+        "net_profit": _r(revenue - expenses),
+        "margin_pct": _r((revenue - expenses) / revenue * 100) if revenue else None,
+        "top_revenue": top_of("Revenue"),
+        "top_expenses": top_of("Expense"),
+    }
+
+@_analytic
+def monthly_rollup(ledger, months: int = 12, category: str = ""):
+    """Revenue / expense / net per month (most recent `months`), optionally for one category."""
+    if category:
+        ledger = ledger[ledger["Category"].str.lower() == category.lower()]
+    table = _by_period(ledger).tail(int(months))
+    return {
+        "columns": ["revenue", "expense", "net"],
+        "months": {str(m): [_r(r), _r(e), _r(n)] for m, r, e, n in
+                   zip(table.index, table["Revenue"], table["Expense"], table["Net"])},
+    }
+
+@_analytic
+def burn_rate(ledger, months: int = 3):
+    """Average monthly expenses (gross burn) and net burn over the last `months` months."""
+    table = _by_period(ledger).tail(int(months))
+    if table.empty:
+        return {"months": 0, "gross_burn": None, "net_burn": None}
+    net = float(table["Net"].mean())
+    return {
+        "months": len(table),
+        "window": [str(table.index[0]), str(table.index[-1])],
+        "gross_burn": _r(table["Expense"].mean()),
+        "avg_revenue": _r(table["Revenue"].mean()),
+        "net_burn": _r(max(0.0, -net)),
+        "cash_generative": net >= 0,
+    }
+
+@_analytic
+def runway_projection(ledger, cash_balance: float, months: int = 3, expense_growth_pct: float = 0.0,
+                      revenue_growth_pct: float = 0.0):
+    """
+    Months until `cash_balance` runs out, projecting the average of the last
+    `months` months forward with compound monthly growth rates.
+    """
+    import numpy as np
+
+    table = _by_period(ledger).tail(int(months))
+    if table.empty:
+        return {"runway_months": None, "reason": "no dated rows"}
+    t = np.arange(1, RUNWAY_HORIZON + 1)
+    revenue = table["Revenue"].mean() * (1 + revenue_growth_pct / 100) ** t
+    expense = table["Expense"].mean() * (1 + expense_growth_pct / 100) ** t
+    cash = float(cash_balance) + np.cumsum(revenue - expense)
+    out = np.flatnonzero(cash < 0)
+    return {
+        "runway_months": int(out[0]) + 1 if len(out) else None,
+        "beyond_horizon": not len(out),
+        "horizon_months": RUNWAY_HORIZON,
+        "start_net_per_month": _r(revenue[0] - expense[0]),
+        "cash_after_12m": _r(cash[11]),
+    }
+
+@_analytic
+def category_pareto(ledger, side: str = "Expense", threshold_pct: float = 80.0):
+    """Categories that make up `threshold_pct` of a side's total, with shares and cumulative shares."""
+    side = "Revenue" if side.lower().startswith(("rev", "inc", "sale")) else "Expense"
+    totals = ledger[ledger["Side"] == side].groupby("Category")["Amount"].sum().sort_values(ascending=False)
+    total = float(totals.sum())
+    if not total:
+        return {"side": side, "total": 0.0, "categories": {}}
+    share = totals / total * 100
+    cumulative = share.cumsum()
+    # Keep every category up to and including the one that crosses the threshold
+    keep = int((cumulative < threshold_pct).sum()) + 1
+    return {
+        "side": side,
+        "total": _r(total),
+        "category_count": len(totals),
+        "categories": {str(k): [_r(v), _r(s), _r(c)] for k, v, s, c in
+                       zip(totals.index[:keep], totals.iloc[:keep], share.iloc[:keep], cumulative.iloc[:keep])},
+        "columns": ["amount", "share_pct", "cumulative_pct"],
+    }
+
+@_analytic
+def period_deltas(ledger, period: str = "M", periods: int = 6):
+    """Period-over-period change (absolute and %) in revenue, expense and net; period is M, Q or Y."""
+    period = period.upper()[:1]
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {sorted(PERIODS)}")
+    table = _by_period(ledger, period)
+    change = table.diff()
+    pct = table.pct_change(fill_method=None).replace([float("inf"), float("-inf")], float("nan")) * 100
+    rows = {}
+    for key in table.index[-int(periods):]:
+        rows[str(key)] = {
+            name.lower(): [_r(table.at[key, name]), _r(change.at[key, name]), _r(pct.at[key, name])]
+            for name in ("Revenue", "Expense", "Net")
+        }
+    return {"period": PERIODS[period], "columns": ["value", "change", "change_pct"], "rows": rows}
+
+# --- TOOL SCHEMAS ---
+# Plain data, like agent_workers.TOOL_SCHEMAS (declarations are built on first use).
+_INT = {"type": "integer"}
+_NUM = {"type": "number"}
+_STR = {"type": "string"}
+ANALYTICS_SCHEMAS = {
+    "pnl_summary": {
+        "description": "Exact P&L for the full dataset: revenue, expenses, net profit, margin %, top categories. Returns JSON.",
+        "parameters": {"type": "object", "properties": {"top": _INT}},
+    },
+    "monthly_rollup": {
+        "description": "Monthly revenue / expense / net for the most recent N months, optionally one category. Returns JSON.",
+        "parameters": {"type": "object", "properties": {"months": _INT, "category": _STR}},
+    },
+    "burn_rate": {
+        "description": "Average monthly gross burn (expenses) and net burn over the last N months. Returns JSON.",
+        "parameters": {"type": "object", "properties": {"months": _INT}},
+    },
+    "runway_projection": {
+        "description": "Months of runway for a cash balance, projecting recent monthly averages with optional % monthly growth. Returns JSON.",
+        "parameters": {"type": "object", "properties": {
+            "cash_balance": _NUM, "months": _INT, "expense_growth_pct": _NUM, "revenue_growth_pct": _NUM,
+        }, "required": ["cash_balance"]},
+    },
+    "category_pareto": {
+        "description": "Categories making up threshold_pct (default 80) of Expense or Revenue, with shares. Returns JSON.",
+        "parameters": {"type": "object", "properties": {"side": _STR, "threshold_pct": _NUM}},
+    },
+    "period_deltas": {
+        "description": "Period-over-period change in revenue, expense and net; period is M, Q or Y. Returns JSON.",
+        "parameters": {"type": "object", "properties": {"period": _STR, "periods": _INT}},
+    },
+}
+
+def clear():
+    with _lock:
+        _results.clear()
+        _ledgers.clear()
@@ -1,15 +1,16 @@
 import streamlit as st
-import pandas as pd
-import os
-import vertexai
 from dotenv import load_dotenv
 import logging
-import shutil
+import uuid
 
 # --- IMPORT ARCHITECTURE ---
-from manager_agent import BoardroomManager
+from model_registry import REGISTRY
+from llm_calls import get_guard
 from memory_engine import MemoryService
-from observability import setup_observability
+from job_queue import get_jobs
+from observability import setup_observability, METRICS
+from dataset_store import get_store
+from startup import warm_in_background, wait_ready
 
 # --- 1. CONFIGURATION & INIT ---
 load_dotenv()
@@ -22,16 +23,17 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize Vertex AI
-project_id = os.getenv("GCP_PROJECT_ID")
-if project_id:
-    try:
-        vertexai.init(project=project_id, location="us-central1")
-    except Exception as e:
-        st.error(f"Vertex AI Init Error: {e}")
+# Heavy SDKs (vertexai, pandas), the shared model clients and the code
+# sandbox warm up in a background thread, once per process, so the first
+# page renders straight away. vertexai.init runs there (see model_registry).
+warm_in_background()
 
 # --- 2. STATE MANAGEMENT ---
-memory = MemoryService()
+# Each tenant gets its own memory. The ID lives in the URL so a reload (or a
+# bookmarked link) restores the same boardroom; new visitors get a fresh one.
+if "tenant" not in st.query_params:
+    st.query_params["tenant"] = uuid.uuid4().hex[:12]
+memory = MemoryService(session_id=st.query_params["tenant"])
 if "state" not in st.session_state:
     st.session_state.state = memory.load_state()
     if st.session_state.state.ceo_data:
@@ -52,11 +54,33 @@ with st.sidebar:
     # Currency Selection
     currency_input = st.selectbox("💱 Currency", ["USD ($)", "INR (₹)", "EUR (€)", "GBP (£)"])
     
+    # Flash synthesis; escalates to pro only if the directive misses the 3-point structure
+    fast_mode = st.toggle("⚡ Fast mode", value=False, help="Synthesize on flash; escalate to pro only when needed.")
+    
     st.divider()
     uploaded_file = st.file_uploader("Financials (CSV)", type=["csv"])
     
+    # Per-stage latency / token metrics for this server process
+    stage_metrics = METRICS.summary()
+    if stage_metrics:
+        import pandas as pd
+        with st.expander("📈 Stage Metrics", expanded=False):
+            st.dataframe(pd.DataFrame(stage_metrics).T, use_container_width=True)
+            registry = REGISTRY.stats()
+            if registry["reuse_rate"] is not None:
+                st.caption(f"♻️ Client reuse: {registry['reuse_rate']:.0%} "
+                           f"({registry['models']} clients, {registry['instances']} shared instances)")
+            calls = get_guard().stats()
+            if calls.get("calls"):
+                st.caption(f"🛡️ Vertex calls: {calls['calls']} · retries {calls.get('retries', 0)} · "
+                           f"hedges {calls.get('hedges', 0)} · throttled {calls.get('throttles', 0)} · "
+                           f"breaker opens {calls.get('breaker_opens', 0)}")
+    
     st.markdown("---")
     if st.button("🧹 Reset System", use_container_width=True):
+        running = get_jobs().active(st.query_params["tenant"])
+        if running is not None:
+            running.cancel()
         memory.clear_memory()
         st.session_state.clear()
         st.rerun()
@@ -65,86 +89,103 @@ with st.sidebar:
 st.title("👔 The Virtual Boardroom")
 st.caption("Level 3 Multi-Agent System (Manager-Worker Architecture)")
 
-# --- DATA HANDLING (CLOUD FIX) ---
-# Determine the writable path based on environment
-CSV_PATH = "/tmp/financials.csv" if os.path.exists("/tmp") else "financials.csv"
+# --- DATA HANDLING ---
+# Uploads go into the content-addressed dataset store; the digest is this
+# session's handle, so concurrent sessions never overwrite each other's data.
+datasets = get_store()
+PREVIEW_ROWS = 1000
 
 if uploaded_file:
     try:
-        df = pd.read_csv(uploaded_file)
-        # Save to writable location (Cloud Fix)
-        df.to_csv(CSV_PATH, index=False)
+        # Ingest once per upload (not on every rerun): raw bytes streamed to
+        # disk, chunked conversion to columnar, profile materialized
+        if st.session_state.get("upload_id") != uploaded_file.file_id:
+            uploaded_file.seek(0)
+            st.session_state.dataset_id = datasets.ingest(uploaded_file)
+            st.session_state.upload_id = uploaded_file.file_id
+        dataset_id = st.session_state.dataset_id
         
         with st.expander("📊 Data Preview", expanded=False):
-            st.dataframe(df, use_container_width=True)
+            st.dataframe(datasets.head(dataset_id, PREVIEW_ROWS), use_container_width=True)
     except Exception as e:
         st.error(f"Error reading CSV: {e}")
         st.stop()
 else:
-    # If no upload, check if a sample exists in the read-only app folder
-    # and copy it to tmp for the agents to use
-    if os.path.exists("financials.csv") and not os.path.exists(CSV_PATH):
-        shutil.copy("financials.csv", CSV_PATH)
-        
     st.info("👋 Welcome! Please upload your financial data to begin.")
     # Stop execution until data is present
     st.stop()
 
 # --- 5. EXECUTION ENGINE (The Manager) ---
+# Meetings run on the background job pool (see job_queue); this script only
+# submits and follows them, so a rerun re-attaches instead of starting over.
+jobs = get_jobs()
+tenant = st.query_params["tenant"]
+
 if st.button("🚀 Execute Strategy", type="primary", use_container_width=True):
     # Update State with latest inputs
     state.niche = niche_input
     state.goal = goal_input
     
-    try:
-        # A. CONTEXT ENGINEERING: COMPACTION
-        # Before running new logic, we compact the OLD strategy into history.
-        if state.ceo_data:
-            with st.spinner("🧹 Compacting previous context..."):
-                memory.compact_context(state)
-        
-        # B. INSTANTIATE MANAGER
-        manager = BoardroomManager()
-        
-        # C. PHASE 1: ROUTING
-        with st.status("🚦 Manager is analyzing request...", expanded=True) as s:
-            user_request = f"Goal: {state.goal}. Niche: {state.niche}"
-            intent = manager.route_request(user_request)
-            s.update(label=f"✅ Intent Classified: {intent}", state="complete")
-        
-        # D. PHASE 2: EXECUTION
-        if intent == "CHAT":
-             st.info("👋 Hello! Please upload data or ask for a specific strategy.")
-             
-        elif intent in ["FINANCE", "MARKETING", "STRATEGY"]:
-            
-            with st.status("⚙️ Orchestrating Agents...", expanded=True) as s:
-                st.write("👨‍💼 CFO is performing Python analysis...")
-                st.write("👩‍🎨 CMO is researching local trends...")
-                st.write("👑 CEO is synthesizing the directive...")
-                
-                # Note: csv_context points to the filename; workers will auto-detect /tmp
-                results = manager.execute_workflow(
-                    niche=state.niche,
-                    goal=state.goal,
-                    location=location_input,
-                    currency=currency_input, 
-                    csv_context="financials.csv" 
-                )
-                
-                # Update Active State
-                state.cfo_data = results["cfo"]
-                state.cmo_data = results["cmo"]
-                state.ceo_data = results["ceo"]
-                
-                s.update(label="✅ Strategy Developed", state="complete")
-
-            # Save to Memory (New state + Compacted history)
-            memory.save_state(state)
-            st.rerun()
+    # SHARED MANAGER (built once per process by the registry)
+    if not wait_ready(timeout=0):
+        with st.spinner("🚀 Warming up the boardroom..."):
+            wait_ready()
+    # csv_context is the dataset store handle for this session's upload
+    st.session_state.job_id = jobs.submit(
+        tenant,
+        niche=state.niche,
+        goal=state.goal,
+        location=location_input,
+        currency=currency_input,
+        dataset_id=st.session_state.dataset_id,
+        fast_mode=fast_mode
+    )
 
-    except Exception as e:
-        st.error(f"❌ System Error: {e}")
+job = jobs.active(tenant) or jobs.get(st.session_state.get("job_id"))
+if job is not None and st.session_state.get("job_collected") != job.id:
+    if job.active and st.button("🛑 Cancel Meeting", use_container_width=True):
+        job.cancel()
+    
+    with st.status("⚙️ Orchestrating Agents...", expanded=True) as s:
+        st.write("🚦 Manager is analyzing the request, CFO and CMO are already working...")
+        
+        # Live panels: tokens render as they arrive instead of after st.rerun()
+        c1, c2 = st.columns(2)
+        panels = {
+            "CFO": (c1.empty(), st.info, "**💰 CFO Findings**"),
+            "CMO": (c2.empty(), st.success, "**🎨 CMO Strategy**"),
+        }
+        panels["CEO"] = (st.empty(), st.warning, "**👑 CEO Directive**")
+        cursor = 0
+        while True:
+            _, cursor = job.wait(cursor, timeout=0.5)
+            snapshot = job.snapshot()
+            if snapshot["intent"]:
+                s.update(label=f"⚙️ Intent Classified: {snapshot['intent']} · Orchestrating Agents...")
+            for stage, (slot, box, title) in panels.items():
+                text = snapshot["stages"][stage]["text"]
+                if text:
+                    with slot.container():
+                        box(f"{title}\n\n{text}")
+            if not job.active:
+                break
+    
+    st.session_state.job_collected = job.id
+    snapshot = job.snapshot()
+    if snapshot["status"] == "done":
+        # The job saved through MemoryService; reload the new state from there
+        st.session_state.state = memory.load_state()
+        st.session_state.timings = snapshot["result"]["timings"]
+        s.update(label="✅ Strategy Developed", state="complete")
+        st.rerun()
+    elif snapshot["status"] == "chat":
+        s.update(label=f"✅ Intent Classified: {snapshot['intent']}", state="complete")
+        st.info("👋 Hello! Please upload data or ask for a specific strategy.")
+    elif snapshot["status"] == "cancelled":
+        s.update(label="🛑 Meeting cancelled", state="error")
+    else:
+        s.update(label="❌ Meeting failed", state="error")
+        st.error(f"❌ System Error: {snapshot['error']}")
 
 # --- 6. RESULTS DISPLAY ---
 if state.ceo_data:
@@ -160,6 +201,14 @@ if state.ceo_data:
     # Full Width for CEO
     st.warning(f"**👑 CEO Directive**\n\n{state.ceo_data}")
     
+    # Stage timings from the last run (CFO and CMO overlap)
+    if "timings" in st.session_state:
+        t = st.session_state.timings
+        first = f" · First token {t['first_token']:.1f}s" if t.get("first_token") is not None else ""
+        tier = t.get("tier")
+        tier = f" ({tier['model'].rsplit('-', 1)[-1]}{', escalated' if tier['escalated'] else ''})" if tier else ""
+        st.caption(f"⏱️ CFO {t['cfo']:.1f}s · CMO {t['cmo']:.1f}s · CEO {t['ceo']:.1f}s{tier} · Total {t['total']:.1f}s{first}")
+    
     # Show History (Proof of Compaction)
     if state.history:
         with st.expander("📜 Historical Context (Compacted Memory)"):
@@ -0,0 +1,188 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from dotenv import load_dotenv
+
+from observability import setup_observability, run_scope, new_run_id
+from llm_calls import TokenBucket
+
+# ==============================================================================
+# 🗂️ HEADLESS BATCH RUNNER
+# ==============================================================================
+# One board meeting per input line, streamed to an output JSONL as each one
+# finishes. The output file doubles as the checkpoint: re-running with the
+# same --out skips every item already written.
+#
+#   python batch.py clients.jsonl --out strategies.jsonl --concurrency 8 --rate 0.5
+#
+# Input lines: {"id": ..., "niche": ..., "goal": ..., "location": ..., "currency": ..., "csv": "path.csv"}
+# "id" is optional (defaults to the line number). With --retry-failed a rerun
+# appends a new row for the item; readers should keep the last row per id.
+
+load_dotenv()
+logger = logging.getLogger("Batch")
+REQUIRED_FIELDS = ("niche", "goal", "location", "currency")
+
+def read_items(path):
+    """Yields (item_id, item) per non-empty line; malformed lines become error items."""
+    with open(path, "r") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield str(lineno), {"_error": f"invalid JSON: {e}"}
+                continue
+            yield str(item.get("id", lineno)), item
+
+def completed_ids(out_path, retry_failed=False):
+    """Item ids already in the output file (the checkpoint)."""
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, "r") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Torn last line from a crash; the item reruns
+            if retry_failed and row.get("status") != "ok":
+                continue
+            done.add(str(row["id"]))
+    return done
+
+class BatchRunner:
+    """Runs `execute_workflow` per item with bounded concurrency and a start-rate limit."""
+    def __init__(self, manager, out_path, concurrency=4, rate=0.0, burst=1, use_cache=True):
+        self.manager = manager
+        self.out_path = out_path
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate, burst)
+        self.use_cache = use_cache
+        self._write_lock = threading.Lock()
+        self._datasets = {}
+        self._datasets_lock = threading.Lock()
+        self.stats = {"ok": 0, "failed": 0, "skipped": 0}
+
+    def _dataset(self, csv_path):
+        """Registers each CSV once in the dataset store; returns its handle."""
+        from dataset_store import get_store
+        if not csv_path:
+            return None
+        with self._datasets_lock:
+            if csv_path not in self._datasets:
+                self._datasets[csv_path] = get_store().put_file(csv_path)
+            return self._datasets[csv_path]
+
+    def _run_one(self, item_id, item):
+        self.bucket.acquire()
+        start = time.perf_counter()
+        row = {"id": item_id}
+        try:
+            if "_error" in item:
+                raise ValueError(item["_error"])
+            missing = [k for k in REQUIRED_FIELDS if not item.get(k)]
+            if missing:
+                raise ValueError(f"missing fields: {', '.join(missing)}")
+            with run_scope(new_run_id()):
+                results = self.manager.execute_workflow(
+                    item["niche"], item["goal"], item["location"], item["currency"],
+                    self._dataset(item.get("csv")), use_cache=self.use_cache
+                )
+            row.update(status="ok", run_id=results["run_id"], cfo=results["cfo"], cmo=results["cmo"],
+                       ceo=results["ceo"], timings={k: v for k, v in results["timings"].items() if k != "trace"})
+        except Exception as e:
+            logger.warning(f"Item {item_id} failed: {e}")
+            row.update(status="error", error=str(e))
+        row["elapsed"] = time.perf_counter() - start
+        self._write(row)
+        return row
+
+    def _write(self, row):
+        line = json.dumps(row, default=str) + "\n"
+        with self._write_lock, open(self.out_path, "a") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+            self.stats["ok" if row["status"] == "ok" else "failed"] += 1
+
+    def run(self, items, total=None, skip=(), progress_every=10.0):
+        """
+        Submits at most `concurrency` items at a time (the input is never
+        fully materialized) and logs progress every `progress_every` seconds.
+        """
+        start = time.perf_counter()
+        last_report = start
+        pending = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch") as pool:
+            for item_id, item in items:
+                if item_id in skip:
+                    self.stats["skipped"] += 1
+                    continue
+                if len(pending) >= self.concurrency:
+                    _, pending = wait(pending, return_when=FIRST_COMPLETED)
+                pending.add(pool.submit(self._run_one, item_id, item))
+                if time.perf_counter() - last_report >= progress_every:
+                    self._report(start, total)
+                    last_report = time.perf_counter()
+            while pending:
+                _, pending = wait(pending, timeout=progress_every, return_when=FIRST_COMPLETED)
+                if pending and time.perf_counter() - last_report >= progress_every:
+                    self._report(start, total)
+                    last_report = time.perf_counter()
+        self._report(start, total, final=True)
+        return dict(self.stats)
+
+    def _report(self, start, total, final=False):
+        elapsed = time.perf_counter() - start
+        finished = self.stats["ok"] + self.stats["failed"]
+        rate = finished / elapsed if elapsed else 0.0
+        remaining = (total - self.stats["skipped"] - finished) if total else None
+        eta = f", ETA {remaining / rate / 60:.1f} min" if remaining and rate else ""
+        logger.info(
+            f"{'✅ Done' if final else '⏳ Progress'}: {finished} finished "
+            f"({self.stats['ok']} ok, {self.stats['failed']} failed, {self.stats['skipped']} resumed) "
+            f"in {elapsed:.0f}s, {rate * 60:.1f} items/min{eta}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Virtual Boardroom over a JSONL of businesses.")
+    parser.add_argument("input", help="JSONL with niche, goal, location, currency, csv per line")
+    parser.add_argument("--out", required=True, help="Output JSONL (also the resume checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Board meetings in flight")
+    parser.add_argument("--rate", type=float, default=0.0, help="Max meetings started per second (0 = unlimited)")
+    parser.add_argument("--burst", type=int, default=1, help="Token bucket capacity")
+    parser.add_argument("--retry-failed", action="store_true", help="Rerun items whose previous result was an error")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the LLM response cache")
+    parser.add_argument("--dry-run", action="store_true", help="Use the offline fake model (no Vertex calls)")
+    args = parser.parse_args()
+
+    setup_observability()
+
+    skip = completed_ids(args.out, retry_failed=args.retry_failed)
+    total = sum(1 for _ in read_items(args.input))
+    logger.info(f"🗂️ {total} items, {len(skip)} already in {args.out}.")
+
+    def execute():
+        from model_registry import get_manager
+        runner = BatchRunner(get_manager(), args.out, concurrency=args.concurrency,
+                             rate=args.rate, burst=args.burst, use_cache=not args.no_cache)
+        return runner.run(read_items(args.input), total=total, skip=skip)
+
+    if args.dry_run:
+        from fake_model import fake_vertex
+        with fake_vertex():
+            stats = execute()
+    else:
+        stats = execute()
+    sys.exit(1 if stats["failed"] else 0)
+
+if __name__ == "__main__":
+    main()
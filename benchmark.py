@@ -0,0 +1,242 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import observability
+from observability import METRICS
+from llm_calls import get_guard
+from fake_model import FakeGenerativeModel, LatencyModel, ScriptedPolicy, PNL_CODE, fake_vertex, load_recording
+
+# ==============================================================================
+# ⏱️ OFFLINE PERFORMANCE BENCHMARK
+# ==============================================================================
+# Runs the real orchestration code against the fake model, so numbers move
+# only when our code (or the configured latency profile) changes.
+#
+#   python benchmark.py --sizes 1000,100000 --concurrency 1,4,16 --out bench.json
+#   python benchmark.py --compare bench_prev.json --out bench.json
+#   python benchmark.py --startup 5 --sizes "" --out bench.json   # cold start only
+
+logger = logging.getLogger("Benchmark")
+DEFAULT_SIZES = (1_000, 50_000, 500_000)
+DEFAULT_CONCURRENCY = (1, 4, 16)
+CATEGORIES = ["Rent", "Payroll", "Marketing", "Inventory", "Utilities", "Software", "Sales", "Services"]
+
+def synthetic_ledger(rows, seed=0):
+    """Date/Category/Amount/Type ledger with `rows` rows, as CSV bytes."""
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D")
+    category = rng.choice(CATEGORIES, rows)
+    revenue = np.isin(category, ["Sales", "Services"])
+    return pd.DataFrame({
+        "Date": dates.strftime("%Y-%m-%d"),
+        "Category": category,
+        "Amount": rng.gamma(2.0, 400.0, rows).round(2),
+        "Type": np.where(revenue, "Revenue", "Expense"),
+    }).to_csv(index=False).encode()
+
+def percentiles(samples):
+    """p50/p95/p99/mean of `samples` (all None when empty)."""
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None, "mean": None}
+    arr = np.asarray(samples)
+    return {
+        "p50": float(np.percentile(arr, 50)), "p95": float(np.percentile(arr, 95)),
+        "p99": float(np.percentile(arr, 99)), "mean": float(arr.mean()),
+    }
+
+def _cpu_seconds():
+    """CPU time of this process plus reaped children (sandbox workers)."""
+    me = resource.getrusage(resource.RUSAGE_SELF)
+    kids = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return me.ru_utime + me.ru_stime + kids.ru_utime + kids.ru_stime
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+
+def run_case(name, fn, iterations, concurrency, **params):
+    """
+    Runs `fn` `iterations` times at `concurrency`; returns latency/throughput/CPU/RSS.
+    cpu_s / peak_rss_mb cover the whole process; with observability.SAMPLE_RESOURCES
+    each entry of "stages" also has its own CPU and RSS (see MetricsRegistry.summary).
+    """
+    METRICS.reset()
+    get_guard().reset()
+    latencies, errors = [], 0
+
+    def one(_):
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
+
+    cpu_start = _cpu_seconds()
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(one, i) for i in range(iterations)]:
+            try:
+                latencies.append(future.result())
+            except Exception as e:
+                errors += 1
+                logger.warning(f"{name}: {e}")
+    wall = time.perf_counter() - wall_start
+
+    result = {
+        "case": name,
+        "params": dict(params, iterations=iterations, concurrency=concurrency),
+        "latency": percentiles(latencies),
+        "throughput_per_s": len(latencies) / wall if wall else None,
+        "wall_s": wall,
+        "cpu_s": _cpu_seconds() - cpu_start,
+        "peak_rss_mb": _peak_rss_mb(),
+        "errors": errors,
+        "stages": METRICS.summary(),
+        "calls": get_guard().stats(),
+    }
+    logger.info(f"{name} {params} c={concurrency}: p50={result['latency']['p50']} "
+                f"p95={result['latency']['p95']} thr={result['throughput_per_s']:.2f}/s")
+    return result
+
+def run_startup(runs):
+    """Time-to-first-request over `runs` fresh interpreters (see startup.probe)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, os.path.join(here, "startup.py"), "--probe"],
+                             cwd=here, capture_output=True, text=True, check=True).stdout
+        probe = json.loads(out.strip().splitlines()[-1])
+        probe["process"] = time.perf_counter() - start  # Includes interpreter start-up
+        samples.append(probe)
+    result = {"case": "startup", "params": {"runs": runs}}
+    for key in ("import", "warm_up", "first_request", "process"):
+        result[key] = percentiles([p[key] for p in samples])
+    result["latency"] = result["process"]
+    result["throughput_per_s"] = None
+    logger.info(f"startup x{runs}: import p50={result['import']['p50']:.3f}s "
+                f"first request p50={result['first_request']['p50']:.3f}s process p50={result['process']['p50']:.3f}s")
+    return result
+
+def git_revision():
+    """Short HEAD hash of this checkout, or None outside git."""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(sizes=DEFAULT_SIZES, concurrency=DEFAULT_CONCURRENCY, iterations=20,
+              latency=None, policy=None, recording=None):
+    """Tool, worker and full-workflow cases over every size × concurrency."""
+    from agent_workers import execute_pandas_analysis, FinancialAnalyst
+    from dataset_store import get_store, active_dataset
+    from manager_agent import BoardroomManager
+
+    store = get_store()
+    results = []
+    with fake_vertex(policy=policy, latency=latency, recording=recording):
+        manager = BoardroomManager()
+        analyst = FinancialAnalyst()
+        for rows in sizes:
+            dataset_id = store.put_bytes(synthetic_ledger(rows))
+
+            def tool():
+                token = active_dataset.set(dataset_id)
+                try:
+                    out = execute_pandas_analysis(PNL_CODE)
+                finally:
+                    active_dataset.reset(token)
+                if out.startswith(("Error", "Execution Error")):
+                    raise RuntimeError(out)
+
+            def worker():
+                analyst.run("TASK: Perform a detailed P&L analysis.", use_cache=False, dataset_id=dataset_id)
+
+            def workflow():
+                manager.execute_workflow("Coffee Shop", "Grow revenue 20%", "London, UK", "GBP",
+                                         dataset_id, use_cache=False)
+
+            for c in concurrency:
+                results.append(run_case("execute_pandas_analysis", tool, iterations, c, rows=rows))
+                results.append(run_case("WorkerAgent.run", worker, iterations, c, rows=rows))
+                results.append(run_case("execute_workflow", workflow, iterations, c, rows=rows))
+    return {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "model_calls": FakeGenerativeModel.calls,
+        "results": results,
+    }
+
+def compare(current, baseline):
+    """Prints p50/p95/throughput deltas against a previous results file."""
+    key = lambda r: (r["case"], json.dumps(r["params"], sort_keys=True))
+    previous = {key(r): r for r in baseline["results"]}
+    print(f"Comparing {current.get('revision')} against {baseline.get('revision')}")
+    for r in current["results"]:
+        old = previous.get(key(r))
+        if not old:
+            continue
+        deltas = []
+        for label, new_v, old_v in (
+            ("p50", r["latency"]["p50"], old["latency"]["p50"]),
+            ("p95", r["latency"]["p95"], old["latency"]["p95"]),
+            ("thr", r["throughput_per_s"], old["throughput_per_s"]),
+        ):
+            if new_v is not None and old_v:
+                deltas.append(f"{label} {(new_v - old_v) / old_v * 100:+.1f}%")
+        print(f"{r['case']:<26} {r['params']}: {', '.join(deltas)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Virtual Boardroom benchmark (fake Vertex model).")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="CSV row counts")
+    parser.add_argument("--concurrency", default=",".join(map(str, DEFAULT_CONCURRENCY)))
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--flash-latency", default="lognormal:0.8:0.3", help="kind:median[:sigma|spread]")
+    parser.add_argument("--pro-latency", default="lognormal:3.0:0.4")
+    parser.add_argument("--tool-turns", type=int, default=1)
+    parser.add_argument("--calls-per-turn", type=int, default=1)
+    parser.add_argument("--recording", help="JSONL of recorded responses to replay")
+    parser.add_argument("--startup", type=int, default=0, help="Cold-start runs (time to first request)")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="Previous results file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    observability.EXPORT_SPANS = False  # Keep benchmark spans out of logs/spans.jsonl
+    observability.SAMPLE_RESOURCES = True  # CPU/RSS per stage span, under each case's "stages"
+
+    report = run_suite(
+        sizes=[int(s) for s in args.sizes.split(",") if s],
+        concurrency=[int(c) for c in args.concurrency.split(",") if c],
+        iterations=args.iterations,
+        latency={"gemini-2.5-flash": LatencyModel.parse(args.flash_latency),
+                 "gemini-2.5-pro": LatencyModel.parse(args.pro_latency)},
+        policy=ScriptedPolicy(tool_turns=args.tool_turns, calls_per_turn=args.calls_per_turn),
+        recording=load_recording(args.recording) if args.recording else None,
+    )
+    if args.startup:
+        report["results"].append(run_startup(args.startup))
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(report['results'])} results to {args.out}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare(report, json.load(f))
+
+if __name__ == "__main__":
+    main()
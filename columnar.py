@@ -0,0 +1,150 @@
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("Columnar")
+
+# --- CONFIGURATION ---
+CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", "200000"))  # Rows parsed per chunk
+FORMAT_VERSION = 1
+_DATE_COLUMN = re.compile(r"(^|_|\s)date$", re.IGNORECASE)
+# The ledger columns have fixed kinds; a value that doesn't fit aborts the
+# conversion (the dataset then stays CSV) instead of being stored as text.
+LEDGER_SCHEMA = {"Date": "datetime", "Category": "category", "Amount": "float", "Type": "category"}
+
+# ==============================================================================
+# 🧱 COLUMNAR LEDGER FORMAT
+# ==============================================================================
+# A directory with one raw little-endian array per column plus meta.json:
+#   float     -> float64            (Amount and any other numeric column)
+#   datetime  -> datetime64[ns]     (Date)
+#   category  -> int32 codes + the category list in meta.json (Category, Type, text)
+# The CSV is converted chunk by chunk, so peak memory is one chunk, and the
+# arrays are memory-mapped on read, so a frame costs page cache, not heap.
+
+class SchemaError(ValueError):
+    """The CSV can't be stored losslessly in the compact schema."""
+
+def _kind(name, sample: pd.Series):
+    if name in LEDGER_SCHEMA:
+        return LEDGER_SCHEMA[name]
+    values = sample.dropna()
+    if values.empty:
+        return "category"
+    if pd.to_numeric(values, errors="coerce").notna().all():
+        return "float"
+    if _DATE_COLUMN.search(str(name)) and pd.to_datetime(values, errors="coerce").notna().all():
+        return "datetime"
+    return "category"
+
+def infer_schema(sample: pd.DataFrame):
+    """{column: "float" | "datetime" | "category"} from a string-typed sample."""
+    return {name: _kind(name, sample[name]) for name in sample.columns}
+
+def _convert(name, kind, values: pd.Series, categories):
+    """One chunk of one column -> numpy array. Raises SchemaError rather than drop data."""
+    if kind == "float":
+        return values.to_numpy(dtype="float64")  # Parsed by read_csv
+    if kind == "datetime":
+        out = pd.to_datetime(values, errors="coerce")
+        bad = out.isna() & values.notna()
+        if bad.any():
+            raise SchemaError(f"column {name!r}: unparseable date {values[bad].iloc[0]!r}")
+        return out.to_numpy(dtype="datetime64[ns]")
+    # category: extend the dictionary with unseen values, then encode
+    for value in values.dropna().unique():
+        if value not in categories:
+            categories[value] = len(categories)
+    return values.map(categories).fillna(-1).to_numpy(dtype="int32")
+
+def convert_csv(csv_path, out_dir, chunk_rows=CHUNK_ROWS):
+    """
+    Streams `csv_path` into the columnar layout at `out_dir` (written to a temp
+    directory and renamed, so readers never see a partial conversion).
+    Returns the metadata dict. Raises SchemaError if a column changes type.
+    """
+    parent = os.path.dirname(os.path.abspath(out_dir))
+    tmp_dir = tempfile.mkdtemp(dir=parent, suffix=".part")
+    files = {}
+    try:
+        # Kinds come from a sample; numeric columns are then parsed by the C
+        # reader directly, everything else arrives as strings
+        schema = infer_schema(pd.read_csv(csv_path, nrows=chunk_rows, dtype=str))
+        if not schema:
+            raise SchemaError("empty CSV")
+        dtypes = {name: "float64" if kind == "float" else str for name, kind in schema.items()}
+        categories, rows = {name: {} for name in schema}, 0
+        for i, name in enumerate(schema):
+            files[name] = open(os.path.join(tmp_dir, f"{i}.bin"), "wb")
+        try:
+            for chunk in pd.read_csv(csv_path, chunksize=chunk_rows, dtype=dtypes):
+                for name, kind in schema.items():
+                    _convert(name, kind, chunk[name], categories[name]).tofile(files[name])
+                rows += len(chunk)
+        except (ValueError, TypeError) as e:
+            if isinstance(e, SchemaError):
+                raise
+            raise SchemaError(str(e).splitlines()[0]) from e
+        for f in files.values():
+            f.close()
+
+        meta = {
+            "version": FORMAT_VERSION,
+            "rows": rows,
+            "columns": [
+                {"name": name, "kind": kind, "file": f"{i}.bin",
+                 "dtype": {"float": "<f8", "datetime": "<M8[ns]", "category": "<i4"}[kind],
+                 **({"categories": list(categories[name])} if kind == "category" else {})}
+                for i, (name, kind) in enumerate(schema.items())
+            ],
+        }
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_dir, out_dir)
+        return meta
+    except BaseException:
+        for f in files.values():
+            f.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+def read_meta(path):
+    with open(os.path.join(path, "meta.json"), "r") as f:
+        return json.load(f)
+
+def read_frame(path) -> pd.DataFrame:
+    """
+    DataFrame over the memory-mapped columns at `path` (read-only arrays, no
+    parsing). A plain CSV path is read with pandas, for datasets that never
+    converted.
+    """
+    if not os.path.isdir(path):
+        return pd.read_csv(path)
+    meta = read_meta(path)
+    rows = meta["rows"]
+    data = {}
+    for col in meta["columns"]:
+        dtype = np.dtype(col["dtype"])
+        arr = (np.memmap(os.path.join(path, col["file"]), dtype=dtype, mode="r", shape=(rows,))
+               if rows else np.empty(0, dtype=dtype))
+        if col["kind"] == "category":
+            arr = pd.Categorical.from_codes(arr, categories=col["categories"])
+        data[col["name"]] = arr
+    df = pd.DataFrame(data, copy=False)
+    df.attrs["memory_mapped"] = True
+    return df
+
+def iter_chunks(path, chunk_rows=CHUNK_ROWS):
+    """Row-range views over a columnar dataset (or CSV chunks), for chunked aggregation."""
+    if not os.path.isdir(path):
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+        return
+    df = read_frame(path)
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
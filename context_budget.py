@@ -0,0 +1,128 @@
+import logging
+import os
+import re
+
+from model_tiering import estimate_tokens
+
+logger = logging.getLogger("Context")
+
+# --- CONFIGURATION ---
+TOOL_RESULT_TOKENS = int(os.getenv("WORKER_TOOL_RESULT_TOKENS", "2000"))  # A tool result above this is summarized
+CONTEXT_TOKENS = int(os.getenv("WORKER_CONTEXT_TOKENS", "16000"))         # Worker history above this compacts old results
+KEEP_RECENT = 1          # Newest tool exchanges never compacted
+HEAD_LINES = 15          # Lines kept from the top of an oversized result...
+TAIL_LINES = 5           # ...and from the bottom
+MAX_LINE_CHARS = 240
+STUB_CHARS = 300         # What a compacted old result keeps
+STATS_COLUMNS = 12
+COMPACTED = "[compacted:"
+_FIELD = re.compile(r"\S+")
+_NUMBER = re.compile(r"^[-+(]?[$€£₹]?\d[\d,]*\.?\d*(?:[eE][-+]?\d+)?%?\)?$")
+
+# ==============================================================================
+# 📏 WORKER CONTEXT BUDGET
+# ==============================================================================
+# Tool results go back to the model inside the chat history and are resent
+# on every later turn, so one stray print(df) would be paid for again and
+# again. Oversized results are cut to head/tail plus describe()-style stats
+# of the omitted rows; once the whole history passes CONTEXT_TOKENS, older
+# results shrink to short stubs. Token counts use the same ~4 chars/token
+# estimate as the tiering policy.
+
+def _to_float(field):
+    return float(field.strip("()$€£₹%+-").replace(",", "")) * (-1 if field.startswith(("(", "-")) else 1)
+
+def _describe(lines, header):
+    """
+    Per-column count/mean/min/max/sum over the omitted rows of a printed
+    table (rows split on whitespace; the most common field count wins).
+    Falls back to the same stats over every number in the text.
+    """
+    import numpy as np
+
+    rows = [_FIELD.findall(line) for line in lines]
+    widths = [len(r) for r in rows if r]
+    if not widths:
+        return ""
+    width = max(set(widths), key=widths.count)
+    table = [r for r in rows if len(r) == width]
+    names = _FIELD.findall(header)
+    # pandas prints the index without a header: right-align the names
+    names = [""] * (width - len(names)) + names if len(names) <= width else [""] * width
+
+    stats = []
+    if len(table) >= max(3, len(rows) // 2):
+        cells = np.array(table, dtype=object)
+        for col in range(width):
+            column = cells[:, col]
+            numeric = np.array([bool(_NUMBER.match(v)) for v in column])
+            # Skip the unnamed pandas index when the table has a header
+            if numeric.mean() < 0.9 or (not names[col] and any(names)):
+                continue
+            stats.append((names[col] or f"col{col}", np.array([_to_float(v) for v in column[numeric]])))
+    if not stats:
+        values = [_to_float(f) for r in rows for f in r if _NUMBER.match(f)]
+        if not values:
+            return ""
+        stats = [("numbers", np.array(values))]
+    described = [
+        f"{name}: count={len(v)} mean={v.mean():.4g} min={v.min():.4g} max={v.max():.4g} sum={v.sum():.6g}"
+        for name, v in stats[:STATS_COLUMNS]
+    ]
+    return "Stats over omitted rows: " + "; ".join(described)
+
+def bound_result(text, max_tokens=TOOL_RESULT_TOKENS):
+    """
+    Returns (text, tokens_saved). Text within `max_tokens` comes back
+    unchanged; larger text is cut to its first HEAD_LINES and last
+    TAIL_LINES lines plus a stats line for what was dropped.
+    """
+    if not isinstance(text, str) or estimate_tokens(text) <= max_tokens:
+        return text, 0
+    lines = text.splitlines()
+    clip = lambda line: line if len(line) <= MAX_LINE_CHARS else line[:MAX_LINE_CHARS] + "…"
+    if len(lines) > HEAD_LINES + TAIL_LINES:
+        head, middle, tail = lines[:HEAD_LINES], lines[HEAD_LINES:-TAIL_LINES], lines[-TAIL_LINES:]
+    else:
+        head, middle, tail = lines, [], []
+    note = (f"[... {len(middle)} of {len(lines)} lines ({len(text):,} chars) omitted to fit the context budget. "
+            f"Print aggregates instead of whole tables. {_describe(middle, lines[0] if lines else '')}]")
+    bounded = "\n".join([*map(clip, head), note, *map(clip, tail)])
+    # Very long single lines: hard cap
+    max_chars = max_tokens * 4
+    if len(bounded) > max_chars:
+        bounded = bounded[:max_chars] + f"\n[... truncated at {max_chars:,} of {len(text):,} chars]"
+    return bounded, estimate_tokens(text) - estimate_tokens(bounded)
+
+def compact_history(history, budget=CONTEXT_TOKENS, keep_recent=KEEP_RECENT):
+    """
+    Shrinks tool results in older turns of a worker history (list of
+    Content) to STUB_CHARS each, oldest first, until it fits `budget`.
+    The task and the newest `keep_recent` tool exchanges are left intact,
+    as are function calls, so each call still has its response.
+    Returns the estimated tokens saved.
+    """
+    before = estimate_tokens(history)
+    if before <= budget:
+        return 0
+    from vertexai.generative_models import Content
+
+    # Tool results live in user turns after the first (the task)
+    exchanges = [i for i in range(1, len(history)) if history[i].role == "user"]
+    size = before
+    for i in exchanges[:-keep_recent] if keep_recent else exchanges:
+        data = history[i].to_dict()
+        changed = False
+        for part in data.get("parts", []):
+            response = part.get("function_response", {}).get("response", {})
+            content = response.get("content")
+            if isinstance(content, str) and len(content) > STUB_CHARS and COMPACTED not in content:
+                response["content"] = (f"{content[:STUB_CHARS]}\n{COMPACTED} {len(content) - STUB_CHARS:,} chars "
+                                       "of this earlier result dropped to fit the context budget]")
+                changed = True
+        if changed:
+            history[i] = Content.from_dict(data)
+            size = estimate_tokens(history)
+            if size <= budget:
+                break
+    return before - size
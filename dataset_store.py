@@ -0,0 +1,268 @@
+import contextvars
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd  # Imported on first load (cold start)
+
+logger = logging.getLogger("DatasetStore")
+
+# --- CONFIGURATION ---
+# CLOUD FIX: Use /tmp for uploads in production
+if os.path.exists("/tmp"):
+    DATASET_DIR = "/tmp/boardroom_datasets"
+else:
+    DATASET_DIR = "boardroom_datasets"
+
+FRAME_BUDGET_BYTES = 512 * 1024 * 1024  # Parsed DataFrames kept in memory
+COPY_BLOCK = 1024 * 1024                # Bytes per read when streaming an upload to disk
+LEGACY_CSV = "financials.csv"           # The one file path `resolve` still ingests (pre-store callers)
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+
+# The dataset the current worker run is analysing. Set by WorkerAgent.run so
+# tools resolve the caller's data instead of a shared global path.
+active_dataset = contextvars.ContextVar("active_dataset", default=None)
+NO_DATASET = "Error: no dataset uploaded. Upload a CSV before asking for an analysis."
+
+# ==============================================================================
+# 📦 CONTENT-ADDRESSED DATASET STORE
+# ==============================================================================
+
+class DatasetStore:
+    """
+    Uploads are stored once per SHA-256 of their bytes, so identical files from
+    different sessions share one copy. The digest is the session's handle.
+    Each CSV is converted once to the memory-mapped columnar layout
+    (<digest>.cols/, see columnar.py); CSVs that don't fit the compact schema
+    are parsed with pandas instead. Frames live in an LRU bounded by size.
+    """
+    def __init__(self, root=DATASET_DIR, budget_bytes=FRAME_BUDGET_BYTES):
+        self.root = root
+        self.budget_bytes = budget_bytes
+        self._frames = OrderedDict()  # digest -> (DataFrame, nbytes)
+        self._frame_bytes = 0
+        self._profiles = {}           # digest -> profile dict (or None)
+        self._columnar = {}           # digest -> columnar dir, or None if the CSV didn't convert
+        self._convert_locks = {}
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "loads": 0, "evictions": 0, "dedups": 0, "conversions": 0}
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, digest):
+        return os.path.join(self.root, f"{digest}.csv")
+
+    def exists(self, digest):
+        return bool(digest) and bool(_DIGEST.match(digest)) and os.path.exists(self.path(digest))
+
+    def resolve(self, handle):
+        """
+        Accepts a digest or the legacy LEGACY_CSV path older callers pass, and
+        returns a digest, or None. Other paths are never read, so no arbitrary
+        readable file is silently ingested as a dataset.
+        """
+        if self.exists(handle):
+            return handle
+        if handle and os.path.basename(str(handle)) == LEGACY_CSV and os.path.isfile(handle):
+            return self.put_file(handle)
+        return None
+
+    def put_bytes(self, data: bytes) -> str:
+        """Stores raw CSV bytes and returns their digest (the dataset handle)."""
+        return self.put_stream(io.BytesIO(data))
+
+    def put_file(self, file_path) -> str:
+        with open(file_path, "rb") as f:
+            return self.put_stream(f)
+
+    def put_stream(self, fileobj) -> str:
+        """
+        Copies a binary file object to disk in COPY_BLOCK pieces while hashing
+        it, so an upload is never parsed or held in memory twice.
+        """
+        hasher = hashlib.sha256()
+        size = 0
+        # Atomic write: concurrent uploads of the same file never see a partial copy
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    block = fileobj.read(COPY_BLOCK)
+                    if not block:
+                        break
+                    hasher.update(block)
+                    f.write(block)
+                    size += len(block)
+            digest = hasher.hexdigest()
+            target = self.path(digest)
+            if os.path.exists(target):
+                os.remove(tmp_path)
+                with self._lock:
+                    self.counters["dedups"] += 1
+                return digest
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        logger.info(f"📦 Stored dataset {digest[:12]} ({size} bytes).")
+        return digest
+
+    def ingest(self, fileobj) -> str:
+        """Upload path: stream to disk, convert to columnar and profile, all chunked."""
+        digest = self.put_stream(fileobj)
+        self.columnar(digest)
+        self.profile(digest)
+        return digest
+
+    def columnar(self, digest):
+        """
+        Path of the columnar copy of `digest`, converting the CSV on first use.
+        None when the CSV doesn't fit the compact schema (callers fall back to it).
+        """
+        with self._lock:
+            if digest in self._columnar:
+                return self._columnar[digest]
+            convert_lock = self._convert_locks.setdefault(digest, threading.Lock())
+
+        from columnar import convert_csv, SchemaError, FORMAT_VERSION, read_meta
+        out_dir = os.path.join(self.root, f"{digest}.cols")
+        with convert_lock:
+            with self._lock:
+                if digest in self._columnar:
+                    return self._columnar[digest]
+            result = None
+            try:
+                if os.path.isdir(out_dir) and read_meta(out_dir).get("version") == FORMAT_VERSION:
+                    result = out_dir
+                elif self.exists(digest):
+                    if os.path.isdir(out_dir):
+                        shutil.rmtree(out_dir, ignore_errors=True)
+                    meta = convert_csv(self.path(digest), out_dir)
+                    result = out_dir
+                    with self._lock:
+                        self.counters["conversions"] += 1
+                    logger.info(f"🧱 Columnar copy of {digest[:12]} ({meta['rows']} rows).")
+            except SchemaError as e:
+                logger.info(f"🧱 {digest[:12]} stays CSV: {e}")
+            except Exception as e:
+                logger.error(f"⚠️ Columnar conversion failed for {digest[:12]}: {e}")
+            with self._lock:
+                self._columnar[digest] = result
+            return result
+
+    def data_path(self, digest):
+        """What a reader should open for `digest`: the columnar dir if there is one, else the CSV."""
+        return self.columnar(digest) or self.path(digest)
+
+    def load(self, digest) -> "pd.DataFrame":
+        """
+        Returns the frame for `digest`: memory-mapped columns when the dataset
+        converted, otherwise the CSV parsed on first use. Callers get a copy
+        (shallow for read-only mapped columns) so tool code can't mutate the
+        cached frame.
+        """
+        with self._lock:
+            entry = self._frames.get(digest)
+            if entry is not None:
+                self._frames.move_to_end(digest)
+                self.counters["hits"] += 1
+                return self._copy(entry[0])
+
+        if not self.exists(digest):
+            raise FileNotFoundError(f"Dataset {digest} not found.")
+        from columnar import read_frame
+        mapped = self.columnar(digest)
+        df = read_frame(mapped or self.path(digest))
+        # Mapped columns count too: the budget also bounds open mappings
+        nbytes = int(df.memory_usage(deep=True).sum())
+
+        with self._lock:
+            self.counters["loads"] += 1
+            if digest not in self._frames and nbytes <= self.budget_bytes:
+                self._frames[digest] = (df, nbytes)
+                self._frame_bytes += nbytes
+                while self._frame_bytes > self.budget_bytes:
+                    _, (_, evicted) = self._frames.popitem(last=False)
+                    self._frame_bytes -= evicted
+                    self.counters["evictions"] += 1
+        return self._copy(df)
+
+    @staticmethod
+    def _copy(df):
+        return df.copy(deep=not df.attrs.get("memory_mapped", False))
+
+    def head(self, digest, rows=1000):
+        """First `rows` rows, for previews (never materializes the full CSV)."""
+        mapped = self.columnar(digest)
+        if mapped:
+            return self.load(digest).head(rows)
+        import pandas as pd
+        return pd.read_csv(self.path(digest), nrows=rows)
+
+    def profile(self, digest):
+        """
+        Financial profile for `digest`, computed once per dataset and stored
+        next to it as <digest>.profile.json. None if the CSV isn't a ledger.
+        """
+        with self._lock:
+            if digest in self._profiles:
+                return self._profiles[digest]
+
+        profile_path = os.path.join(self.root, f"{digest}.profile.json")
+        profile = None
+        try:
+            if os.path.exists(profile_path):
+                with open(profile_path, "r") as f:
+                    profile = json.load(f)
+            else:
+                from columnar import iter_chunks
+                from financial_profile import compute_profile_chunks
+                profile = compute_profile_chunks(iter_chunks(self.data_path(digest)))
+                fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+                with os.fdopen(fd, "w") as f:
+                    json.dump(profile, f)
+                os.replace(tmp_path, profile_path)
+                logger.info(f"📈 Profiled dataset {digest[:12]}.")
+        except Exception as e:
+            logger.error(f"⚠️ Profiling failed for {digest[:12]}: {e}")
+
+        with self._lock:
+            self._profiles[digest] = profile
+        return profile
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["frames"] = len(self._frames)
+            stats["frame_bytes"] = self._frame_bytes
+        return stats
+
+# --- SHARED INSTANCE ---
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Process-wide store shared by every Streamlit session."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DatasetStore()
+        return _store
+
+def active_dataset_id():
+    """
+    Digest of the dataset the current run is analysing, or None when the run
+    has none (or names one the store doesn't hold). Never falls back to a
+    shared file: every session analyses only what it uploaded.
+    """
+    dataset_id = active_dataset.get()
+    return dataset_id if get_store().exists(dataset_id) else None
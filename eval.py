@@ -1,86 +1,424 @@
-import os
+import argparse
+import asyncio
+import json
+import logging
+import re
 import sys
+import time
+
+import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
-import vertexai
-from vertexai.generative_models import GenerativeModel
-import logging
 
-# Import the Worker we want to test
+import observability
+from observability import span
 from agent_workers import FinancialAnalyst
+from model_registry import get_worker, get_model
+from llm_cache import cached_generate_async
+from dataset_store import get_store
+from fake_model import ScriptedPolicy, fake_vertex, tool_names, tool_turns, prompt_text
+from benchmark import percentiles, git_revision
+
+# ==============================================================================
+# 🧪 ACCURACY EVALUATION
+# ==============================================================================
+# Runs the CFO over synthetic ledgers whose true P&L is known. Numbers in
+# the report are checked by a deterministic parser; the LLM judge only
+# grades the qualitative rubric (verdicts go through the response cache,
+# so an unchanged report is never judged twice). Accuracy is reported next
+# to latency and token cost per case.
+#
+#   python eval.py --shapes profitable,loss,messy --sizes 200,20000 --seeds 2 --out eval.json
+#   python eval.py --compare eval_prev.json --out eval.json   # exit 1 on regression
+#   python eval.py --dry-run --no-judge                       # offline, fake model
 
 # --- CONFIGURATION ---
 load_dotenv()
-logging.basicConfig(level=logging.ERROR) # Quiet logs for clean output
-
-# Initialize Vertex
-project_id = os.getenv("GCP_PROJECT_ID")
-if project_id:
-    try:
-        vertexai.init(project=project_id, location="us-central1")
-    except: pass
-
-# --- 1. THE GOLDEN DATASET (Ground Truth) ---
-# We create a temporary CSV with known values to test against.
-def setup_test_environment():
-    data = {
-        "Date": ["2025-01-01", "2025-01-02"],
-        "Category": ["Rent", "Sales"],
-        "Amount": [2500, 5000],
-        "Type": ["Expense", "Revenue"]
+logger = logging.getLogger("Eval")
+JUDGE_MODEL = "gemini-2.5-pro"
+DEFAULT_SHAPES = ("profitable", "loss", "seasonal", "concentrated", "messy")
+DEFAULT_SIZES = (200, 20_000)
+CASE_TIMEOUT = 300.0         # Seconds per CFO run
+REL_TOLERANCE = 0.005        # Figures within 0.5% of the truth pass...
+ABS_TOLERANCE = 1.0          # ...or within one currency unit (rounding)
+MARGIN_TOLERANCE = 0.15      # Percentage points
+WINDOW = 80                  # Characters after a label searched for its figure
+# Regression gates for --compare
+MAX_ACCURACY_DROP = 0.02     # Absolute drop in numeric accuracy
+MAX_SLOWDOWN = 0.20          # Relative growth in p95 latency or tokens per case
+# List prices, USD per 1M tokens (input, output); edit to match your contract
+PRICES = {
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+}
+
+TASK = ("TASK: Analyse the ledger. Report total revenue, total expenses, net profit, profit margin (%) "
+        "and the largest expense category with its total, then give three recommendations.")
+REVENUE_CATEGORIES = ["Sales", "Services", "Subscriptions"]
+EXPENSE_CATEGORIES = ["Rent", "Payroll", "Marketing", "Inventory", "Utilities", "Software", "Logistics"]
+QUALITATIVE = {
+    "grounded": "Every recommendation is tied to a specific figure from the analysis.",
+    "cost_driver": "It names the largest cost driver and explains the risk or lever it represents.",
+    "method": "It says the figures were computed from the data with code or analytics tools, not estimated.",
+}
+
+# ==============================================================================
+# 📒 SYNTHETIC LEDGERS (known ground truth)
+# ==============================================================================
+
+def synthetic_case(shape, rows, seed=0):
+    """
+    Date/Category/Amount/Type ledger of `rows` rows in a given shape, as
+    (CSV bytes, truth). Shapes: profitable, loss, seasonal, concentrated
+    (one cost dominates) and messy (Type aliases, negative expense amounts).
+    """
+    rng = np.random.default_rng(seed)
+    rows = max(int(rows), 2)
+    day = rng.integers(0, 365, rows)
+    is_revenue = rng.random(rows) < {"loss": 0.25, "profitable": 0.5}.get(shape, 0.4)
+    is_revenue[:2] = (True, False)  # At least one of each
+
+    expense_weights = np.ones(len(EXPENSE_CATEGORIES))
+    if shape == "concentrated":
+        expense_weights[1] = 12.0
+    category = np.where(
+        is_revenue,
+        rng.choice(REVENUE_CATEGORIES, rows),
+        rng.choice(EXPENSE_CATEGORIES, rows, p=expense_weights / expense_weights.sum()),
+    )
+    amount = np.where(is_revenue, rng.gamma(2.0, 600.0, rows),
+                      rng.gamma(2.0, 900.0 if shape == "loss" else 400.0, rows))
+    if shape == "seasonal":
+        amount = np.where(is_revenue, amount * (1 + 0.6 * np.sin(2 * np.pi * day / 365)), amount)
+    amount = amount.round(2)
+
+    signed = amount.copy()
+    types = np.where(is_revenue, "Revenue", "Expense").astype(object)
+    if shape == "messy":
+        types = np.where(is_revenue, rng.choice(["revenue", "Income", " Sales ", "REV"], rows),
+                         rng.choice(["expense", "Cost", "EXPENSES", "cost of goods"], rows))
+        signed = np.where(~is_revenue & (rng.random(rows) < 0.5), -amount, amount)
+
+    revenue = float(amount[is_revenue].sum())
+    expenses = float(amount[~is_revenue].sum())
+    by_category = pd.Series(amount[~is_revenue]).groupby(category[~is_revenue]).sum()
+    truth = {
+        "revenue": revenue,
+        "expenses": expenses,
+        "net_profit": revenue - expenses,
+        "margin_pct": (revenue - expenses) / revenue * 100,
+        "top_expense": str(by_category.idxmax()),
+        "top_expense_amount": float(by_category.max()),
     }
-    df = pd.DataFrame(data)
-    df.to_csv("financials.csv", index=False)
-    # The Truth: Profit = 5000 - 2500 = 2500
-    return "Net Profit is 2500. Rent is 2500."
+    csv = pd.DataFrame({
+        "Date": (pd.Timestamp("2024-01-01") + pd.to_timedelta(day, unit="D")).strftime("%Y-%m-%d"),
+        "Category": category,
+        "Amount": signed,
+        "Type": types,
+    }).to_csv(index=False).encode()
+    return csv, truth
+
+# ==============================================================================
+# 🔢 DETERMINISTIC NUMERIC CHECKS
+# ==============================================================================
+
+LABELS = {
+    "revenue": r"\b(?:total\s+)?(?:revenue|sales|turnover|income)\b",
+    "expenses": r"\b(?:total\s+)?(?:expenses?|costs|spend(?:ing)?)\b",
+    "net_profit": r"\bnet(?:\s+(?:profit|income|loss|result))?\b|\bprofit\b|\bloss\b",
+    "margin_pct": r"\bmargin\b",
+}
+_NUMBER = re.compile(
+    r"(?P<open>\()?(?P<neg>[-−])?\s?[$€£₹]?\s?(?P<int>\d{1,3}(?:,\d{3})+|\d+)(?P<frac>\.\d+)?"
+    r"(?:\s?(?P<unit>thousand|million|billion|mn|bn|[kKmMbB])(?![A-Za-z]))?\s?(?P<pct>%)?(?P<close>\))?"
+)
+_UNITS = {"k": 1e3, "thousand": 1e3, "m": 1e6, "mn": 1e6, "million": 1e6, "b": 1e9, "bn": 1e9, "billion": 1e9}
+
+def parse_numbers(text):
+    """Every figure in `text` as (value, resolution): '$1.2M' -> (1_200_000, 100_000), '(450)' -> (-450, 1)."""
+    numbers = []
+    for m in _NUMBER.finditer(text):
+        scale = _UNITS.get((m["unit"] or "").lower(), 1.0)
+        frac = m["frac"] or ""
+        value = float(m["int"].replace(",", "") + frac) * scale
+        if m["neg"] or (m["open"] and m["close"]):
+            value = -value
+        numbers.append((value, 10.0 ** -max(len(frac) - 1, 0) * scale))
+    return numbers
+
+def _window(text, pos):
+    """The rest of the line after `pos` (the next line too if this one has no digits), capped at WINDOW."""
+    end = text.find("\n", pos)
+    if end == -1 or not any(ch.isdigit() for ch in text[pos:end]):
+        end = text.find("\n", end + 1) if end != -1 else -1
+    return text[pos: end if end != -1 else len(text)][:WINDOW]
+
+def _matches(value, resolution, truth, tolerance):
+    # Rounded figures ("$1.2M") pass within half their last digit, capped at 5%
+    allowed = max(tolerance, REL_TOLERANCE * abs(truth), min(resolution / 2, 0.05 * abs(truth)))
+    return abs(value - truth) <= allowed + 1e-9
+
+def check_claim(text, label, truth, tolerance=ABS_TOLERANCE):
+    """
+    Looks for `truth` in the figures after each `label` match. Returns
+    {"truth", "status": ok | wrong | missing, "seen": [first figures found]}.
+    A figure after "loss" counts as negative.
+    """
+    seen = []
+    for m in re.finditer(label, text, re.IGNORECASE):
+        is_loss = "loss" in m.group(0).lower()
+        for value, resolution in parse_numbers(_window(text, m.end())):
+            value = -abs(value) if is_loss else value
+            seen.append(value)
+            if _matches(value, resolution, truth, tolerance):
+                return {"truth": round(truth, 2), "status": "ok", "seen": [value]}
+    return {"truth": round(truth, 2), "status": "wrong" if seen else "missing", "seen": seen[:5]}
+
+def check_numbers(text, truth):
+    """Deterministic checks of every numeric claim the task asks for."""
+    claims = {
+        metric: check_claim(text, LABELS[metric], truth[metric],
+                            MARGIN_TOLERANCE if metric == "margin_pct" else ABS_TOLERANCE)
+        for metric in ("revenue", "expenses", "net_profit", "margin_pct")
+    }
+    # The largest expense must be named with its own total
+    claims["top_expense"] = check_claim(text, rf"\b{re.escape(truth['top_expense'])}\b", truth["top_expense_amount"])
+    return claims
+
+# ==============================================================================
+# ⚖️ QUALITATIVE JUDGE (LLM, cached)
+# ==============================================================================
+
+def _judge_prompt(report, criteria):
+    rubric = "\n".join(f"- {key}: {text}" for key, text in criteria.items())
+    return f"""
+    You are an AI Quality Assurance Judge grading a CFO report on qualitative criteria only.
+    Do not check arithmetic; figures are verified separately.
 
-# --- 2. THE JUDGE (Gemini Pro) ---
-def evaluate_agent():
-    print("\n🧪 STARTING AUTOMATED EVALUATION...\n")
-    
-    # A. Setup
-    ground_truth = setup_test_environment()
-    print(f"📋 Ground Truth Established: {ground_truth}")
-    
-    # B. Execution (Run the Agent)
-    print("🤖 Agent is running analysis...")
-    agent = FinancialAnalyst()
-    # We ask a specific question to test math + logic
-    agent_output = agent.run("Calculate Net Profit and identify the Rent expense.")
-    
-    print(f"\n📝 Agent Output:\n{agent_output}\n")
-    
-    # C. Judgment (The LLM-as-a-Judge)
-    print("⚖️  Judge is deliberating...")
-    judge_model = GenerativeModel("gemini-2.5-pro")
-    
-    evaluation_prompt = f"""
-    You are an AI Quality Assurance Judge.
-    Compare the AGENT OUTPUT with the GROUND TRUTH.
-    
-    [GROUND TRUTH]
-    {ground_truth}
-    
     [AGENT OUTPUT]
-    {agent_output}
-    
+    {report}
+
     [RUBRIC]
-    1. Did the agent calculate Net Profit as exactly 2500?
-    2. Did the agent identify Rent as 2500?
-    3. Did the agent explicitly state that it used Python code?
-    
+    {rubric}
+
     OUTPUT FORMAT:
-    If ALL conditions are met, start with "PASS".
-    If ANY condition fails, start with "FAIL".
-    Then provide a 1-sentence explanation.
+    One JSON object mapping each criterion key to "PASS" or "FAIL", nothing else.
     """
-    
-    verdict = judge_model.generate_content(evaluation_prompt).text
-    
-    # D. Final Report
+
+async def judge(report, criteria=QUALITATIVE, model_name=JUDGE_MODEL, use_cache=True):
+    """{criterion: bool} plus whether the verdict came from the response cache, and the span's tokens."""
+    with span("eval.judge", model=model_name) as s:
+        response = await cached_generate_async(get_model(model_name), _judge_prompt(report, criteria),
+                                               model_name=model_name, use_cache=use_cache)
+    verdicts = {}
+    for key in criteria:
+        m = re.search(rf'"{key}"\s*:\s*"(PASS|FAIL)"', response.text, re.IGNORECASE)
+        verdicts[key] = bool(m) and m.group(1).upper() == "PASS"
+    return verdicts, {"cached": s.cache_hits > 0, "model": model_name,
+                      "tokens_in": s.tokens_in, "tokens_out": s.tokens_out}
+
+# ==============================================================================
+# 🏃 RUNNER
+# ==============================================================================
+
+def _cost(model_name, tokens_in, tokens_out):
+    price_in, price_out = PRICES.get(model_name, (0.0, 0.0))
+    return (tokens_in * price_in + tokens_out * price_out) / 1e6
+
+async def run_case(analyst, shape, rows, seed, use_judge=True, judge_model=JUDGE_MODEL, timeout=CASE_TIMEOUT,
+                   use_cache=True):
+    """One CFO run on a fresh synthetic dataset, graded and costed."""
+    csv, truth = synthetic_case(shape, rows, seed)
+    dataset_id = await asyncio.to_thread(get_store().put_bytes, csv)
+    trace = {}
+    start = time.perf_counter()
+    report = await analyst.run_async(TASK, use_cache=False, dataset_id=dataset_id, trace=trace, timeout=timeout)
+    latency = time.perf_counter() - start
+
+    claims = check_numbers(report, truth)
+    turns = trace.get("turns", [])
+    tokens_in = sum(t["tokens_in"] for t in turns)
+    tokens_out = sum(t["tokens_out"] for t in turns)
+    cost = sum(_cost(t["model"], t["tokens_in"], t["tokens_out"]) for t in turns)
+    verdicts, judged = {}, None
+    if use_judge and not report.startswith("Error:"):
+        verdicts, judged = await judge(report, model_name=judge_model, use_cache=use_cache)
+
+    numeric_ok = sum(c["status"] == "ok" for c in claims.values())
+    result = {
+        "case": f"{shape}-{rows}-{seed}",
+        "params": {"shape": shape, "rows": rows, "seed": seed},
+        "numeric": claims,
+        "numeric_accuracy": numeric_ok / len(claims),
+        "qualitative": verdicts,
+        "judge": judged,
+        "passed": numeric_ok == len(claims) and all(verdicts.values()),
+        "latency_s": latency,
+        "turns": len(turns),
+        "tool_calls": len(trace.get("tools", [])),
+        "stopped": trace.get("stopped"),
+        "tokens_in": tokens_in,
+        "tokens_out": tokens_out,
+        "cost_usd": cost,
+        "judge_cost_usd": _cost(judge_model, judged["tokens_in"], judged["tokens_out"]) if judged else 0.0,
+        "error": report[:200] if report.startswith("Error:") else None,
+    }
+    logger.info(f"{result['case']:<24} {'PASS' if result['passed'] else 'FAIL'} "
+                f"numeric={numeric_ok}/{len(claims)} {latency:.2f}s {tokens_in}+{tokens_out} tok "
+                f"${cost:.4f}")
+    return result
+
+async def run_suite(shapes=DEFAULT_SHAPES, sizes=DEFAULT_SIZES, seeds=1, concurrency=8, use_judge=True,
+                    judge_model=JUDGE_MODEL, timeout=CASE_TIMEOUT, use_cache=True):
+    """
+    Every shape × size × seed, `concurrency` CFO runs at a time; returns the
+    report dict. `use_cache=False` also sends every judge call to the model.
+    """
+    analyst = await asyncio.to_thread(get_worker, FinancialAnalyst)
+    gate = asyncio.Semaphore(concurrency)
+
+    async def bounded(shape, rows, seed):
+        async with gate:
+            return await run_case(analyst, shape, rows, seed, use_judge, judge_model, timeout, use_cache)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        bounded(shape, rows, seed) for shape in shapes for rows in sizes for seed in range(seeds)
+    ])
+    return {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "wall_s": time.perf_counter() - start,
+        "summary": summarize(results),
+        "results": results,
+    }
+
+def summarize(results):
+    """Accuracy, latency and cost over all cases, plus numeric accuracy per shape."""
+    n = len(results) or 1
+    judged = [r for r in results if r["qualitative"]]
+    by_shape = {}
+    for r in results:
+        by_shape.setdefault(r["params"]["shape"], []).append(r["numeric_accuracy"])
+    return {
+        "cases": len(results),
+        "pass_rate": sum(r["passed"] for r in results) / n,
+        "numeric_accuracy": sum(r["numeric_accuracy"] for r in results) / n,
+        "qualitative_pass_rate": (sum(all(r["qualitative"].values()) for r in judged) / len(judged)) if judged else None,
+        "judge_cache_hits": sum(1 for r in judged if r["judge"]["cached"]),
+        "errors": sum(1 for r in results if r["error"]),
+        "latency": percentiles([r["latency_s"] for r in results]),
+        "tokens_per_case": sum(r["tokens_in"] + r["tokens_out"] for r in results) / n,
+        "cost_usd": sum(r["cost_usd"] for r in results),
+        "judge_cost_usd": sum(r["judge_cost_usd"] for r in results),
+        "numeric_accuracy_by_shape": {shape: sum(v) / len(v) for shape, v in by_shape.items()},
+    }
+
+def compare(current, baseline):
+    """Prints summary deltas against a previous results file; returns the regressions found."""
+    now, before = current["summary"], baseline["summary"]
+    print(f"Comparing {current.get('revision')} against {baseline.get('revision')}")
+    regressions = []
+    drop = before["numeric_accuracy"] - now["numeric_accuracy"]
+    print(f"numeric accuracy  {before['numeric_accuracy']:.3f} -> {now['numeric_accuracy']:.3f}")
+    if drop > MAX_ACCURACY_DROP:
+        regressions.append(f"numeric accuracy dropped {drop:.3f}")
+    for label, new_v, old_v in (
+        ("p95 latency", now["latency"]["p95"], before["latency"]["p95"]),
+        ("tokens/case", now["tokens_per_case"], before["tokens_per_case"]),
+    ):
+        if new_v is None or not old_v:
+            continue
+        growth = (new_v - old_v) / old_v
+        print(f"{label:<17} {old_v:.2f} -> {new_v:.2f} ({growth * 100:+.1f}%)")
+        if growth > MAX_SLOWDOWN:
+            regressions.append(f"{label} grew {growth * 100:.0f}%")
+    for item in regressions:
+        print(f"REGRESSION: {item}")
+    return regressions
+
+# ==============================================================================
+# 🎭 OFFLINE POLICY (--dry-run)
+# ==============================================================================
+
+class EvalPolicy(ScriptedPolicy):
+    """
+    Fake-model script for the eval: the CFO calls pnl_summary once and
+    reports its figures; the judge passes every criterion. Exercises the
+    datasets, tools, parser and report end to end without Vertex.
+    """
+    def __call__(self, model_name, system_instruction, tools, contents):
+        prompt = prompt_text(contents)
+        if "[RUBRIC]" in prompt:
+            keys = re.findall(r"- (\w+): ", prompt)
+            return {"text": json.dumps({key: "PASS" for key in keys})}
+        if "pnl_summary" not in tool_names(tools):
+            return super().__call__(model_name, system_instruction, tools, contents)
+        if tool_turns(contents) == 0:
+            return {"function_calls": [{"name": "pnl_summary", "args": {}}]}
+
+        result = contents[-1].to_dict()["parts"][0]["function_response"]["response"]["content"]
+        pnl = json.loads(result)
+        top, amount = next(iter(pnl["top_expenses"].items()))
+        return {"text": (
+            f"I computed these figures with the analytics tools.\n"
+            f"Total revenue: ${pnl['revenue']:,.2f}\nTotal expenses: ${pnl['expenses']:,.2f}\n"
+            f"Net profit: ${pnl['net_profit']:,.2f}\nProfit margin: {pnl['margin_pct']:.1f}%\n"
+            f"Largest expense: {top} at ${amount:,.2f}\n\n"
+            f"1. Cut {top} by 10%. 2. Reprice to lift margin. 3. Reinvest net profit."
+        )}
+
+def main():
+    parser = argparse.ArgumentParser(description="CFO accuracy, latency and cost evaluation on synthetic ledgers.")
+    parser.add_argument("--shapes", default=",".join(DEFAULT_SHAPES))
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="CSV row counts")
+    parser.add_argument("--seeds", type=int, default=1, help="Ledgers per shape and size")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=CASE_TIMEOUT, help="Seconds per CFO run")
+    parser.add_argument("--judge-model", default=JUDGE_MODEL)
+    parser.add_argument("--no-judge", action="store_true", help="Numeric checks only")
+    parser.add_argument("--dry-run", action="store_true", help="Use the offline fake model (no Vertex calls)")
+    parser.add_argument("--out", default="eval_results.json")
+    parser.add_argument("--compare", help="Previous results file; exit 1 on regression")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)  # Quiet logs for clean output
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.StreamHandler())
+    logger.propagate = False
+    observability.EXPORT_SPANS = False  # Keep eval spans out of logs/spans.jsonl
+
+    suite = run_suite(
+        shapes=[s for s in args.shapes.split(",") if s],
+        sizes=[int(s) for s in args.sizes.split(",") if s],
+        seeds=args.seeds, concurrency=args.concurrency, use_judge=not args.no_judge,
+        judge_model=args.judge_model, timeout=args.timeout,
+        use_cache=not args.dry_run,  # Fake verdicts must never be replayed for a real run
+    )
+    print("\n🧪 STARTING AUTOMATED EVALUATION...\n")
+    if args.dry_run:
+        with fake_vertex(policy=EvalPolicy()):
+            report = asyncio.run(suite)
+    else:
+        report = asyncio.run(suite)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    summary = report["summary"]
     print("-" * 30)
-    print(f"FINAL VERDICT: {verdict}")
+    print(f"CASES: {summary['cases']}  PASS RATE: {summary['pass_rate']:.1%}  "
+          f"NUMERIC ACCURACY: {summary['numeric_accuracy']:.1%}")
+    print(f"LATENCY p50/p95: {summary['latency']['p50']:.2f}s / {summary['latency']['p95']:.2f}s  "
+          f"TOKENS/CASE: {summary['tokens_per_case']:.0f}  COST: ${summary['cost_usd']:.4f} "
+          f"(+ judge ${summary['judge_cost_usd']:.4f}, {summary['judge_cache_hits']} cached)")
     print("-" * 30)
+    print(f"Wrote {summary['cases']} results to {args.out}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            if compare(report, json.load(f)):
+                sys.exit(1)
 
 if __name__ == "__main__":
-    evaluate_agent()
\ No newline at end of file
+    main()
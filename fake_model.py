@@ -0,0 +1,236 @@
+import asyncio
+import contextlib
+import json
+import logging
+import random
+import threading
+import time
+
+from llm_cache import make_key, _from_dict, ResponseCache, set_cache
+
+logger = logging.getLogger("FakeModel")
+
+# ==============================================================================
+# 🎭 OFFLINE STAND-IN FOR vertexai GenerativeModel
+# ==============================================================================
+# Used by the benchmark (and anything else that must run without a Vertex
+# project). Responses are scripted or replayed from a recording; latency is
+# drawn from a configurable distribution per model.
+
+PNL_CODE = (
+    "rev = df[df['Type'] == 'Revenue']['Amount'].sum()\n"
+    "exp = df[df['Type'] == 'Expense']['Amount'].sum()\n"
+    "top = df[df['Type'] == 'Expense'].groupby('Category')['Amount'].sum().idxmax()\n"
+    "print(f'Revenue {rev}, Expenses {exp}, Net {rev - exp}, Margin {(rev - exp) / rev * 100:.1f}%, Top {top}')"
+)
+
+class LatencyModel:
+    """
+    Seconds to first byte plus per-token streaming delay.
+    kind: "fixed" (median), "uniform" (median ± spread) or "lognormal" (median, sigma).
+    """
+    def __init__(self, kind="lognormal", median=1.0, sigma=0.35, spread=0.5, per_token=0.002, seed=None):
+        self.kind = kind
+        self.median = median
+        self.sigma = sigma
+        self.spread = spread
+        self.per_token = per_token
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self):
+        with self._lock:
+            if self.kind == "fixed":
+                return self.median
+            if self.kind == "uniform":
+                return max(0.0, self._rng.uniform(self.median - self.spread, self.median + self.spread))
+            return self._rng.lognormvariate(0, self.sigma) * self.median
+
+    @classmethod
+    def parse(cls, spec):
+        """'lognormal:1.2:0.4', 'fixed:0.5' or 'uniform:1.0:0.3' -> LatencyModel."""
+        kind, *nums = spec.split(":")
+        nums = [float(n) for n in nums]
+        if kind == "fixed":
+            return cls("fixed", median=nums[0] if nums else 1.0)
+        if kind == "uniform":
+            return cls("uniform", median=nums[0], spread=nums[1] if len(nums) > 1 else 0.5)
+        return cls("lognormal", median=nums[0] if nums else 1.0, sigma=nums[1] if len(nums) > 1 else 0.35)
+
+# Defaults roughly shaped like flash vs pro
+DEFAULT_LATENCY = {
+    "gemini-2.5-flash": LatencyModel(median=0.8, sigma=0.3),
+    "gemini-2.5-pro": LatencyModel(median=3.0, sigma=0.4),
+}
+
+# --- Request helpers (also for custom policies, e.g. eval.EvalPolicy) ---
+
+def tool_names(tools):
+    """Function names declared by a request's tools."""
+    names = []
+    for tool in tools or []:
+        for decl in tool.to_dict().get("function_declarations", []):
+            names.append(decl["name"])
+    return names
+
+def tool_turns(contents):
+    """Number of function-response messages already in the history."""
+    if not isinstance(contents, list):
+        return 0
+    turns = 0
+    for content in contents:
+        data = content.to_dict() if hasattr(content, "to_dict") else {}
+        if any("function_response" in part for part in data.get("parts", [])):
+            turns += 1
+    return turns
+
+def prompt_text(contents):
+    """The whole request (prompt or chat history) as one string."""
+    if isinstance(contents, str):
+        return contents
+    return json.dumps([c.to_dict() if hasattr(c, "to_dict") else str(c) for c in contents], default=str)
+
+class ScriptedPolicy:
+    """
+    Default behaviour:
+    - router prompts answer `intent`;
+    - tool-enabled agents make `tool_turns` rounds of `calls_per_turn` calls, then answer;
+    - everything else answers with a `response_words`-word report.
+    """
+    def __init__(self, intent="STRATEGY", tool_turns=1, calls_per_turn=1, response_words=250):
+        self.intent = intent
+        self.tool_turns = tool_turns
+        self.calls_per_turn = calls_per_turn
+        self.response_words = response_words
+
+    def __call__(self, model_name, system_instruction, tools, contents):
+        prompt = prompt_text(contents)
+        if "OUTPUT ONLY THE CATEGORY WORD" in prompt:
+            return {"text": self.intent}
+
+        names = tool_names(tools)
+        if names and tool_turns(contents) < self.tool_turns:
+            calls = []
+            for i in range(self.calls_per_turn):
+                name = names[i % len(names)]
+                if name == "execute_pandas_analysis":
+                    args = {"python_code": PNL_CODE}
+                elif name == "search_market_data":
+                    args = {"niche": "Coffee Shop", "location": "London, UK"}
+                else:
+                    args = {}
+                calls.append({"name": name, "args": args})
+            return {"function_calls": calls}
+
+        words = ("Revenue growth margin campaign persona budget execution plan " * 64).split()
+        body = " ".join(words[: self.response_words])
+        return {"text": f"1. Stabilise costs. 2. Launch the campaign. 3. Reinvest profit.\n\n{body}"}
+
+class FakeGenerativeModel:
+    """
+    Same constructor and `generate_content` signature as vertexai's
+    GenerativeModel, including `stream=True`. `policy` maps
+    (model_name, system_instruction, tools, contents) to {"text"} or
+    {"function_calls"}; `recording` (key -> response dict) is consulted first.
+    """
+    policy = ScriptedPolicy()
+    latency = DEFAULT_LATENCY
+    recording = {}
+    calls = 0
+    _calls_lock = threading.Lock()
+
+    def __init__(self, model_name, system_instruction=None, tools=None, **kwargs):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.tools = tools
+
+    def _response(self, contents):
+        key = make_key(self.model_name, self.system_instruction, self.tools, contents)
+        if key in self.recording:
+            return self.recording[key]
+        out = self.policy(self.model_name, self.system_instruction, self.tools, contents)
+        if "function_calls" in out:
+            parts = [{"function_call": call} for call in out["function_calls"]]
+        else:
+            parts = [{"text": out["text"]}]
+        prompt_tokens = len(prompt_text(contents)) // 4
+        output_tokens = sum(len(json.dumps(p)) for p in parts) // 4
+        return {
+            "candidates": [{"content": {"role": "model", "parts": parts}, "finish_reason": "STOP"}],
+            "usage_metadata": {"prompt_token_count": prompt_tokens, "candidates_token_count": output_tokens,
+                               "total_token_count": prompt_tokens + output_tokens},
+        }
+
+    def _latency(self):
+        return self.latency.get(self.model_name) or LatencyModel(median=1.0)
+
+    def generate_content(self, contents, *, stream=False, **kwargs):
+        with FakeGenerativeModel._calls_lock:
+            FakeGenerativeModel.calls += 1
+        data = self._response(contents)
+        latency = self._latency()
+        time.sleep(latency.sample())
+        if not stream:
+            time.sleep(latency.per_token * data["usage_metadata"]["candidates_token_count"])
+            return _from_dict(data)
+        return self._stream(data, latency)
+
+    async def generate_content_async(self, contents, **kwargs):
+        """Non-blocking twin of `generate_content` (no streaming), for the async API."""
+        with FakeGenerativeModel._calls_lock:
+            FakeGenerativeModel.calls += 1
+        data = self._response(contents)
+        latency = self._latency()
+        await asyncio.sleep(latency.sample() + latency.per_token * data["usage_metadata"]["candidates_token_count"])
+        return _from_dict(data)
+
+    def _stream(self, data, latency):
+        parts = data["candidates"][0]["content"]["parts"]
+        if "text" not in parts[0]:
+            yield _from_dict(data)
+            return
+        words = parts[0]["text"].split(" ")
+        for i in range(0, len(words), 8):
+            time.sleep(latency.per_token * 8)
+            chunk = {"candidates": [{"content": {"role": "model", "parts": [{"text": " ".join(words[i:i + 8]) + " "}]}}]}
+            if i + 8 >= len(words):
+                chunk["usage_metadata"] = data["usage_metadata"]
+            yield _from_dict(chunk)
+
+def load_recording(path):
+    """JSONL of {"key": make_key(...), "response": GenerationResponse.to_dict()}."""
+    recording = {}
+    with open(path, "r") as f:
+        for line in f:
+            row = json.loads(line)
+            recording[row["key"]] = row["response"]
+    return recording
+
+@contextlib.contextmanager
+def fake_vertex(policy=None, latency=None, recording=None):
+    """
+    Swaps the registry's GenerativeModel factory for the stand-in (managers,
+    workers and clients obtained inside the block use it), then restores it.
+    Registry entries are keyed by factory, so real and fake clients never mix.
+    The shared response cache is swapped for a memory-only one as well: fake
+    responses are keyed under real model names and must never be replayed
+    to a real run.
+    """
+    import model_registry
+
+    saved = (model_registry.GenerativeModel,
+             FakeGenerativeModel.policy, FakeGenerativeModel.latency, FakeGenerativeModel.recording)
+    saved_cache = set_cache(ResponseCache(db_path=None))
+    model_registry.GenerativeModel = FakeGenerativeModel
+    if policy is not None:
+        FakeGenerativeModel.policy = policy
+    if latency is not None:
+        FakeGenerativeModel.latency = latency
+    if recording is not None:
+        FakeGenerativeModel.recording = recording
+    try:
+        yield FakeGenerativeModel
+    finally:
+        (model_registry.GenerativeModel,
+         FakeGenerativeModel.policy, FakeGenerativeModel.latency, FakeGenerativeModel.recording) = saved
+        set_cache(saved_cache)
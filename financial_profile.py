@@ -0,0 +1,127 @@
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger("FinancialProfile")
+
+# --- CONFIGURATION ---
+REQUIRED_COLUMNS = {"Date", "Category", "Amount", "Type"}
+TOP_CATEGORIES = 5     # Per side (revenue / expense) in the prompt block
+MONTHS_IN_PROMPT = 12  # Most recent monthly buckets in the prompt block
+
+# ==============================================================================
+# 📈 INGEST-TIME FINANCIAL PROFILE
+# ==============================================================================
+
+def _side(types: pd.Series) -> pd.Series:
+    """Maps free-text Type values onto 'Revenue' / 'Expense' (anything else is dropped)."""
+    t = types.astype(str).str.strip().str.lower()
+    side = pd.Series(pd.NA, index=types.index, dtype="object")
+    side[t.str.startswith(("rev", "income", "sale"))] = "Revenue"
+    side[t.str.startswith(("exp", "cost"))] = "Expense"
+    return side
+
+def _partial(df: pd.DataFrame):
+    """Additive aggregates of one frame (or chunk): row count, Category×Side and Month×Side sums."""
+    amount = pd.to_numeric(df["Amount"], errors="coerce")
+    frame = pd.DataFrame({
+        "Side": _side(df["Type"]),
+        "Category": df["Category"].astype(str),
+        "Amount": amount.abs(),
+        "Month": pd.to_datetime(df["Date"], errors="coerce").dt.to_period("M").astype(str),
+    }).dropna(subset=["Side", "Amount"])
+
+    by_category = frame.groupby(["Category", "Side"])["Amount"].sum()
+    monthly = frame[frame["Month"] != "NaT"].groupby(["Month", "Side"])["Amount"].sum()
+    return len(df), by_category, monthly
+
+def compute_profile(df: pd.DataFrame):
+    """
+    One vectorized pass over the ledger: totals, P&L, margin, category split
+    and monthly buckets. Returns a JSON-serializable dict, or None when the
+    frame doesn't follow the Date/Category/Amount/Type schema.
+    """
+    return compute_profile_chunks([df])
+
+def compute_profile_chunks(chunks):
+    """
+    `compute_profile` over an iterable of frames (e.g. columnar.iter_chunks):
+    every aggregate is a sum, so per-chunk partials add up to the exact result
+    while only one chunk is in memory at a time.
+    """
+    rows, by_category, monthly = 0, None, None
+    for df in chunks:
+        if not REQUIRED_COLUMNS.issubset(df.columns):
+            return None
+        n, cat, month = _partial(df)
+        rows += n
+        by_category = cat if by_category is None else by_category.add(cat, fill_value=0.0)
+        monthly = month if monthly is None else monthly.add(month, fill_value=0.0)
+    if by_category is None:
+        return None
+
+    by_category = by_category.unstack("Side", fill_value=0.0)
+    by_side = by_category.sum()
+    revenue = float(by_side.get("Revenue", 0.0))
+    expenses = float(by_side.get("Expense", 0.0))
+    net = revenue - expenses
+
+    expense_by_category = by_category.get("Expense", pd.Series(dtype=float)).sort_values(ascending=False)
+    revenue_by_category = by_category.get("Revenue", pd.Series(dtype=float)).sort_values(ascending=False)
+    expense_by_category = expense_by_category[expense_by_category > 0]
+    revenue_by_category = revenue_by_category[revenue_by_category > 0]
+
+    monthly = monthly.unstack("Side", fill_value=0.0).reindex(
+        columns=["Revenue", "Expense"], fill_value=0.0
+    ).sort_index()
+    monthly["Net"] = monthly["Revenue"] - monthly["Expense"]
+
+    months = monthly.index.tolist()
+    return {
+        "rows": int(rows),
+        "period": [months[0], months[-1]] if months else None,
+        "total_revenue": round(revenue, 2),
+        "total_expenses": round(expenses, 2),
+        "net_profit": round(net, 2),
+        "profit_margin_pct": round(net / revenue * 100, 2) if revenue else None,
+        "top_expense_category": (
+            [str(expense_by_category.index[0]), round(float(expense_by_category.iloc[0]), 2)]
+            if len(expense_by_category) else None
+        ),
+        "expenses_by_category": {str(k): round(float(v), 2) for k, v in expense_by_category.items()},
+        "revenue_by_category": {str(k): round(float(v), 2) for k, v in revenue_by_category.items()},
+        "monthly": {
+            str(m): [round(float(r), 2), round(float(e), 2), round(float(n), 2)]
+            for m, (r, e, n) in monthly[["Revenue", "Expense", "Net"]].iterrows()
+        },
+    }
+
+def format_profile(profile) -> str:
+    """Compact block for the CFO task. Empty string if there is no profile."""
+    if not profile:
+        return ""
+
+    def top(mapping):
+        items = list(mapping.items())[:TOP_CATEGORIES]
+        return "; ".join(f"{k} {v:,.2f}" for k, v in items) or "n/a"
+
+    margin = profile["profit_margin_pct"]
+    lines = [
+        "PRECOMPUTED PROFILE (full dataset, exact; only run code for anything not covered here):",
+        f"- Rows: {profile['rows']}"
+        + (f" | Period: {profile['period'][0]} to {profile['period'][1]}" if profile["period"] else ""),
+        f"- Total Revenue: {profile['total_revenue']:,.2f} | Total Expenses: {profile['total_expenses']:,.2f}"
+        f" | Net Profit: {profile['net_profit']:,.2f}"
+        f" | Profit Margin: {f'{margin:.2f}%' if margin is not None else 'n/a'}",
+    ]
+    if profile["top_expense_category"]:
+        name, value = profile["top_expense_category"]
+        lines.append(f"- Top Expense Category: {name} ({value:,.2f})")
+    lines.append(f"- Expenses by Category: {top(profile['expenses_by_category'])}")
+    lines.append(f"- Revenue by Category: {top(profile['revenue_by_category'])}")
+    months = list(profile["monthly"].items())[-MONTHS_IN_PROMPT:]
+    if months:
+        lines.append("- Monthly (Revenue / Expense / Net): " + "; ".join(
+            f"{m} {r:,.0f}/{e:,.0f}/{n:,.0f}" for m, (r, e, n) in months
+        ))
+    return "\n".join(lines)
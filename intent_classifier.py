@@ -0,0 +1,269 @@
+import json
+import logging
+import os
+import random
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+logger = logging.getLogger("IntentClassifier")
+
+# --- CONFIGURATION ---
+LABELS = ["FINANCE", "MARKETING", "STRATEGY", "CHAT"]
+# CLOUD FIX: Use /tmp for the decision log in production
+if os.path.exists("/tmp"):
+    DECISION_LOG = "/tmp/boardroom_router_decisions.jsonl"
+else:
+    DECISION_LOG = "boardroom_router_decisions.jsonl"
+
+CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.85"))
+LOG_MAX_BYTES = int(os.getenv("ROUTER_LOG_MAX_MB", "8")) * 1024 * 1024  # Then rotated to <log>.1
+HASH_DIM = 2 ** 12        # Hashed bag-of-words feature space
+RULE_WEIGHT = 3.0         # Log-odds bonus per keyword hit
+MIN_SIGNALS = 2           # Keyword hits (+1 if the trained model agrees) needed to skip the LLM
+MEMO_SIZE = 4096
+MIN_TRAINING = 20         # Naive Bayes is overconfident on tiny logs; rules only until then
+
+# --- KEYWORD RULES ---
+# Mirrors the category definitions in BoardroomManager.route_request.
+RULES = {
+    "FINANCE": re.compile(
+        r"\b(profit\w*|revenue\w*|margin\w*|costs?|expens\w+|budget\w*|cash\w*|burn|runway|"
+        r"p&l|financ\w*|numbers?|data|tax\w*|spend\w*|debt|loss\w*|invoice\w*|pric\w+|savings?)\b"
+    ),
+    "MARKETING": re.compile(
+        r"\b(ads?|advert\w*|campaign\w*|brand\w*|competitor\w*|marketing|market|social|instagram|"
+        r"tiktok|seo|awareness|audience|followers|promot\w+|influencer\w*|footfall)\b"
+    ),
+    "STRATEGY": re.compile(
+        r"\b(plan\w*|grow\w*|strateg\w*|expan\w+|scal\w+|improv\w+|roadmap|launch\w*|"
+        r"increase|double|help|vision|pivot|new location|franchis\w*)\b"
+    ),
+    "CHAT": re.compile(
+        r"\b(hi|hello|hey|thanks|thank you|good (morning|afternoon|evening)|how are you)\b"
+    ),
+}
+
+_TOKEN = re.compile(r"[a-z0-9&]+")
+_LABEL = re.compile(r"\b(" + "|".join(LABELS) + r")\b")
+_TEMPLATE = re.compile(r"\b(goal|niche):")
+
+def normalize(text):
+    """Lower-cases and collapses whitespace so equivalent inputs share a memo entry."""
+    return " ".join(str(text).lower().split())
+
+def parse_label(reply):
+    """The first known intent named in an LLM router reply ("**Finance.**" -> "FINANCE"), or None."""
+    m = _LABEL.search(str(reply).upper())
+    return m.group(1) if m else None
+
+def _features(text):
+    """Hashed unigram + bigram indices (crc32 is stable across processes)."""
+    import numpy as np
+
+    tokens = _TOKEN.findall(text)
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return np.fromiter((zlib.crc32(g.encode()) % HASH_DIM for g in grams), dtype=np.int64, count=len(grams))
+
+# ==============================================================================
+# 🚦 LOCAL FAST-PATH ROUTER
+# ==============================================================================
+
+class IntentClassifier:
+    """
+    Tier 1: keyword rules + an online multinomial Naive Bayes over hashed n-grams,
+    trained from logged router decisions.
+    Tier 2: the LLM router, consulted below `threshold` confidence or with
+    fewer than MIN_SIGNALS signals; its replies are mapped onto LABELS.
+    """
+    def __init__(self, threshold=CONFIDENCE_THRESHOLD, log_path=DECISION_LOG, audit_rate=0.0):
+        import numpy as np  # Built with the manager (warm-up), not at import
+
+        self.threshold = threshold
+        self.log_path = log_path
+        self.audit_rate = audit_rate  # Fraction of confident decisions double-checked by the LLM
+        self._counts = np.zeros((len(LABELS), HASH_DIM), dtype=np.float64)
+        self._class_counts = np.zeros(len(LABELS), dtype=np.float64)
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"lookups": 0, "memo_hits": 0, "local": 0, "llm": 0, "compared": 0, "agreed": 0}
+        # Agreement per 0.1-wide confidence bucket, for threshold tuning
+        self._buckets = np.zeros((10, 2), dtype=np.int64)  # [compared, agreed]
+        self._load_log()
+
+    # --- TRAINING ---
+    def _load_log(self):
+        if not self.log_path:
+            return
+        examples = []
+        # The rotated file first, so the current one's decisions are the newest
+        for path in (self.log_path + ".1", self.log_path):
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, "r") as f:
+                    for line in f:
+                        try:
+                            row = json.loads(line)
+                            examples.append((row["input"], row["label"]))
+                        except (ValueError, KeyError):
+                            continue
+            except OSError as e:
+                logger.error(f"⚠️ Could not read router log: {e}")
+                return
+        if not examples:
+            return
+        self.fit(examples)
+        logger.info(f"🚦 Local router trained on {len(examples)} logged decisions.")
+
+    def fit(self, examples):
+        """Adds (input, label) pairs to the model. Unknown labels are ignored."""
+        with self._lock:
+            for text, label in examples:
+                self._learn(normalize(text), label)
+
+    def _learn(self, text, label):
+        if label not in LABELS:
+            return
+        import numpy as np
+
+        idx = LABELS.index(label)
+        np.add.at(self._counts[idx], _features(text), 1.0)
+        self._class_counts[idx] += 1
+
+    # --- INFERENCE ---
+    def predict(self, text):
+        """Returns (label, confidence) from the local tier only."""
+        label, confidence, _ = self._evidence(text)
+        return label, confidence
+
+    def _evidence(self, text):
+        """(label, confidence, signals): signals are the label's keyword hits, +1 if Naive Bayes agrees."""
+        import numpy as np
+
+        text = normalize(text)
+        # Rules only look at the user's words, not the "Goal: ... Niche: ..." template
+        content = _TEMPLATE.sub(" ", text)
+        hits = np.array([len(RULES[label].findall(content)) for label in LABELS], dtype=np.float64)
+        scores = RULE_WEIGHT * hits
+
+        bayes = None
+        if self._class_counts.sum() >= MIN_TRAINING:
+            feats = _features(text)
+            priors = np.log((self._class_counts + 1) / (self._class_counts.sum() + len(LABELS)))
+            totals = self._counts.sum(axis=1, keepdims=True)
+            likelihood = np.log((self._counts[:, feats] + 1) / (totals + HASH_DIM)).sum(axis=1)
+            bayes = priors + likelihood
+            scores += bayes
+
+        probs = np.exp(scores - scores.max())
+        probs /= probs.sum()
+        best = int(probs.argmax())
+        signals = int(hits[best]) + int(bayes is not None and int(bayes.argmax()) == best)
+        return LABELS[best], float(probs[best]), signals
+
+    def route(self, user_input, llm_router):
+        """
+        Classifies `user_input`, calling `llm_router(user_input)` only when the
+        local tier is unsure. Decisions are memoized per normalized input.
+        """
+        key, decided, local = self._local(user_input)
+        if decided is not None:
+            return decided
+        return self._settle(key, local, llm_router(user_input))
+
+    async def route_async(self, user_input, llm_router):
+        """`route` with an async `llm_router` (awaited only when the local tier is unsure)."""
+        key, decided, local = self._local(user_input)
+        if decided is not None:
+            return decided
+        return self._settle(key, local, await llm_router(user_input))
+
+    def _local(self, user_input):
+        """(key, label if decided without the LLM else None, (local label, confidence, confident))."""
+        key = normalize(user_input)
+        with self._lock:
+            self.counters["lookups"] += 1
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                self.counters["memo_hits"] += 1
+                return key, self._memo[key], None
+
+        label, confidence, signals = self._evidence(key)
+        # One keyword alone is not enough evidence ("cash" in a hello), however confident
+        confident = confidence >= self.threshold and signals >= MIN_SIGNALS
+        if confident and random.random() >= self.audit_rate:
+            with self._lock:
+                self.counters["local"] += 1
+            logger.info(f"🚦 Local router: {label} ({confidence:.2f}, {signals} signals)")
+            return key, self._remember(key, label), None
+        return key, None, (label, confidence, confident)
+
+    def _settle(self, key, local, llm_reply):
+        label, confidence, confident = local
+        with self._lock:
+            self.counters["llm"] += 1
+        llm_label = parse_label(llm_reply)
+        if llm_label is None:
+            # Nothing learned, logged or memoized; STRATEGY is the router's catch-all
+            logger.warning(f"⚠️ LLM router reply is not an intent: {str(llm_reply)[:80]!r}; using STRATEGY.")
+            return label if confident else "STRATEGY"
+        self.record(key, llm_label, local_label=label, confidence=confidence)
+        # Audited confident decisions still trust the local tier's answer
+        return self._remember(key, label if confident else llm_label)
+
+    def record(self, user_input, label, local_label=None, confidence=None):
+        """Logs an LLM decision, learns from it and updates agreement stats."""
+        key = normalize(user_input)
+        with self._lock:
+            self._learn(key, label)
+            if local_label is not None:
+                bucket = min(int(confidence * 10), 9)
+                agreed = int(local_label == label)
+                self.counters["compared"] += 1
+                self.counters["agreed"] += agreed
+                self._buckets[bucket] += (1, agreed)
+        if self.log_path and label in LABELS:
+            try:
+                if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > LOG_MAX_BYTES:
+                    os.replace(self.log_path, self.log_path + ".1")  # One previous file kept (and trained on)
+                with open(self.log_path, "a") as f:
+                    f.write(json.dumps({"input": key, "label": label, "local": local_label,
+                                        "confidence": confidence}) + "\n")
+            except OSError as e:
+                logger.error(f"⚠️ Could not append router log: {e}")
+
+    def _remember(self, key, label):
+        with self._lock:
+            self._memo[key] = label
+            self._memo.move_to_end(key)
+            while len(self._memo) > MEMO_SIZE:
+                self._memo.popitem(last=False)
+        return label
+
+    # --- REPORTING ---
+    def stats(self):
+        """Tier usage plus local-vs-LLM agreement, overall and per confidence bucket."""
+        with self._lock:
+            stats = dict(self.counters)
+            buckets = self._buckets.copy()
+        stats["threshold"] = self.threshold
+        stats["agreement_rate"] = stats["agreed"] / stats["compared"] if stats["compared"] else None
+        stats["agreement_by_confidence"] = {
+            f"{i / 10:.1f}-{(i + 1) / 10:.1f}": round(float(agreed / compared), 3)
+            for i, (compared, agreed) in enumerate(buckets) if compared
+        }
+        return stats
+
+# --- SHARED INSTANCE ---
+_classifier = None
+_classifier_lock = threading.Lock()
+
+def get_classifier():
+    """Process-wide classifier so every manager learns from the same log."""
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = IntentClassifier()
+        return _classifier
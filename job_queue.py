@@ -0,0 +1,257 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from memory_engine import MemoryService
+from model_registry import get_manager
+from observability import run_scope
+from stage_graph import StageMemo
+
+logger = logging.getLogger("Jobs")
+
+# --- CONFIGURATION ---
+JOB_WORKERS = int(os.getenv("BOARDROOM_JOB_WORKERS", "4"))  # Board meetings running at once
+JOB_RETENTION = 3600                                         # Seconds a finished job stays queryable
+STAGES = ("router", "CFO", "CMO", "CEO")
+ACTIONABLE = ("FINANCE", "MARKETING", "STRATEGY")
+FINISHED = ("done", "chat", "failed", "cancelled")
+
+# ==============================================================================
+# 🧵 BACKGROUND BOARD MEETINGS
+# ==============================================================================
+# A meeting runs on the job pool, not on the Streamlit script thread, so a
+# widget interaction (which restarts the script) never abandons it: the
+# rerun just re-attaches to the session's job by ID. Results are saved
+# through MemoryService when the job finishes.
+
+class Job:
+    """
+    One board meeting. `events` is the ordered progress log:
+    {"stage", "status": "running" | "done" | "skipped", ...} per stage,
+    {"stage", "delta"} tokens, {"stage": "CEO", "reset": True}, and a final
+    {"stage": "job", "status"}. Readers use `wait` (subscribe) or `snapshot` (poll).
+    """
+    def __init__(self, session_id, inputs):
+        self.id = uuid.uuid4().hex[:16]
+        self.session_id = session_id
+        self.inputs = inputs
+        self.status = "queued"
+        self.intent = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.events = []
+        self.stages = {stage: {"status": "pending", "text": ""} for stage in STAGES}
+        self.cancel_event = threading.Event()
+        self._cond = threading.Condition()
+
+    @property
+    def active(self):
+        return self.status not in FINISHED
+
+    def publish(self, event):
+        with self._cond:
+            stage = self.stages.get(event["stage"])
+            if stage is not None:
+                if "delta" in event:
+                    stage["text"] += event["delta"]
+                if event.get("reset"):
+                    stage["text"] = ""
+                if "status" in event:
+                    stage["status"] = event["status"]
+                if "text" in event:
+                    stage["text"] = event["text"]
+            self.events.append(event)
+            self._cond.notify_all()
+
+    def finish(self, status, result=None, error=None):
+        with self._cond:
+            self.status, self.result, self.error = status, result, error
+            self.finished = time.time()
+        self.publish({"stage": "job", "status": status, "error": error})
+        logger.info(f"🧵 Job {self.id} [{self.session_id}] {status}"
+                    f"{f': {error}' if error else ''} in {self.finished - self.created:.1f}s.")
+
+    def cancel(self):
+        """Asks the job to stop; the worker pool slot frees at the next stage boundary or token."""
+        self.cancel_event.set()
+
+    def wait(self, since=0, timeout=None):
+        """
+        Blocks until there are events after index `since` (or the job is
+        finished, or `timeout` passes). Returns (new_events, next_index).
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: len(self.events) > since or not self.active, timeout)
+            return self.events[since:], len(self.events)
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "intent": self.intent,
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+                "result": self.result,
+                "error": self.error,
+                "elapsed": (self.finished or time.time()) - self.created,
+            }
+
+class JobQueue:
+    """
+    Bounded pool of meeting runners. One active job per session: submitting
+    the same inputs again returns the running job (reruns never duplicate),
+    different inputs cancel it and start a new one.
+    """
+    def __init__(self, workers=JOB_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="boardroom-job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._active = {}  # session_id -> job_id
+        self.counters = {"submitted": 0, "deduplicated": 0, "superseded": 0}
+
+    def submit(self, session_id, niche, goal, location, currency, dataset_id, fast_mode=None):
+        """Queues a meeting for `session_id` and returns its job ID."""
+        inputs = {"niche": niche, "goal": goal, "location": location, "currency": currency,
+                  "dataset_id": dataset_id, "fast_mode": fast_mode}
+        with self._lock:
+            self._prune()
+            current = self._jobs.get(self._active.get(session_id))
+            if current is not None and current.active:
+                if current.inputs == inputs:
+                    self.counters["deduplicated"] += 1
+                    return current.id
+                current.cancel()
+                self.counters["superseded"] += 1
+            job = Job(session_id, inputs)
+            self._jobs[job.id] = job
+            self._active[session_id] = job.id
+            self.counters["submitted"] += 1
+        self._pool.submit(self._run, job)
+        logger.info(f"🧵 Job {job.id} queued [{session_id}].")
+        return job.id
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active(self, session_id):
+        """The session's running or queued job, if any."""
+        with self._lock:
+            job = self._jobs.get(self._active.get(session_id))
+        return job if job is not None and job.active else None
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job is not None
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished < cutoff]:
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            by_status = {}
+            for job in self._jobs.values():
+                by_status[job.status] = by_status.get(job.status, 0) + 1
+            return {**self.counters, **by_status}
+
+    # --- Runner ---
+
+    def _run(self, job):
+        if job.cancel_event.is_set():
+            job.finish("cancelled")
+            return
+        job.status = "running"
+        try:
+            status, result = self._meeting(job)
+            job.finish(status, result)
+        except Exception as e:
+            logger.exception(f"Job {job.id} failed")
+            job.finish("failed", error=str(e))
+
+    def _meeting(self, job):
+        """Routing + streamed board meeting; saves the new state through MemoryService."""
+        inputs = job.inputs
+        memory = MemoryService(session_id=job.session_id)
+        state = memory.load_state()
+        memo = StageMemo(state.stages)  # One memo (and lock) for every stage of this job
+        manager = get_manager()
+
+        workers = manager.dispatch_workers(
+            niche=inputs["niche"], location=inputs["location"], currency=inputs["currency"],
+            csv_context=inputs["dataset_id"], stream=True, memo=memo
+        )
+        with run_scope(workers["run_id"]):
+            job.publish({"stage": "router", "status": "running"})
+            intent = manager.route_request(f"Goal: {inputs['goal']}. Niche: {inputs['niche']}", memo=memo)
+            job.intent = intent
+            job.publish({"stage": "router", "status": "done", "text": intent})
+
+        if intent not in ACTIONABLE or job.cancel_event.is_set():
+            manager.cancel_workers(workers)
+            for stage in ("CFO", "CMO", "CEO"):
+                job.publish({"stage": stage, "status": "skipped"})
+            return ("cancelled" if job.cancel_event.is_set() else "chat"), {"intent": intent}
+
+        # Past directives relevant to this meeting, the still-active one included
+        history = memory.relevant_history(inputs["niche"], inputs["goal"], state=state)
+
+        for stage in ("CFO", "CMO"):
+            job.publish({"stage": stage, "status": "running"})
+        events = manager.execute_workflow_stream(
+            niche=inputs["niche"], goal=inputs["goal"], location=inputs["location"],
+            currency=inputs["currency"], csv_context=inputs["dataset_id"], workers=workers,
+            intent=intent, fast_mode=inputs["fast_mode"], memo=memo, history=history
+        )
+        results = None
+        try:
+            for event in events:
+                if job.cancel_event.is_set():
+                    manager.cancel_workers(workers)
+                    return "cancelled", None
+                if event["stage"] == "RESULT":
+                    results = event["results"]
+                elif event.get("done"):
+                    job.publish({"stage": event["stage"], "status": "done", "text": event["text"]})
+                    if event["stage"] in ("CFO", "CMO") and all(
+                            job.stages[s]["status"] == "done" for s in ("CFO", "CMO")):
+                        job.publish({"stage": "CEO", "status": "running"})
+                else:
+                    job.publish(event)
+        finally:
+            events.close()  # Drops the CEO stream if we stopped early
+
+        # A reset cancels the job before clearing memory: saving now would restore it
+        if job.cancel_event.is_set():
+            return "cancelled", None
+
+        # Only a finished meeting replaces the directive: the previous one is
+        # compacted into history now and archived once this state is saved
+        memory.compact_context(state)
+        state.niche, state.goal = inputs["niche"], inputs["goal"]
+        state.cfo_data = results["cfo"]
+        state.cmo_data = results["cmo"]
+        state.ceo_data = results["ceo"]
+        if not memory.save_state(state):
+            raise RuntimeError("the meeting finished but its results could not be saved")
+        return "done", {"intent": intent, "timings": results["timings"], "run_id": results["run_id"]}
+
+# --- SHARED INSTANCE ---
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_jobs():
+    """Process-wide job queue shared by every Streamlit session."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
@@ -0,0 +1,358 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from observability import current_span
+from llm_calls import generate, generate_async, generate_stream
+
+logger = logging.getLogger("LLMCache")
+
+# --- CONFIGURATION ---
+# CLOUD FIX: Use /tmp for the disk tier in production
+if os.path.exists("/tmp"):
+    CACHE_DB = "/tmp/boardroom_llm_cache.sqlite3"
+else:
+    CACHE_DB = "boardroom_llm_cache.sqlite3"
+
+MEMORY_ENTRIES = 256                 # In-memory LRU tier
+DISK_BUDGET_BYTES = 256 * 1024 * 1024 # On-disk tier, evicted least-recently-used first
+DEFAULT_TTL = 24 * 3600              # Seconds
+
+# ==============================================================================
+# 🔑 CONTENT-ADDRESSED KEYS
+# ==============================================================================
+
+def _to_jsonable(value):
+    """Turns SDK objects (Content, Part, Tool) into plain data for hashing."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _to_jsonable(v) for k, v in value.items()}
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    return str(value)
+
+def make_key(model_name, system_instruction=None, tools=None, contents=None, **extra):
+    """
+    Hash of everything that determines a model response:
+    model name, system instruction, tool schemas and the full prompt / chat history.
+    """
+    payload = {
+        "model": model_name,
+        "system": _to_jsonable(system_instruction),
+        "tools": _to_jsonable(tools),
+        "contents": _to_jsonable(contents),
+        "extra": _to_jsonable(extra),
+    }
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+# ==============================================================================
+# 🗄️ TWO-TIER RESPONSE CACHE
+# ==============================================================================
+
+class ResponseCache:
+    """
+    Memory LRU in front of a SQLite store.
+    Values are JSON-serializable dicts (e.g. GenerationResponse.to_dict()).
+    Any object with the same get/put/stats methods can be plugged in via `set_cache`.
+    The lock guards the memory tier only: SQLite is read and written on a
+    connection per thread (WAL), and the disk size is tracked incrementally,
+    re-summed only when an eviction pass runs.
+    """
+    def __init__(self, db_path=CACHE_DB, memory_entries=MEMORY_ENTRIES,
+                 disk_budget_bytes=DISK_BUDGET_BYTES, ttl=DEFAULT_TTL):
+        self.db_path = db_path
+        self.memory_entries = memory_entries
+        self.disk_budget_bytes = disk_budget_bytes
+        self.ttl = ttl
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()  # One eviction pass at a time
+        self._local = threading.local()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._disk = False
+        self._disk_bytes = 0
+        if db_path:
+            try:
+                db = self._conn()
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                    "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                db.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON responses(accessed_at)")
+                self._disk_bytes = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+                self._disk = True
+            except sqlite3.Error as e:
+                logger.error(f"⚠️ Disk cache unavailable, memory tier only: {e}")
+
+    def _conn(self):
+        """One autocommit connection per thread."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return entry[1]
+            if entry:
+                del self._memory[key]
+
+        if self._disk:
+            try:
+                db = self._conn()
+                row = db.execute(
+                    "SELECT value, expires_at, size FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[1] > now:
+                    db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                    value = json.loads(row[0])
+                    with self._lock:
+                        self._remember(key, row[1], value)
+                        self.counters["disk_hits"] += 1
+                    return value
+                if row and db.execute("DELETE FROM responses WHERE key = ?", (key,)).rowcount:
+                    with self._lock:
+                        self._disk_bytes -= row[2]
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Disk cache read failed: {e}")
+
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    def put(self, key, value, ttl=None):
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self.counters["writes"] += 1
+        if not self._disk:
+            return
+        blob = json.dumps(value, ensure_ascii=False)
+        try:
+            db = self._conn()
+            old = db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), expires_at, now)
+            )
+            with self._lock:
+                self._disk_bytes += len(blob) - (old[0] if old else 0)
+                over = self._disk_bytes > self.disk_budget_bytes
+            if over:
+                self._evict_disk(db, now)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Disk cache write failed: {e}")
+
+    def _remember(self, key, expires_at, value):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, db, now):
+        """Drops expired rows, then least-recently-used ones until within budget; resyncs the size."""
+        if not self._evict_lock.acquire(blocking=False):
+            return  # Another thread is already evicting
+        try:
+            db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            victims = []
+            if total > self.disk_budget_bytes:
+                for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC"):
+                    if total <= self.disk_budget_bytes:
+                        break
+                    victims.append((key,))
+                    total -= size
+                db.executemany("DELETE FROM responses WHERE key = ?", victims)
+            with self._lock:
+                self._disk_bytes = total
+                self.counters["evictions"] += len(victims)
+        finally:
+            self._evict_lock.release()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._disk_bytes = 0
+        if self._disk:
+            self._conn().execute("DELETE FROM responses")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["disk_bytes"] = self._disk_bytes
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+# --- SHARED INSTANCE ---
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """Process-wide cache shared by the router, workers and CEO."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+def set_cache(cache):
+    """Swaps the shared cache (pass None to rebuild the default on next use); returns the previous one."""
+    global _cache
+    with _cache_lock:
+        previous, _cache = _cache, cache
+        return previous
+
+# ==============================================================================
+# 🤖 CACHED GENERATION
+# ==============================================================================
+
+def _complete(response):
+    """Cacheable: at least one candidate, and every candidate finished normally (STOP).
+    Safety-blocked, truncated (MAX_TOKENS) or unspecified finishes are never stored."""
+    candidates = response.candidates
+    return bool(candidates) and all(
+        getattr(c.finish_reason, "name", c.finish_reason) == "STOP" for c in candidates
+    )
+
+def _from_dict(data):
+    # The SDK is imported on first use, not at module import (cold start)
+    from vertexai.generative_models import GenerationResponse
+    return GenerationResponse.from_dict(data)
+
+def cached_generate(model, contents, *, model_name, system_instruction=None, tools=None,
+                    use_cache=True, ttl=None, **kwargs):
+    """
+    Drop-in for `model.generate_content(contents, **kwargs)` that checks the
+    shared cache first. `use_cache=False` skips both lookup and write.
+    Misses go through the guarded call layer (rate limit, retries, deadline).
+    Only complete responses (see `_complete`) are stored.
+    """
+    span = current_span()
+    if not use_cache:
+        response = generate(model, contents, model_name=model_name, **kwargs)
+        if span is not None:
+            span.add_usage(response)
+        return response
+
+    cache = get_cache()
+    key = make_key(model_name, system_instruction, tools, contents, **kwargs)
+    cached = cache.get(key)
+    if cached is not None:
+        logger.info(f"⚡ Cache hit ({model_name}).")
+        if span is not None:
+            span.add_usage(None, cache_hit=True)
+        return _from_dict(cached)
+
+    response = generate(model, contents, model_name=model_name, **kwargs)
+    if span is not None:
+        span.add_usage(response)
+    if _complete(response):
+        cache.put(key, response.to_dict(), ttl=ttl)
+    return response
+
+async def cached_generate_async(model, contents, *, model_name, system_instruction=None, tools=None,
+                                use_cache=True, ttl=None, **kwargs):
+    """Async `cached_generate` (misses await `generate_content_async`); same keys and cache."""
+    span = current_span()
+    cache = get_cache() if use_cache else None
+    key = make_key(model_name, system_instruction, tools, contents, **kwargs) if use_cache else None
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            logger.info(f"⚡ Cache hit ({model_name}).")
+            if span is not None:
+                span.add_usage(None, cache_hit=True)
+            return _from_dict(cached)
+
+    response = await generate_async(model, contents, model_name=model_name, **kwargs)
+    if span is not None:
+        span.add_usage(response)
+    if cache is not None and _complete(response):
+        cache.put(key, response.to_dict(), ttl=ttl)
+    return response
+
+# ==============================================================================
+# 🌊 STREAMING
+# ==============================================================================
+
+def response_text(response):
+    """Text of a response or stream chunk; empty for function-call-only chunks."""
+    try:
+        return response.text
+    except (ValueError, AttributeError, IndexError):
+        return ""
+
+def merge_chunks(chunks):
+    """Folds streamed chunks into one GenerationResponse (text joined, function calls kept)."""
+    texts, calls, usage, finish = [], [], None, None
+    for chunk in chunks:
+        data = chunk.to_dict()
+        for candidate in data.get("candidates", [])[:1]:
+            for part in candidate.get("content", {}).get("parts", []):
+                if "text" in part:
+                    texts.append(part["text"])
+                elif "function_call" in part:
+                    calls.append({"function_call": part["function_call"]})
+            finish = candidate.get("finish_reason", finish)
+        usage = data.get("usage_metadata") or usage
+    candidate = {"content": {"role": "model", "parts": ([{"text": "".join(texts)}] if texts else []) + calls}}
+    if finish:
+        candidate["finish_reason"] = finish
+    merged = {"candidates": [candidate]}
+    if usage:
+        merged["usage_metadata"] = usage
+    return _from_dict(merged)
+
+def cached_generate_stream(model, contents, *, model_name, system_instruction=None, tools=None,
+                           use_cache=True, ttl=None, **kwargs):
+    """
+    Streaming twin of `cached_generate`: yields response chunks as they arrive.
+    A cache hit yields the whole stored response as a single chunk; a miss
+    stores the merged response once the stream completes. Shares keys with
+    the non-streaming path, so either mode can serve the other.
+    """
+    cache = get_cache() if use_cache else None
+    key = make_key(model_name, system_instruction, tools, contents, **kwargs) if use_cache else None
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            logger.info(f"⚡ Cache hit ({model_name}).")
+            span = current_span()
+            if span is not None:
+                span.add_usage(None, cache_hit=True)
+            yield _from_dict(cached)
+            return
+
+    chunks = []
+    for chunk in generate_stream(model, contents, model_name=model_name, **kwargs):
+        chunks.append(chunk)
+        yield chunk
+
+    merged = merge_chunks(chunks)
+    span = current_span()
+    if span is not None:
+        span.add_usage(merged)
+    if cache is not None and chunks and _complete(merged):
+        cache.put(key, merged.to_dict(), ttl=ttl)
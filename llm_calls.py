@@ -0,0 +1,528 @@
+import asyncio
+import collections
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+logger = logging.getLogger("Calls")
+
+# --- CONFIGURATION ---
+RATE_PER_SECOND = float(os.getenv("VERTEX_RPS", "5"))          # Token bucket refill per model
+BURST = int(os.getenv("VERTEX_BURST", "10"))                    # Bucket size per model
+MAX_RETRIES = int(os.getenv("VERTEX_MAX_RETRIES", "4"))         # Retries after the first attempt
+BACKOFF_BASE = float(os.getenv("VERTEX_BACKOFF_BASE", "0.5"))   # Seconds; doubles per retry, full jitter
+BACKOFF_MAX = float(os.getenv("VERTEX_BACKOFF_MAX", "20"))
+CALL_DEADLINE = float(os.getenv("VERTEX_CALL_DEADLINE", "120")) # Seconds per call, retries and waits included
+HEDGE = os.getenv("VERTEX_HEDGE", "0") == "1"                   # Duplicate slow non-streaming calls
+HEDGE_MIN_SAMPLES = 20                                          # Latencies needed before hedging a model
+HEDGE_MIN_DELAY = 0.5                                           # Seconds; never hedge sooner than this
+BREAKER_FAILURES = int(os.getenv("VERTEX_BREAKER_FAILURES", "5"))   # Consecutive failures that open it
+BREAKER_COOLDOWN = float(os.getenv("VERTEX_BREAKER_COOLDOWN", "30"))  # Seconds open before a trial call
+CALL_THREADS = int(os.getenv("VERTEX_CALL_THREADS", "32"))
+# The SDK has no per-call timeout, so an abandoned attempt keeps its thread until
+# the request returns; past this many, new attempts fail fast instead of queueing
+MAX_ABANDONED = int(os.getenv("VERTEX_MAX_ABANDONED", str(CALL_THREADS // 2)))
+SAMPLES = 200
+
+RETRYABLE_NAMES = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+    "DeadlineExceeded", "GatewayTimeout", "BadGateway", "Aborted", "Unknown",
+}
+RETRYABLE_CODES = {429, 500, 502, 503, 504}
+
+# Attempts run here so a stuck call can be abandoned at its deadline and hedged
+# (its thread stays busy until the request returns; see MAX_ABANDONED)
+_CALL_POOL = ThreadPoolExecutor(max_workers=CALL_THREADS, thread_name_prefix="boardroom-llm")
+
+class CircuitOpenError(RuntimeError):
+    """The model's circuit breaker is open; the call was not sent."""
+
+class CallDeadlineExceeded(TimeoutError):
+    """The call (retries and rate-limit waits included) ran past its deadline."""
+
+class CallPoolSaturated(RuntimeError):
+    """Too many abandoned attempts still hold call threads; retried after a backoff."""
+
+def is_retryable(error):
+    """429s, 5xx, timeouts, dropped connections and a saturated call pool; not bad requests or auth errors."""
+    if isinstance(error, (CircuitOpenError, CallDeadlineExceeded)):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError, CallPoolSaturated)):
+        return True
+    if type(error).__name__ in RETRYABLE_NAMES:
+        return True
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and code in RETRYABLE_CODES
+
+def _open_stream(fn):
+    """Sends the streaming request and waits for its first chunk: (iterator, chunk or None)."""
+    stream = iter(fn())
+    return stream, next(stream, None)
+
+# ==============================================================================
+# 🚦 RATE LIMITER & CIRCUIT BREAKER
+# ==============================================================================
+
+class TokenBucket:
+    """
+    Thread-safe client-side limiter: `rate` calls per second with bursts of
+    up to `capacity` (at least 1). rate <= 0 means unlimited. Also paces
+    meeting starts in batch.py.
+    """
+    def __init__(self, rate=RATE_PER_SECOND, capacity=BURST):
+        self.rate = rate
+        self.capacity = max(1.0, float(capacity))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def _take(self, deadline):
+        """
+        Takes a token and returns 0, or returns the seconds to wait for one;
+        raises past `deadline` (None waits as long as it takes).
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            wait_for = (1 - self.tokens) / self.rate
+        if deadline is not None and now + wait_for > deadline:
+            raise CallDeadlineExceeded("rate limit wait would exceed the call deadline")
+        return wait_for
+
+    def acquire(self, deadline=None):
+        """Blocks until a token is free. Returns seconds waited; raises past `deadline`."""
+        waited = 0.0
+        while True:
+            wait_for = self._take(deadline)
+            if not wait_for:
+                return waited
+            time.sleep(wait_for)
+            waited += wait_for
+
+    async def acquire_async(self, deadline=None):
+        """`acquire` that yields to the event loop while waiting."""
+        waited = 0.0
+        while True:
+            wait_for = self._take(deadline)
+            if not wait_for:
+                return waited
+            await asyncio.sleep(wait_for)
+            waited += wait_for
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive retryable failures and rejects calls
+    for `cooldown` seconds; then lets one trial call through (half-open),
+    which closes it on success or re-opens it on failure.
+    """
+    def __init__(self, threshold=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self.trial:
+                self.trial = True
+                return True
+            return False
+
+    def release(self):
+        """Gives back a trial slot that was never used."""
+        with self._lock:
+            self.trial = False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def failure(self):
+        """Returns True if this failure opened the breaker."""
+        with self._lock:
+            self.failures += 1
+            was_trial, self.trial = self.trial, False
+            if was_trial or (self.opened_at is None and self.failures >= self.threshold):
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+# ==============================================================================
+# 🛡️ GUARDED CALLS
+# ==============================================================================
+
+class CallGuard:
+    """
+    The shared layer every Vertex call goes through: a token bucket and a
+    circuit breaker per model, jittered exponential backoff on retryable
+    errors, a deadline per call and (optionally) a hedged duplicate once a
+    call has run longer than the model's recent p95. Sync (`call`,
+    `call_stream`) and async (`call_async`) callers share all of it.
+    Counters: calls, retries, hedges, hedge_wins, throttles, deadlines,
+    rejected (breaker open), breaker_opens, failures, abandoned (attempts
+    given up while running), saturated (attempts refused, see MAX_ABANDONED).
+    """
+    def __init__(self, rate=RATE_PER_SECOND, burst=BURST, max_retries=MAX_RETRIES,
+                 deadline=CALL_DEADLINE, hedge=HEDGE):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self.hedge = hedge
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._breakers = {}
+        self._latency = collections.defaultdict(lambda: collections.deque(maxlen=SAMPLES))
+        self._stuck = 0  # Abandoned attempts still running on the call pool
+        self.counters = collections.Counter()
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def _bucket(self, model_name):
+        with self._lock:
+            if model_name not in self._buckets:
+                self._buckets[model_name] = TokenBucket(self.rate, self.burst)
+            return self._buckets[model_name]
+
+    def _breaker(self, model_name):
+        with self._lock:
+            if model_name not in self._breakers:
+                self._breakers[model_name] = CircuitBreaker()
+            return self._breakers[model_name]
+
+    def hedge_delay(self, model_name):
+        """p95 of recent successful latencies, or None until there are enough samples."""
+        with self._lock:
+            samples = sorted(self._latency[model_name])
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(HEDGE_MIN_DELAY, samples[min(len(samples) - 1, int(0.95 * len(samples)))])
+
+    def _allow(self, model_name):
+        if not self._breaker(model_name).allow():
+            self._count("rejected")
+            raise CircuitOpenError(f"circuit open for {model_name}; retry in a few seconds")
+
+    def _admit(self, model_name, deadline):
+        """Breaker check, then a rate-limit token (waiting for one counts as a throttle)."""
+        self._allow(model_name)
+        try:
+            waited = self._bucket(model_name).acquire(deadline)
+        except CallDeadlineExceeded:
+            self._breaker(model_name).release()
+            self._count("deadlines")
+            raise
+        if waited > 0:
+            self._count("throttles")
+
+    async def _admit_async(self, model_name, deadline):
+        self._allow(model_name)
+        try:
+            waited = await self._bucket(model_name).acquire_async(deadline)
+        except CallDeadlineExceeded:
+            self._breaker(model_name).release()
+            self._count("deadlines")
+            raise
+        except asyncio.CancelledError:
+            self._breaker(model_name).release()
+            raise
+        if waited > 0:
+            self._count("throttles")
+
+    def _abandon(self, futures):
+        """Cancels queued futures; running ones are counted as stuck until they return."""
+        for future in futures:
+            if future.cancel():
+                continue
+            with self._lock:
+                self.counters["abandoned"] += 1
+                self._stuck += 1
+            future.add_done_callback(self._unstuck)
+
+    def _unstuck(self, _future):
+        with self._lock:
+            self._stuck -= 1
+
+    def _saturated(self):
+        with self._lock:
+            return self._stuck >= MAX_ABANDONED
+
+    def _submit(self, fn, model_name):
+        """Submits an attempt to the call pool unless abandoned attempts fill it."""
+        if self._saturated():
+            self._count("saturated")
+            raise CallPoolSaturated(f"{model_name}: call threads are held by abandoned requests")
+        return _CALL_POOL.submit(contextvars.copy_context().run, fn)
+
+    def _attempt(self, fn, model_name, deadline):
+        """One attempt (plus its hedge) on the call pool, abandoned at the deadline."""
+        start = time.monotonic()
+        futures = [self._submit(fn, model_name)]
+        delay = self.hedge_delay(model_name) if self.hedge else None
+        if delay is not None:
+            done, _ = wait(futures, timeout=min(delay, max(0.0, deadline - time.monotonic())))
+            # A hedge never waits on the limiter or a stuck pool; either means we're already too busy
+            if not done and time.monotonic() < deadline and not self._saturated() \
+                    and self._bucket(model_name).try_acquire():
+                logger.info(f"🪞 {model_name}: no answer after {delay:.2f}s (p95), hedging.")
+                self._count("hedges")
+                futures.append(_CALL_POOL.submit(contextvars.copy_context().run, fn))
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if len(futures) > 1 and future is futures[1]:
+                        self._count("hedge_wins")
+                    with self._lock:
+                        self._latency[model_name].append(time.monotonic() - start)
+                    return future.result()
+                error = error or future.exception()
+        self._abandon(pending)
+        if error is not None:
+            raise error
+        self._count("deadlines")
+        raise CallDeadlineExceeded(f"{model_name} call exceeded its deadline")
+
+    async def _attempt_async(self, fn, model_name, deadline):
+        """`_attempt` for coroutine functions: the hedge is a second task, the loser is cancelled."""
+        start = time.monotonic()
+        tasks = [asyncio.ensure_future(fn())]
+        try:
+            delay = self.hedge_delay(model_name) if self.hedge else None
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=min(delay, max(0.0, deadline - time.monotonic())))
+                if not done and time.monotonic() < deadline and self._bucket(model_name).try_acquire():
+                    logger.info(f"🪞 {model_name}: no answer after {delay:.2f}s (p95), hedging.")
+                    self._count("hedges")
+                    tasks.append(asyncio.ensure_future(fn()))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is None:
+                        if len(tasks) > 1 and task is tasks[1]:
+                            self._count("hedge_wins")
+                        with self._lock:
+                            self._latency[model_name].append(time.monotonic() - start)
+                        return task.result()
+                    error = error or task.exception()
+            if error is not None:
+                raise error
+            self._count("deadlines")
+            raise CallDeadlineExceeded(f"{model_name} call exceeded its deadline")
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def _pause(self, attempt, deadline):
+        """Jittered backoff before retry `attempt`, or None if it would pass the deadline."""
+        pause = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+        return None if time.monotonic() + pause >= deadline else pause
+
+    def call(self, fn, model_name, deadline=None):
+        """
+        Runs `fn()` (one model request) under the guard and returns its result.
+        deadline: seconds for the whole call, retries included (default CALL_DEADLINE).
+        Raises the last error once retries run out, CircuitOpenError if the
+        model's breaker is open, or CallDeadlineExceeded.
+        """
+        deadline = time.monotonic() + (deadline or self.deadline)
+        breaker = self._breaker(model_name)
+        self._count("calls")
+        attempt = 0
+        while True:
+            self._admit(model_name, deadline)
+            try:
+                result = self._attempt(fn, model_name, deadline)
+            except Exception as e:
+                self._failed(model_name, breaker, e)
+                if not self._should_retry(e, attempt, deadline, model_name):
+                    raise
+                attempt += 1
+                continue
+            breaker.success()
+            return result
+
+    def call_stream(self, fn, model_name, deadline=None):
+        """
+        Streaming `call`: `fn()` returns a chunk iterator. Retries (and the
+        deadline) cover the request up to its first chunk; once text has been
+        yielded a failure is raised as is. Streams are never hedged.
+        """
+        deadline = time.monotonic() + (deadline or self.deadline)
+        breaker = self._breaker(model_name)
+        self._count("calls")
+        attempt = 0
+        while True:
+            self._admit(model_name, deadline)
+            try:
+                first = self._submit(lambda: _open_stream(fn), model_name)
+                done, _ = wait([first], timeout=max(0.0, deadline - time.monotonic()))
+                if not done:
+                    self._abandon([first])
+                    self._count("deadlines")
+                    raise CallDeadlineExceeded(f"{model_name} stream sent nothing before its deadline")
+                stream, chunk = first.result()
+            except Exception as e:
+                self._failed(model_name, breaker, e)
+                if not self._should_retry(e, attempt, deadline, model_name):
+                    raise
+                attempt += 1
+                continue
+            break
+        breaker.success()
+        if chunk is None:
+            return
+        yield chunk
+        yield from stream
+
+    def _failed(self, model_name, breaker, error):
+        if isinstance(error, CallPoolSaturated):
+            breaker.release()  # Nothing was sent: says nothing about this model
+            return
+        if not is_retryable(error) and not isinstance(error, CallDeadlineExceeded):
+            breaker.success()  # The model answered (e.g. a bad request); it isn't down
+            return
+        if breaker.failure():
+            self._count("breaker_opens")
+            logger.warning(f"⚡ Circuit opened for {model_name} after {breaker.failures} failures.")
+
+    def _retry_pause(self, error, attempt, deadline, model_name):
+        """Seconds to back off before retrying, or None to give up (counted either way)."""
+        pause = self._pause(attempt, deadline) if is_retryable(error) and attempt < self.max_retries else None
+        if pause is None:
+            self._count("failures")
+            logger.warning(f"❌ {model_name} failed after {attempt + 1} attempt(s): {type(error).__name__}: {error}")
+            return None
+        self._count("retries")
+        logger.info(f"🔁 {model_name}: {type(error).__name__}, retry {attempt + 1}/{self.max_retries}.")
+        return pause
+
+    def _should_retry(self, error, attempt, deadline, model_name):
+        pause = self._retry_pause(error, attempt, deadline, model_name)
+        if pause is None:
+            return False
+        time.sleep(pause)
+        return True
+
+    async def call_async(self, fn, model_name, deadline=None):
+        """
+        `call` for a coroutine function (e.g. `generate_content_async`), on the
+        same limiters, breakers and counters. Backoff and limiter waits yield
+        to the event loop; cancelling the caller cancels the in-flight request.
+        """
+        deadline = time.monotonic() + (deadline or self.deadline)
+        breaker = self._breaker(model_name)
+        self._count("calls")
+        attempt = 0
+        while True:
+            await self._admit_async(model_name, deadline)
+            try:
+                result = await self._attempt_async(fn, model_name, deadline)
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception as e:
+                self._failed(model_name, breaker, e)
+                pause = self._retry_pause(e, attempt, deadline, model_name)
+                if pause is None:
+                    raise
+                await asyncio.sleep(pause)
+                attempt += 1
+                continue
+            breaker.success()
+            return result
+
+    def stats(self):
+        """Counters, abandoned attempts still running, and each model's breaker state and hedge delay."""
+        with self._lock:
+            counters = dict(self.counters)
+            counters["abandoned_in_flight"] = self._stuck
+            models = set(self._breakers) | set(self._latency)
+        return {
+            **counters,
+            "models": {
+                name: {"breaker": self._breaker(name).state, "hedge_delay": self.hedge_delay(name)}
+                for name in sorted(models)
+            },
+        }
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+            self._breakers.clear()
+            self._latency.clear()
+            self.counters.clear()
+
+# --- SHARED INSTANCE ---
+_guard = None
+_guard_lock = threading.Lock()
+
+def get_guard():
+    """Process-wide guard, so limits, breakers and latency samples are shared by every caller."""
+    global _guard
+    with _guard_lock:
+        if _guard is None:
+            _guard = CallGuard()
+        return _guard
+
+def generate(model, contents, *, model_name, deadline=None, **kwargs):
+    """Guarded `model.generate_content(contents, **kwargs)`."""
+    return get_guard().call(lambda: model.generate_content(contents, **kwargs), model_name, deadline)
+
+def generate_stream(model, contents, *, model_name, deadline=None, **kwargs):
+    """Guarded `model.generate_content(contents, stream=True, **kwargs)`; yields chunks."""
+    return get_guard().call_stream(lambda: model.generate_content(contents, stream=True, **kwargs),
+                                   model_name, deadline)
+
+async def generate_async(model, contents, *, model_name, deadline=None, **kwargs):
+    """Guarded `await model.generate_content_async(contents, **kwargs)`."""
+    return await get_guard().call_async(lambda: model.generate_content_async(contents, **kwargs),
+                                        model_name, deadline)
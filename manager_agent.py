@@ -1,13 +1,70 @@
-from vertexai.generative_models import GenerativeModel
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio
+import threading
+import queue
+import contextvars
 import logging
+import time
+import os
 
 # Import our specialized workers
 from agent_workers import FinancialAnalyst, MarketResearcher
+from llm_cache import cached_generate, cached_generate_async, cached_generate_stream, response_text
+from intent_classifier import get_classifier
+from dataset_store import get_store
+from observability import span, run_scope, current_run_id, new_run_id
+from model_registry import get_model, get_worker
+from model_tiering import get_policy, tier_scope, estimate_tokens, meets_structure, PRO
+from stage_graph import fingerprint, as_memo
+from market_intel import get_provider
 
 # --- CONFIGURATION ---
 logger = logging.getLogger("Manager")
 MODEL_ROUTER = "gemini-2.5-flash" # Fast for classification
 MODEL_CEO = "gemini-2.5-pro"      # Smart for synthesis
+WORKER_THREADS = int(os.getenv("BOARDROOM_WORKER_THREADS", "8"))  # 2 per concurrent board meeting
+DISPATCH_MESSAGES = {"CFO": "👨‍💼 Manager dispatching CFO...", "CMO": "👩‍🎨 Manager dispatching CMO..."}
+
+# Shared pool for the worker fan-out. CFO and CMO reports are independent,
+# so they run side by side instead of back to back.
+_WORKER_POOL = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="boardroom-worker")
+
+def _timed(fn, *args, **kwargs):
+    """Runs fn and returns (result, elapsed_seconds)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def _submit(run_id, fn, *args, **kwargs):
+    """Submits to the worker pool with the caller's context, tagged with `run_id`."""
+    with run_scope(run_id):
+        ctx = contextvars.copy_context()
+    return _WORKER_POOL.submit(ctx.run, fn, *args, **kwargs)
+
+def _pump(stream, events, trace):
+    """
+    Drains a worker's `run_stream` into a shared queue (so CFO and CMO tokens
+    interleave) and returns (report, elapsed_seconds) like `_timed`.
+    The worker's turn/tool trace is copied into `trace`.
+    """
+    for event in stream:
+        events.put(event)
+        if event.get("done"):
+            trace.update(event["trace"])
+            return event["text"], event["elapsed"]
+    return "", 0.0
+
+def _memoizable(report, trace):
+    """Only complete reports are reused; errors and cancelled runs are retried next time."""
+    return bool(report) and not report.startswith("Error") and trace.get("stopped") != "cancelled"
+
+def _report_or_gap(report, role):
+    """A failed worker's "Error: ..." is not a report; tell the CEO it is missing instead."""
+    if report and not report.startswith("Error") and report != "Cancelled.":
+        return report
+    logger.warning(f"⚠️ {role} report unavailable ({(report or 'empty')[:120]}); CEO told to proceed without it.")
+    return (f"(UNAVAILABLE: the {role} could not complete its analysis. Do not invent its figures or findings; "
+            f"state what is missing and plan around it.)")
 
 class BoardroomManager:
     """
@@ -17,16 +74,54 @@ class BoardroomManager:
     3. CEO: Synthesizes a detailed directive.
     """
     def __init__(self):
-        self.router_model = GenerativeModel(MODEL_ROUTER)
-        self.ceo_model = GenerativeModel(MODEL_CEO)
+        # Clients and workers come from the process-wide registry, so a new
+        # manager costs a few dict lookups rather than fresh clients.
+        self.router_model = get_model(MODEL_ROUTER)
+        self.ceo_model = get_model(MODEL_CEO)
         
         # Initialize the Specialist Workers
-        self.cfo = FinancialAnalyst()
-        self.cmo = MarketResearcher()
+        self.cfo = get_worker(FinancialAnalyst)
+        self.cmo = get_worker(MarketResearcher)
+        
+        # Local fast-path router; falls back to the LLM when unsure
+        self.classifier = get_classifier()
+        
+        # Flash vs pro per call (prompt size, intent, latency budget, fast mode)
+        self.tiering = get_policy()
 
-    def route_request(self, user_input):
-        """Phase 1: Intent Classification"""
-        prompt = f"""
+    def route_request(self, user_input, use_cache=True, use_local=True, memo=None):
+        """
+        Phase 1: Intent Classification
+        The in-process classifier answers confident cases in well under a
+        millisecond; everything else goes to the flash router (and is logged
+        so the local tier keeps learning).
+        memo: stage memo (see stage_graph); an unchanged request reuses its intent.
+        """
+        memo = as_memo(memo)
+        fp = fingerprint("router", {"request": user_input})
+        hit = memo.get("router", fp) if memo is not None and use_cache else None
+        if hit is not None:
+            return hit["output"]
+        with span("router") as s:
+            if not use_local:
+                intent = self._route_with_llm(user_input, use_cache=use_cache)
+            else:
+                intent = self.classifier.route(
+                    user_input, lambda text: self._route_with_llm(text, use_cache=use_cache)
+                )
+            s.set(intent=intent)
+        if memo is not None:
+            memo.put("router", fp, intent)
+        return intent
+
+    def _route_with_llm(self, user_input, use_cache=True):
+        with span("router.llm", model=MODEL_ROUTER):
+            response = cached_generate(self.router_model, self._router_prompt(user_input),
+                                       model_name=MODEL_ROUTER, use_cache=use_cache)
+            return response.text.strip().upper()
+
+    def _router_prompt(self, user_input):
+        return f"""
         Classify this user request into exactly one category:
         - "FINANCE": Users asking specifically about numbers, profit, or data.
         - "MARKETING": Users asking specifically about ads, competitors, or brand.
@@ -36,56 +131,545 @@ class BoardroomManager:
         REQUEST: {user_input}
         OUTPUT ONLY THE CATEGORY WORD.
         """
-        response = self.router_model.generate_content(prompt)
-        return response.text.strip().upper()
 
-    def execute_workflow(self, niche, goal, location, currency, csv_context):
-        """
-        Phase 2: Execution & Synthesis (The "Board Meeting")
-        Now accepts 'currency' and 'location' to ensure high-fidelity outputs.
-        """
+    @staticmethod
+    def _dataset(csv_context):
+        """The dataset digest for a meeting's handle, resolved once and passed to every stage."""
+        return get_store().resolve(csv_context) if csv_context else None
+
+    def _worker_tasks(self, niche, location, currency, dataset_id=None):
+        """Builds the CFO and CMO briefs with FULL CONTEXT (Currency/Location)."""
+        # The ingest-time profile answers the standard P&L questions up front,
+        # saving the CFO several tool round trips.
+        from financial_profile import format_profile
+        profile_block = format_profile(get_store().profile(dataset_id)) if dataset_id else ""
         
-        # A. Deploy Workers
-        logger.info("👨‍💼 Manager dispatching CFO...")
         # We inject the Currency into the prompt so the CFO doesn't guess
         cfo_task = f"""
         Data Schema: Date, Category, Amount, Type.
         CURRENCY: {currency}
+        {profile_block}
         TASK: Perform a detailed P&L analysis for {niche}.
         """
-        cfo_report = self.cfo.run(cfo_task)
         
-        logger.info("👩‍🎨 Manager dispatching CMO...")
         # We inject the Location so the CMO finds local competitors
         cmo_task = f"""
         Niche: {niche}
         Location: {location}
         TASK: Research local competitors and create a campaign.
         """
-        cmo_report = self.cmo.run(cmo_task)
+        return cfo_task, cmo_task
+
+    def _stage_values(self, niche, location, currency, dataset_id, goal=None):
+        """Inputs the stage graph fingerprints; "dataset" is the CSV content hash."""
+        return {
+            "niche": niche,
+            "goal": goal,
+            "location": location,
+            "currency": currency,
+            "dataset": dataset_id,
+            "market": get_provider().version(),
+            "fast_mode": self.tiering.fast(),
+        }
+
+    def _plan_workers(self, values, memo, use_cache):
+        """Returns ({stage: fingerprint}, {stage: memoized entry}) for the CFO and CMO."""
+        fingerprints = {stage: fingerprint(stage, values) for stage in ("CFO", "CMO")}
+        reused = {}
+        if memo is not None and use_cache:
+            for stage, fp in fingerprints.items():
+                entry = memo.get(stage, fp)
+                if entry is not None:
+                    reused[stage] = entry
+        return fingerprints, reused
+
+    def _remember(self, memo, fingerprints, reused, reports, traces):
+        """Memoizes the worker reports that were computed (not reused) this run."""
+        if memo is None:
+            return
+        for stage, (report, elapsed) in reports.items():
+            if stage not in reused and _memoizable(report, traces[stage]):
+                memo.put(stage, fingerprints[stage], report, elapsed)
+
+    def _worker_jobs(self, niche, location, currency, dataset_id):
+        """[(stage, worker, task, run kwargs)] for the CFO and CMO, in that order."""
+        cfo_task, cmo_task = self._worker_tasks(niche, location, currency, dataset_id)
+        return [("CFO", self.cfo, cfo_task, {"dataset_id": dataset_id}), ("CMO", self.cmo, cmo_task, {})]
+
+    @staticmethod
+    def _reuse(stage, reused, traces):
+        """A memoized worker's (report, 0.0), or None when it has to run."""
+        if stage not in reused:
+            return None
+        traces[stage]["memoized"] = True
+        return reused[stage]["output"], 0.0
+
+    def dispatch_workers(self, niche, location, currency, use_cache=True, csv_context=None, stream=False,
+                         latency_budget=None, memo=None):
+        """
+        Starts the CFO and CMO on the shared pool and returns immediately.
+        csv_context: dataset store handle for the CFO's analysis.
+        stream: also publish token events on handle["events"] for `execute_workflow_stream`.
+        latency_budget: seconds for the whole meeting (tiering hint; default from the policy).
+        memo: stage memo (a StageMemo or a dict such as `BoardroomState.stages`);
+        a worker whose inputs are unchanged is not run and its report is reused.
+        Call this before `route_request` to overlap worker latency with routing;
+        pass the handle to `execute_workflow` or discard it with `cancel_workers`.
+        """
+        started = time.perf_counter()
+        budget = latency_budget if latency_budget is not None else self.tiering.latency_budget
+        with tier_scope(latency_budget=budget, started=started):
+            return self._dispatch_workers(niche, location, currency, use_cache, csv_context, stream, started,
+                                          as_memo(memo))
+
+    def _dispatch_workers(self, niche, location, currency, use_cache, csv_context, stream, started, memo):
+        cancel_event = threading.Event()
+        traces = {"CFO": {}, "CMO": {}}
+        run_id = current_run_id() or new_run_id()
+        events = queue.Queue() if stream else None
+        dataset_id = self._dataset(csv_context)
+        fingerprints, reused = self._plan_workers(
+            self._stage_values(niche, location, currency, dataset_id), memo, use_cache)
         
-        # B. CEO Synthesis (The Critic)
-        logger.info("👑 CEO Synthesizing Strategy...")
-        ceo_prompt = f"""
+        def start(stage, worker, task, kwargs):
+            reuse = self._reuse(stage, reused, traces)
+            if reuse is not None:
+                # Already-resolved future, plus the "done" event a stream would have sent
+                if events is not None:
+                    events.put({"stage": stage, "done": True, "text": reuse[0], "ttft": 0.0, "elapsed": 0.0})
+                future = Future()
+                future.set_result(reuse)
+                return future
+            logger.info(DISPATCH_MESSAGES[stage])
+            if stream:
+                worker_stream = worker.run_stream(task, cancel_event=cancel_event, use_cache=use_cache, **kwargs)
+                return _submit(run_id, _pump, worker_stream, events, traces[stage])
+            return _submit(run_id, _timed, worker.run, task, cancel_event=cancel_event,
+                           use_cache=use_cache, trace=traces[stage], **kwargs)
+        
+        futures = {job[0]: start(*job) for job in self._worker_jobs(niche, location, currency, dataset_id)}
+        handle = {
+            "cfo": futures["CFO"],
+            "cmo": futures["CMO"],
+            "run_id": run_id,
+            "traces": traces,
+            "cancel_event": cancel_event,
+            "started": started,
+            "memo": memo,
+            "fingerprints": fingerprints,
+            "reused": reused
+        }
+        if stream:
+            handle["events"] = events
+        return handle
+
+    def cancel_workers(self, workers):
+        """Drops speculative workers (e.g. when the router says CHAT)."""
+        if not workers:
+            return
+        workers["cancel_event"].set()
+        for key in ("cfo", "cmo"):
+            workers[key].cancel()
+        logger.info("🛑 Speculative workers discarded.")
+
+    def _ceo_prompt(self, cfo_report, cmo_report, goal, location, currency, history=None):
+        continuity = f"""
+        [BOARD HISTORY - RELEVANT PAST DIRECTIVES]
+        {history}
+        Build on what worked and do not repeat directives that have already been issued.
+        """ if history else ""
+        return f"""
         You are the CEO. Synthesize these reports into a Strategic Directive.
         
         [CFO REPORT - REALITY]
-        {cfo_report}
+        {_report_or_gap(cfo_report, "CFO")}
         
         [CMO REPORT - AMBITION]
-        {cmo_report}
+        {_report_or_gap(cmo_report, "CMO")}
         
         CONTEXT: 
         - Goal: '{goal}'
         - Currency: '{currency}'
         - Location: '{location}'
-        
+        {continuity}
         TASK: Write a 3-point execution plan that aligns the budget (CFO) with the ambition (CMO).
         """
-        final_strategy = self.ceo_model.generate_content(ceo_prompt).text
+
+    def run_meeting(self, user_input, niche, goal, location, currency, csv_context, speculative=True, use_cache=True,
+                    memo=None, history=None):
+        """
+        Routing + board meeting in one call.
+        With `speculative=True` the workers start while the router is still
+        deciding, so wall-clock time is roughly max(router, CFO, CMO) + CEO.
+        memo: stage memo shared by every stage (see `execute_workflow`).
+        history: relevant past directives for the CEO (see `execute_workflow`).
+        Returns {"intent": ...} plus the `execute_workflow` keys when the
+        intent is actionable.
+        """
+        memo = as_memo(memo)
+        with run_scope(current_run_id()):
+            start = time.perf_counter()
+            workers = self.dispatch_workers(niche, location, currency, use_cache=use_cache,
+                                            csv_context=csv_context, memo=memo) if speculative else None
+        
+            intent, route_time = _timed(self.route_request, user_input, use_cache=use_cache, memo=memo)
+        
+            if intent not in ("FINANCE", "MARKETING", "STRATEGY"):
+                self.cancel_workers(workers)
+                return {"intent": intent, "timings": {"router": route_time, "total": time.perf_counter() - start}}
+        
+            results = self.execute_workflow(niche, goal, location, currency, csv_context, workers=workers,
+                                           use_cache=use_cache, intent=intent, memo=memo, history=history)
+            results["intent"] = intent
+            results["timings"]["router"] = route_time
+            results["timings"]["total"] = time.perf_counter() - start
+            return results
+
+    def execute_workflow(self, niche, goal, location, currency, csv_context, concurrent=True, workers=None, use_cache=True,
+                         intent=None, latency_budget=None, fast_mode=None, memo=None, history=None):
+        """
+        Phase 2: Execution & Synthesis (The "Board Meeting")
+        Now accepts 'currency' and 'location' to ensure high-fidelity outputs.
         
+        csv_context: dataset store handle (content hash) of the uploaded CSV.
+        concurrent: run CFO and CMO in parallel (default) or one after the other.
+        workers: handle from `dispatch_workers` if they were started speculatively.
+        use_cache: set False to bypass the shared LLM response cache.
+        intent / latency_budget / fast_mode: tiering hints (see model_tiering);
+        fast_mode synthesizes on flash and escalates to pro if the directive
+        fails the 3-point check.
+        memo: stage memo (a StageMemo or a dict such as `BoardroomState.stages`).
+        history: relevant past directives for the CEO (MemoryService.relevant_history);
+        not part of the CEO's memo key, so a rerun with unchanged inputs still hits.
+        Stages whose input fingerprint is unchanged reuse their output, so a
+        goal edit costs one CEO call; use_cache=False recomputes everything.
+        Per-stage timings (seconds) are returned under "timings", with each
+        worker's per-turn and per-tool latencies under timings["trace"],
+        the CEO's model choice under timings["tier"] and the reused stages
+        under timings["reused"].
+        """
+        run_id = workers["run_id"] if workers else (current_run_id() or new_run_id())
+        with run_scope(run_id), span("workflow"), self._tier_scope(workers, intent, latency_budget, fast_mode):
+            results = self._execute_workflow(niche, goal, location, currency, csv_context,
+                                             concurrent, workers, use_cache, as_memo(memo), history)
+            results["run_id"] = run_id
+            return results
+
+    def _tier_scope(self, workers, intent, latency_budget, fast_mode):
+        """Tiering hints for one meeting; the budget clock starts when the workers did."""
+        budget = latency_budget if latency_budget is not None else self.tiering.latency_budget
+        started = workers["started"] if workers else time.perf_counter()
+        return tier_scope(intent=intent, latency_budget=budget, fast_mode=fast_mode, started=started)
+
+    # --- Meeting steps shared by the sync, streaming and async paths ---
+
+    @staticmethod
+    def _collect(workers):
+        """Waits for a dispatched handle's reports: {stage: (report, elapsed)}."""
+        return {"CFO": workers["cfo"].result(), "CMO": workers["cmo"].result()}
+
+    def _ceo_stage(self, values, reports, memo, use_cache):
+        """(fingerprint, memoized directive entry or None) for the CEO given this run's reports."""
+        fp = fingerprint("CEO", values, {stage: report for stage, (report, _) in reports.items()})
+        return fp, memo.get("CEO", fp) if memo is not None and use_cache else None
+
+    def _ceo_tier(self, ceo_prompt):
+        """(model_name, reason) the tiering policy picks for the CEO."""
+        return self.tiering.choose("ceo", estimate_tokens(ceo_prompt), default=MODEL_CEO)
+
+    def _escalate(self, model_name, escalated, text):
+        """Fast mode: a flash directive that fails `meets_structure` is redone on pro, once."""
+        if escalated or model_name == PRO or not self.tiering.fast() or meets_structure(text):
+            return False
+        logger.info("🎚️ Fast-mode directive failed the 3-point check; escalating to pro.")
+        return True
+
+    def _meeting_result(self, start, reports, workers_time, ceo, ceo_time, tier, reused, ceo_reused, traces,
+                        **extra):
+        """The `execute_workflow` dict; `extra` adds timing keys (the streaming path's ttft)."""
+        timings = {
+            "cfo": reports["CFO"][1],
+            "cmo": reports["CMO"][1],
+            "workers": workers_time,
+            "ceo": ceo_time,
+            "total": time.perf_counter() - start,
+            **extra,
+            "tier": tier,
+            "reused": sorted(reused) + (["CEO"] if ceo_reused else []),
+            "trace": traces
+        }
+        logger.info(f"⏱️ Board meeting timings: {timings}")
         return {
-            "cfo": cfo_report,
-            "cmo": cmo_report,
-            "ceo": final_strategy
-        }
\ No newline at end of file
+            "cfo": reports["CFO"][0],
+            "cmo": reports["CMO"][0],
+            "ceo": ceo,
+            "timings": timings
+        }
+
+    def _synthesize(self, ceo_prompt, use_cache):
+        """
+        CEO call on the tier the policy picks (see `_escalate` for fast mode).
+        Returns (directive, tier) with tier = {"model", "reason", "escalated"}.
+        """
+        model_name, reason = self._ceo_tier(ceo_prompt)
+        escalated = False
+        with span("ceo", model=model_name, tier=reason) as s:
+            while True:
+                text, elapsed = _timed(lambda: cached_generate(
+                    get_model(model_name), ceo_prompt, model_name=model_name, use_cache=use_cache).text)
+                self.tiering.record("ceo", model_name, reason, elapsed, escalated=escalated)
+                if not self._escalate(model_name, escalated, text):
+                    break
+                escalated, model_name = True, PRO
+            s.set(model=model_name, escalated=escalated)
+        return text, {"model": model_name, "reason": reason, "escalated": escalated}
+
+    def _execute_workflow(self, niche, goal, location, currency, csv_context, concurrent, workers, use_cache, memo,
+                          history=None):
+        start = time.perf_counter()
+        dataset_id = self._dataset(csv_context)
+        values = self._stage_values(niche, location, currency, dataset_id, goal=goal)
+        
+        # A. Deploy Workers
+        if workers is None and not concurrent:
+            traces = {"CFO": {}, "CMO": {}}
+            fingerprints, reused = self._plan_workers(values, memo, use_cache)
+            reports = {}
+            for stage, worker, task, kwargs in self._worker_jobs(niche, location, currency, dataset_id):
+                reports[stage] = self._reuse(stage, reused, traces)
+                if reports[stage] is None:
+                    logger.info(DISPATCH_MESSAGES[stage])
+                    reports[stage] = _timed(worker.run, task, use_cache=use_cache, trace=traces[stage], **kwargs)
+        else:
+            if workers is None:
+                workers = self.dispatch_workers(niche, location, currency, use_cache=use_cache,
+                                                csv_context=dataset_id, memo=memo)
+            reports = self._collect(workers)
+            traces = workers["traces"]
+            fingerprints, reused = workers["fingerprints"], workers["reused"]
+            memo = memo if memo is not None else workers["memo"]
+        self._remember(memo, fingerprints, reused, reports, traces)
+        workers_time = time.perf_counter() - start
+        
+        # B. CEO Synthesis (The Critic); skipped if neither its inputs nor the reports changed
+        ceo_fp, ceo_hit = self._ceo_stage(values, reports, memo, use_cache)
+        if ceo_hit is not None:
+            final_strategy, tier, ceo_time = ceo_hit["output"], None, 0.0
+        else:
+            logger.info("👑 CEO Synthesizing Strategy...")
+            ceo_prompt = self._ceo_prompt(reports["CFO"][0], reports["CMO"][0], goal, location, currency, history)
+            (final_strategy, tier), ceo_time = _timed(self._synthesize, ceo_prompt, use_cache)
+            if memo is not None:
+                memo.put("CEO", ceo_fp, final_strategy, ceo_time)
+        
+        return self._meeting_result(start, reports, workers_time, final_strategy, ceo_time, tier,
+                                    reused, ceo_hit is not None, traces)
+
+    def execute_workflow_stream(self, niche, goal, location, currency, csv_context, workers=None, use_cache=True,
+                                intent=None, latency_budget=None, fast_mode=None, memo=None, history=None):
+        """
+        Streaming `execute_workflow`. Yields events as they happen:
+        - {"stage": "CFO" | "CMO" | "CEO", "delta": text}
+        - {"stage": ..., "done": True, "text": report, "ttft": s, "elapsed": s}
+        - {"stage": "CEO", "reset": True} if a fast-mode draft is discarded for pro
+        - {"stage": "RESULT", "results": <execute_workflow dict>} last.
+        Timings gain "ttft" per stage and "first_token" (first token of any stage).
+        Tiering hints, memo and history are as in `execute_workflow`; a reused stage
+        sends only its "done" event.
+        workers: a handle from `dispatch_workers(..., stream=True)`; a
+        non-streaming handle is awaited and reported as whole reports.
+        """
+        run_id = workers["run_id"] if workers else (current_run_id() or new_run_id())
+        with run_scope(run_id), span("workflow", stream=True), \
+                self._tier_scope(workers, intent, latency_budget, fast_mode):
+            for event in self._execute_workflow_stream(niche, goal, location, currency, csv_context,
+                                                       workers, use_cache, as_memo(memo), history):
+                if event["stage"] == "RESULT":
+                    event["results"]["run_id"] = run_id
+                yield event
+
+    def _execute_workflow_stream(self, niche, goal, location, currency, csv_context, workers, use_cache, memo,
+                                 history=None):
+        start = time.perf_counter()
+        dataset_id = self._dataset(csv_context)
+        values = self._stage_values(niche, location, currency, dataset_id, goal=goal)
+        if workers is None:
+            workers = self.dispatch_workers(niche, location, currency, use_cache=use_cache,
+                                            csv_context=dataset_id, stream=True, memo=memo)
+        memo = memo if memo is not None else workers["memo"]
+        ttft = {}
+        first_token = None
+        
+        # A. Workers: relay interleaved CFO/CMO tokens until both are done
+        events = workers.get("events")
+        finished = set()
+        while events is not None and len(finished) < 2:
+            try:
+                event = events.get(timeout=0.1)
+            except queue.Empty:
+                if workers["cfo"].done() and workers["cmo"].done() and events.empty():
+                    break
+                continue
+            if event.get("done"):
+                finished.add(event["stage"])
+                ttft[event["stage"]] = event["ttft"]
+            elif first_token is None:
+                first_token = time.perf_counter() - start
+            yield event
+        
+        reports = self._collect(workers)
+        if events is None:
+            for stage, (report, elapsed) in reports.items():
+                yield {"stage": stage, "done": True, "text": report, "ttft": None, "elapsed": elapsed}
+        self._remember(memo, workers["fingerprints"], workers["reused"], reports, workers["traces"])
+        workers_time = time.perf_counter() - start
+        
+        # B. CEO Synthesis, streamed (or reused if neither its inputs nor the reports changed)
+        ceo_fp, ceo_hit = self._ceo_stage(values, reports, memo, use_cache)
+        if ceo_hit is not None:
+            final_strategy, tier, ceo_time = ceo_hit["output"], None, 0.0
+            yield {"stage": "CEO", "done": True, "text": final_strategy, "ttft": 0.0, "elapsed": 0.0}
+        else:
+            logger.info("👑 CEO Synthesizing Strategy...")
+            ceo_prompt = self._ceo_prompt(reports["CFO"][0], reports["CMO"][0], goal, location, currency, history)
+            ceo_start = time.perf_counter()
+            model_name, reason = self._ceo_tier(ceo_prompt)
+            escalated = False
+            with span("ceo", model=model_name, tier=reason, stream=True) as s:
+                while True:
+                    call_start = time.perf_counter()
+                    parts = []
+                    for chunk in cached_generate_stream(get_model(model_name), ceo_prompt,
+                                                        model_name=model_name, use_cache=use_cache):
+                        delta = response_text(chunk)
+                        if not delta:
+                            continue
+                        if "CEO" not in ttft:
+                            ttft["CEO"] = time.perf_counter() - ceo_start
+                            s.set(ttft=ttft["CEO"])
+                        if first_token is None:
+                            first_token = time.perf_counter() - start
+                        parts.append(delta)
+                        yield {"stage": "CEO", "delta": delta}
+                    final_strategy = "".join(parts)
+                    self.tiering.record("ceo", model_name, reason, time.perf_counter() - call_start,
+                                        escalated=escalated)
+                    if not self._escalate(model_name, escalated, final_strategy):
+                        break
+                    escalated, model_name = True, PRO
+                    yield {"stage": "CEO", "reset": True}
+                s.set(model=model_name, escalated=escalated)
+            tier = {"model": model_name, "reason": reason, "escalated": escalated}
+            ceo_time = time.perf_counter() - ceo_start
+            if memo is not None:
+                memo.put("CEO", ceo_fp, final_strategy, ceo_time)
+            yield {"stage": "CEO", "done": True, "text": final_strategy, "ttft": ttft.get("CEO"), "elapsed": ceo_time}
+        
+        yield {"stage": "RESULT", "results": self._meeting_result(
+            start, reports, workers_time, final_strategy, ceo_time, tier, workers["reused"], ceo_hit is not None,
+            workers["traces"], ttft=ttft, first_token=first_token)}
+
+    # --- Async API ---
+    # Same pipeline on one event loop: model calls await generate_content_async,
+    # so an in-flight meeting holds no thread. Tools and the dataset profile
+    # still run on thread pools (CPU-bound).
+
+    async def route_request_async(self, user_input, use_cache=True, use_local=True, memo=None):
+        """Async `route_request`; the flash router is awaited only when the local tier is unsure."""
+        memo = as_memo(memo)
+        fp = fingerprint("router", {"request": user_input})
+        hit = memo.get("router", fp) if memo is not None and use_cache else None
+        if hit is not None:
+            return hit["output"]
+        with span("router", asynchronous=True) as s:
+            route_with_llm = lambda text: self._route_with_llm_async(text, use_cache=use_cache)
+            if not use_local:
+                intent = await route_with_llm(user_input)
+            else:
+                intent = await self.classifier.route_async(user_input, route_with_llm)
+            s.set(intent=intent)
+        if memo is not None:
+            memo.put("router", fp, intent)
+        return intent
+
+    async def _route_with_llm_async(self, user_input, use_cache=True):
+        with span("router.llm", model=MODEL_ROUTER, asynchronous=True):
+            response = await cached_generate_async(self.router_model, self._router_prompt(user_input),
+                                                   model_name=MODEL_ROUTER, use_cache=use_cache)
+            return response.text.strip().upper()
+
+    async def execute_workflow_async(self, niche, goal, location, currency, csv_context, use_cache=True,
+                                     intent=None, latency_budget=None, fast_mode=None, memo=None, timeout=None,
+                                     history=None):
+        """
+        Async `execute_workflow`: CFO and CMO run as concurrent tasks, then
+        the CEO. Arguments, memoization and the returned dict are as in
+        `execute_workflow`. timeout: seconds for the whole meeting; raises
+        asyncio.TimeoutError (and cancels the in-flight calls) when it expires.
+        Cancelling the awaiting task cancels the meeting the same way.
+        """
+        run_id = current_run_id() or new_run_id()
+        with run_scope(run_id), span("workflow", asynchronous=True), \
+                self._tier_scope(None, intent, latency_budget, fast_mode):
+            results = await asyncio.wait_for(self._execute_workflow_async(
+                niche, goal, location, currency, csv_context, use_cache, as_memo(memo), history), timeout)
+            results["run_id"] = run_id
+            return results
+
+    async def _execute_workflow_async(self, niche, goal, location, currency, csv_context, use_cache, memo,
+                                      history=None):
+        start = time.perf_counter()
+        # Resolving the dataset may ingest it, and the briefs profile it on first use: off the event loop
+        dataset_id = await asyncio.to_thread(self._dataset, csv_context)
+        values, jobs = await asyncio.gather(
+            asyncio.to_thread(self._stage_values, niche, location, currency, dataset_id, goal=goal),
+            asyncio.to_thread(self._worker_jobs, niche, location, currency, dataset_id),
+        )
+        fingerprints, reused = self._plan_workers(values, memo, use_cache)
+        traces = {"CFO": {}, "CMO": {}}
+        
+        # A. Deploy Workers (concurrently, skipping any whose inputs are unchanged)
+        async def deploy(stage, worker, task, kwargs):
+            reuse = self._reuse(stage, reused, traces)
+            if reuse is not None:
+                return reuse
+            logger.info(DISPATCH_MESSAGES[stage])
+            started = time.perf_counter()
+            report = await worker.run_async(task, use_cache=use_cache, trace=traces[stage], **kwargs)
+            return report, time.perf_counter() - started
+        
+        reports = dict(zip([job[0] for job in jobs], await asyncio.gather(*[deploy(*job) for job in jobs])))
+        self._remember(memo, fingerprints, reused, reports, traces)
+        workers_time = time.perf_counter() - start
+        
+        # B. CEO Synthesis (The Critic); skipped if neither its inputs nor the reports changed
+        ceo_fp, ceo_hit = self._ceo_stage(values, reports, memo, use_cache)
+        if ceo_hit is not None:
+            final_strategy, tier, ceo_time = ceo_hit["output"], None, 0.0
+        else:
+            logger.info("👑 CEO Synthesizing Strategy...")
+            ceo_prompt = self._ceo_prompt(reports["CFO"][0], reports["CMO"][0], goal, location, currency, history)
+            started = time.perf_counter()
+            final_strategy, tier = await self._synthesize_async(ceo_prompt, use_cache)
+            ceo_time = time.perf_counter() - started
+            if memo is not None:
+                memo.put("CEO", ceo_fp, final_strategy, ceo_time)
+        
+        return self._meeting_result(start, reports, workers_time, final_strategy, ceo_time, tier,
+                                    reused, ceo_hit is not None, traces)
+
+    async def _synthesize_async(self, ceo_prompt, use_cache):
+        """Async `_synthesize` (same tiering and fast-mode escalation)."""
+        model_name, reason = self._ceo_tier(ceo_prompt)
+        escalated = False
+        with span("ceo", model=model_name, tier=reason, asynchronous=True) as s:
+            while True:
+                started = time.perf_counter()
+                text = (await cached_generate_async(
+                    get_model(model_name), ceo_prompt, model_name=model_name, use_cache=use_cache)).text
+                self.tiering.record("ceo", model_name, reason, time.perf_counter() - started, escalated=escalated)
+                if not self._escalate(model_name, escalated, text):
+                    break
+                escalated, model_name = True, PRO
+            s.set(model=model_name, escalated=escalated)
+        return text, {"model": model_name, "reason": reason, "escalated": escalated}
@@ -0,0 +1,266 @@
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+logger = logging.getLogger("MarketIntel")
+
+# --- CONFIGURATION ---
+# CLOUD FIX: Use /tmp for the index in production
+if os.path.exists("/tmp"):
+    INDEX_DB = "/tmp/boardroom_market.sqlite3"
+else:
+    INDEX_DB = "boardroom_market.sqlite3"
+
+SEED_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "market_corpus.jsonl")
+PROVIDER = os.getenv("MARKET_PROVIDER", "local")   # local | simulated
+RESULT_TTL = 3600                                  # Seconds a ranked lookup is reused
+RESULT_ENTRIES = 512
+MAX_RESULTS = 6
+FIELDS = ("niche", "location", "kind", "title", "body")
+_WORD = re.compile(r"[\w']+", re.UNICODE)
+
+# ==============================================================================
+# 🔌 PROVIDER INTERFACE
+# ==============================================================================
+
+class MarketProvider:
+    """
+    What `search_market_data` calls. Implement `search` (ranked documents
+    as dicts with FIELDS) and `version` (changes whenever results may);
+    `report` formats the hits for the CMO.
+    """
+    name = "base"
+
+    def search(self, niche, location, limit=MAX_RESULTS):
+        raise NotImplementedError
+
+    def version(self):
+        return self.name
+
+    def report(self, niche, location):
+        docs = self.search(niche, location)
+        if not docs:
+            return (f"[MARKET INTELLIGENCE: {niche} in {location}]\n"
+                    "No indexed documents match this niche or location. "
+                    "Base the strategy on general principles and say the local data is missing.")
+        lines = [f"[MARKET INTELLIGENCE: {niche} in {location}]", ""]
+        for i, doc in enumerate(docs, 1):
+            lines.append(f"{i}. {doc['kind'].upper()}: {doc['title']} ({doc['niche']}, {doc['location']})")
+            lines.append(f"   {doc['body']}")
+            lines.append("")
+        return "\n".join(lines).rstrip()
+
+class SimulatedProvider(MarketProvider):
+    """The original canned report: the same four findings for any niche and location."""
+    name = "simulated"
+
+    def search(self, niche, location, limit=MAX_RESULTS):
+        return []
+
+    def report(self, niche, location):
+        return f"""
+    [DEEP MARKET INTELLIGENCE: {niche} in {location}]
+
+    1. DOMINANT COMPETITOR: 'The {location} Collective'
+       - Strategy: High-end, expensive aesthetics.
+       - Weakness: Slow service and intimidating menu.
+
+    2. SECONDARY COMPETITOR: '{location} Express'
+       - Strategy: Pure speed and drive-thru.
+       - Weakness: Low quality, no community connection.
+
+    3. CONSUMER PSYCHOLOGY ({location}):
+       - Locals are currently valuing "Third Spaces" (places to sit and work) over grab-and-go.
+       - High demand for "Hyper-Local" ingredients (consumers want to know the farm name).
+
+    4. 2025 VIRAL TREND: "The Deconstructed Experience"
+       - Customers want to customize the 'build' of their product.
+       - Sustainability is no longer a perk; it is a requirement.
+    """
+
+# ==============================================================================
+# 🔎 LOCAL CORPUS (SQLite FTS5)
+# ==============================================================================
+
+def _match_query(*texts):
+    """FTS5 query that ORs every word of the niche and location (quoted, so no syntax leaks in)."""
+    words = {w.lower() for text in texts for w in _WORD.findall(text or "") if len(w) > 1}
+    return " OR ".join(f'"{w}"' for w in sorted(words))
+
+class LocalCorpusProvider(MarketProvider):
+    """
+    Market and competitor documents in a SQLite FTS5 index, ranked with
+    BM25 (niche and location weigh more than body text). Lookups are cached
+    for RESULT_TTL seconds; a corpus version change (a load or rebuild here
+    or in another process, e.g. the CLI) drops the cache.
+    An empty index is filled from SEED_CORPUS on first use.
+    """
+    name = "local"
+
+    def __init__(self, db_path=INDEX_DB, seed=SEED_CORPUS, ttl=RESULT_TTL):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._results = OrderedDict()  # (niche, location, limit) -> (expires_at, docs)
+        self._results_version = None   # Corpus version the cached results were read from
+        self.counters = {"hits": 0, "lookups": 0}
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5("
+            "niche, location, kind UNINDEXED, title, body, tokenize='porter unicode61')"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        if seed and os.path.exists(seed) and self.count() == 0:
+            self.load_file(seed)
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def version(self):
+        with self._lock:
+            return self._version()
+
+    def _version(self):
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return f"local:{row[0] if row else 'empty'}"
+
+    def _changed(self):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (uuid.uuid4().hex[:12],))
+        self._results.clear()
+
+    def load(self, docs, replace=False):
+        """Bulk-inserts documents (dicts with FIELDS) in one transaction; returns how many."""
+        rows = [tuple(str(doc.get(field) or "") for field in FIELDS) for doc in docs]
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                if replace:
+                    self._db.execute("DELETE FROM docs")
+                self._db.executemany(f"INSERT INTO docs ({', '.join(FIELDS)}) VALUES (?, ?, ?, ?, ?)", rows)
+                self._changed()
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        logger.info(f"📚 Loaded {len(rows)} market documents{' (replaced corpus)' if replace else ''}.")
+        return len(rows)
+
+    def load_file(self, path, replace=False):
+        """Loads a JSONL corpus, one document per line."""
+        with open(path, "r") as f:
+            return self.load((json.loads(line) for line in f if line.strip()), replace=replace)
+
+    def rebuild(self):
+        """Rebuilds and optimizes the full-text index (after bulk loads or a crash)."""
+        start = time.perf_counter()
+        with self._lock:
+            self._db.execute("INSERT INTO docs(docs) VALUES ('rebuild')")
+            self._db.execute("INSERT INTO docs(docs) VALUES ('optimize')")
+            self._changed()
+        logger.info(f"📚 Market index rebuilt in {time.perf_counter() - start:.3f}s.")
+
+    def search(self, niche, location, limit=MAX_RESULTS):
+        key = ((niche or "").strip().lower(), (location or "").strip().lower(), limit)
+        now = time.time()
+        with self._lock:
+            self.counters["lookups"] += 1
+            # One indexed row: cheap enough to check on every lookup
+            version = self._version()
+            if version != self._results_version:
+                self._results.clear()
+                self._results_version = version
+            entry = self._results.get(key)
+            if entry and entry[0] > now:
+                self._results.move_to_end(key)
+                self.counters["hits"] += 1
+                return entry[1]
+            query = _match_query(niche, location)
+            docs = []
+            if query:
+                rows = self._db.execute(
+                    f"SELECT {', '.join(FIELDS)} FROM docs WHERE docs MATCH ? "
+                    "ORDER BY bm25(docs, 4.0, 3.0, 0.0, 2.0, 1.0) LIMIT ?",
+                    (query, limit)
+                ).fetchall()
+                docs = [dict(zip(FIELDS, row)) for row in rows]
+            self._results[key] = (now + self.ttl, docs)
+            while len(self._results) > RESULT_ENTRIES:
+                self._results.popitem(last=False)
+            return docs
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        stats["documents"] = self.count()
+        stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+        return stats
+
+PROVIDERS = {"local": LocalCorpusProvider, "simulated": SimulatedProvider}
+
+# --- SHARED INSTANCE ---
+_provider = None
+_provider_lock = threading.Lock()
+
+def get_provider():
+    """Process-wide provider chosen by MARKET_PROVIDER."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = PROVIDERS[PROVIDER]()
+        return _provider
+
+def set_provider(provider):
+    """Swaps the shared provider (pass None to rebuild the default on next use)."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
+
+# ==============================================================================
+# 🖥️ INDEX COMMANDS
+# ==============================================================================
+#   python market_intel.py load corpus.jsonl [--replace]
+#   python market_intel.py rebuild
+#   python market_intel.py search "Coffee Shop" "London, UK"
+#   python market_intel.py stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the local market-intelligence index.")
+    parser.add_argument("--db", default=INDEX_DB, help="Index database path.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    load = commands.add_parser("load", help="Bulk-load a JSONL corpus.")
+    load.add_argument("path")
+    load.add_argument("--replace", action="store_true", help="Drop the current corpus first.")
+    commands.add_parser("rebuild", help="Rebuild and optimize the full-text index.")
+    search = commands.add_parser("search", help="Ranked lookup by niche and location.")
+    search.add_argument("niche")
+    search.add_argument("location")
+    commands.add_parser("stats", help="Document count and cache counters.")
+    args = parser.parse_args(argv)
+
+    provider = LocalCorpusProvider(db_path=args.db, seed=None if args.command == "load" else SEED_CORPUS)
+    if args.command == "load":
+        print(f"Loaded {provider.load_file(args.path, replace=args.replace)} documents "
+              f"({provider.count()} in the index).")
+    elif args.command == "rebuild":
+        provider.rebuild()
+        print(f"Rebuilt the index ({provider.count()} documents).")
+    elif args.command == "search":
+        start = time.perf_counter()
+        report = provider.report(args.niche, args.location)
+        print(report)
+        print(f"\n({(time.perf_counter() - start) * 1000:.2f} ms)")
+    else:
+        print(json.dumps({**provider.stats(), "version": provider.version()}, indent=2))
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s | %(name)s | %(message)s")
+    main()
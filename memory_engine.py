@@ -1,8 +1,11 @@
 import json
 import os
+import re
 import logging
-from dataclasses import dataclass, asdict, field
-from typing import List, Optional
+import sqlite3
+import threading
+from dataclasses import dataclass, asdict, field, fields
+from typing import Dict, List, Optional
 from datetime import datetime
 
 # Logging
@@ -24,77 +27,259 @@ class BoardroomState:
     # Historical archive (Compacted context)
     history: List[str] = field(default_factory=list)
     last_updated: str = ""
+    # Memoized workflow stage outputs by input fingerprint (see stage_graph)
+    stages: Dict[str, Dict[str, dict]] = field(default_factory=dict)
 
     def to_dict(self):
         return asdict(self)
 
+# Scalar fields stored one row each, so a save only rewrites what changed
+STATE_FIELDS = [f.name for f in fields(BoardroomState) if f.name != "history"]
+
 # --- MEMORY SERVICE ---
 class MemoryService:
-    def __init__(self, storage_file="boardroom_memory.json"):
+    """
+    SQLite (WAL) state store, keyed by session / tenant ID.
+    - `state` holds one row per (session, field); saves write only changed fields.
+    - `history` is append-only, one row per entry, readable on its own.
+    Every save is a single transaction, so a crash never leaves a torn state.
+    """
+    def __init__(self, storage_file="boardroom_memory.sqlite3", session_id="default"):
         # CLOUD FIX: Use /tmp directory for writable files if it exists
         if os.path.exists("/tmp"):
             self.storage_file = os.path.join("/tmp", storage_file)
         else:
             self.storage_file = storage_file
-            
+        self.session_id = session_id
+        
+        self._local = threading.local()
+        self._saved: Dict[str, str] = {}      # Last persisted values (JSON), for change detection
+        self._saved_history: Optional[List[str]] = None  # None = not read from disk yet
+        self._archive_checked = False
+        self._unarchived: List[dict] = []     # Compacted directives waiting for the next save
         self._ensure_storage()
 
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers and a writer run concurrently."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.storage_file, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
     def _ensure_storage(self):
-        if not os.path.exists(self.storage_file):
-            self.save_state(BoardroomState(niche="", goal=""))
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS state ("
+                "session_id TEXT NOT NULL, field TEXT NOT NULL, value TEXT, "
+                "PRIMARY KEY (session_id, field))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS history ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, "
+                "entry TEXT NOT NULL, created_at TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_session ON history(session_id, id)")
+        self._import_legacy_json()
+
+    def _import_legacy_json(self):
+        """One-time migration of the old shared boardroom_memory.json into the default session."""
+        legacy = os.path.join(os.path.dirname(self.storage_file), "boardroom_memory.json")
+        if self.session_id != "default" or not os.path.exists(legacy):
+            return
+        exists = self._conn().execute(
+            "SELECT 1 FROM state WHERE session_id = ? LIMIT 1", (self.session_id,)
+        ).fetchone()
+        if exists:
+            return
+        try:
+            with open(legacy, 'r') as f:
+                data = json.load(f)
+            self.save_state(BoardroomState(
+                niche=data.get("niche", ""),
+                goal=data.get("goal", ""),
+                cfo_data=data.get("cfo_data"),
+                cmo_data=data.get("cmo_data"),
+                ceo_data=data.get("ceo_data"),
+                history=data.get("history", []),
+            ))
+            logger.info(f"📦 Imported legacy memory from {legacy}.")
+        except Exception as e:
+            logger.error(f"⚠️ Legacy memory import skipped: {e}")
 
     def save_state(self, state: BoardroomState):
         """
         Saves state to disk.
+        Only fields that changed since the last save/load are written, and
+        history is diffed into row inserts/deletes, all in one transaction.
+        Directives compacted since the last save are archived afterwards.
+        Returns False (and archives nothing) if the write failed.
         """
         state.last_updated = datetime.now().isoformat()
         try:
-            with open(self.storage_file, 'w') as f:
-                json.dump(state.to_dict(), f, indent=4)
-            logger.info(f"💾 State saved to {self.storage_file}.")
+            # Compared as JSON, so in-place edits (e.g. the stage memo) are seen
+            values = {name: json.dumps(getattr(state, name)) for name in STATE_FIELDS}
+            changed = [
+                (self.session_id, name, value)
+                for name, value in values.items()
+                if self._saved.get(name) != value
+            ]
+            if self._saved_history is None:
+                self._saved_history = self.read_history()
+            dropped, appended = self._diff_history(self._saved_history, state.history)
+            
+            with self._conn() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO state (session_id, field, value) VALUES (?, ?, ?)", changed
+                )
+                if dropped:
+                    conn.execute(
+                        "DELETE FROM history WHERE id IN ("
+                        "SELECT id FROM history WHERE session_id = ? ORDER BY id LIMIT ?)",
+                        (self.session_id, dropped)
+                    )
+                conn.executemany(
+                    "INSERT INTO history (session_id, entry, created_at) VALUES (?, ?, ?)",
+                    [(self.session_id, entry, state.last_updated) for entry in appended]
+                )
+            
+            self._saved.update(values)
+            self._saved_history = list(state.history)
+            logger.info(f"💾 State saved to {self.storage_file} [{self.session_id}] ({len(changed)} fields).")
         except Exception as e:
             logger.error(f"❌ Save failed: {e}")
+            return False
+        
+        # Compacted directives reach the archive only with the state that dropped them
+        while self._unarchived:
+            entry = self._unarchived[0]
+            try:
+                self._archive().add(self.session_id, entry["niche"], entry["goal"], entry["directive"],
+                                    created_at=entry["created_at"] or None)
+            except Exception as e:
+                logger.error(f"⚠️ Archiving a compacted directive failed: {e}")
+                break
+            self._unarchived.pop(0)
+        return True
+
+    @staticmethod
+    def _diff_history(old: List[str], new: List[str]):
+        """
+        Returns (rows dropped from the front, entries appended at the end)
+        that turn `old` into `new`. Falls back to a full rewrite otherwise.
+        """
+        for dropped in range(len(old) + 1):
+            kept = old[dropped:]
+            if new[:len(kept)] == kept:
+                return dropped, new[len(kept):]
+        return len(old), list(new)
 
     def load_state(self) -> BoardroomState:
         try:
-            if not os.path.exists(self.storage_file):
-                return BoardroomState(niche="", goal="")
-            
-            with open(self.storage_file, 'r') as f:
-                data = json.load(f)
+            rows = self._conn().execute(
+                "SELECT field, value FROM state WHERE session_id = ?", (self.session_id,)
+            ).fetchall()
+            raw = {name: value for name, value in rows if name in STATE_FIELDS}
+            data = {name: json.loads(value) for name, value in raw.items()}
+            history = self.read_history()
             
             # Rehydrate
-            return BoardroomState(
-                niche=data.get("niche", ""),
-                goal=data.get("goal", ""),
+            state = BoardroomState(
+                niche=data.get("niche") or "",
+                goal=data.get("goal") or "",
                 cfo_data=data.get("cfo_data"),
                 cmo_data=data.get("cmo_data"),
                 ceo_data=data.get("ceo_data"),
-                history=data.get("history", []),
-                last_updated=data.get("last_updated", "")
+                history=history,
+                last_updated=data.get("last_updated") or "",
+                stages=data.get("stages") or {}
             )
+            self._saved = raw
+            self._saved_history = list(history)
+            return state
         except Exception as e:
-            logger.error(f"⚠️ Corrupt memory. Resetting. Error: {e}")
+            logger.error(f"⚠️ Could not load memory: {e}")
             return BoardroomState(niche="", goal="")
 
+    def read_history(self, limit: Optional[int] = None, offset: int = 0) -> List[str]:
+        """Reads history entries (oldest first) without touching the rest of the state."""
+        query = "SELECT entry FROM history WHERE session_id = ? ORDER BY id LIMIT ? OFFSET ?"
+        rows = self._conn().execute(
+            query, (self.session_id, -1 if limit is None else limit, offset)
+        ).fetchall()
+        return [entry for (entry,) in rows]
+
+    def clear_memory(self):
+        """Deletes this session's state, history and strategy archive."""
+        with self._conn() as conn:
+            conn.execute("DELETE FROM state WHERE session_id = ?", (self.session_id,))
+            conn.execute("DELETE FROM history WHERE session_id = ?", (self.session_id,))
+        self._archive().clear(self.session_id)
+        self._unarchived = []
+        self._saved = {}
+        self._saved_history = []
+        logger.info(f"🧹 Memory cleared [{self.session_id}].")
+
+    def _archive(self):
+        from strategy_history import get_history
+        archive = get_history(self.storage_file)
+        if not self._archive_checked:
+            # Sessions compacted before the archive existed: index their summaries once
+            self._archive_checked = True
+            if archive.count(self.session_id) == 0:
+                for entry in self.read_history():
+                    m = re.match(r"\[(.*?)\] Strategy for '(.*?)': (.*)", entry, re.DOTALL)
+                    if m:
+                        archive.add(self.session_id, m.group(2), "", m.group(3), created_at=m.group(1))
+        return archive
+
     def compact_context(self, state: BoardroomState):
         """
         CONTEXT ENGINEERING: COMPACTION
         Moves the 'Active' CEO directive into 'Long-Term History' to free up
-        the context window for the new session.
+        the context window for the new session. The full directive goes to
+        the strategy archive (unbounded, retrieved by relevance at synthesis
+        time) on the next successful `save_state`, so a run that is never
+        saved archives nothing; `state.history` keeps a short summary of the
+        last few for display.
         """
         if state.ceo_data:
             logger.info("🧹 Compacting previous strategy into history...")
+            self._archive()  # The legacy backfill must run before this summary is saved
+            self._unarchived.append({"niche": state.niche, "goal": state.goal,
+                                     "directive": state.ceo_data, "created_at": state.last_updated})
+            
             # Create a summary string
             summary = f"[{state.last_updated}] Strategy for '{state.niche}': {state.ceo_data[:100]}..."
             
             # Push to history (The "Filing Cabinet")
             state.history.append(summary)
             
-            # Pruning Strategy: Keep only last 5 historical items (Context Window Management)
+            # Display window: keep the last 5 summaries (the archive keeps everything)
             if len(state.history) > 5:
-                removed = state.history.pop(0)
-                logger.info(f"🗑️ Pruned oldest history: {removed[:20]}...")
+                state.history.pop(0)
             
             # Clear the active slot
-            state.ceo_data = None
\ No newline at end of file
+            state.ceo_data = None
+
+    def relevant_history(self, niche: str, goal: str, k: Optional[int] = None,
+                         max_tokens: Optional[int] = None, state: Optional[BoardroomState] = None) -> str:
+        """
+        Past directives of this session most relevant to `niche` and `goal`,
+        as one prompt block within `max_tokens` (defaults from
+        strategy_history). Empty if nothing relevant is archived.
+        state: its active directive, not compacted yet, is ranked alongside the archive.
+        """
+        from strategy_history import TOP_K, HISTORY_TOKENS
+        pending = list(self._unarchived)
+        if state is not None and state.ceo_data:
+            pending.append({"niche": state.niche, "goal": state.goal,
+                            "directive": state.ceo_data, "created_at": state.last_updated})
+        try:
+            return self._archive().context(self.session_id, niche, goal, k=k or TOP_K,
+                                           max_tokens=max_tokens or HISTORY_TOKENS, pending=pending)
+        except Exception as e:
+            logger.error(f"⚠️ History lookup failed: {e}")
+            return ""
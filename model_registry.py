@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from llm_cache import _to_jsonable
+
+logger = logging.getLogger("Registry")
+
+# vertexai's GenerativeModel, imported (and vertexai.init run) on the first
+# client rather than at module import. Offline stand-ins replace it.
+GenerativeModel = None
+_vertex_lock = threading.Lock()
+_vertex_ready = False
+
+def init_vertex():
+    """Runs vertexai.init once per process from GCP_PROJECT_ID (no-op without it)."""
+    global _vertex_ready
+    with _vertex_lock:
+        if _vertex_ready:
+            return
+        project_id = os.getenv("GCP_PROJECT_ID")
+        if project_id:
+            import vertexai
+            vertexai.init(project=project_id, location=os.getenv("GCP_LOCATION", "us-central1"))
+        _vertex_ready = True
+
+def _factory():
+    global GenerativeModel
+    if GenerativeModel is None:
+        init_vertex()
+        from vertexai.generative_models import GenerativeModel as factory
+        GenerativeModel = factory
+    return GenerativeModel
+
+# ==============================================================================
+# ♻️ PROCESS-WIDE CLIENT REGISTRY
+# ==============================================================================
+# GenerativeModel clients, workers and the manager are stateless between
+# calls (history, traces and cancel events are per run), so one instance per
+# configuration serves every session and Streamlit rerun. Reusing the client
+# also reuses its underlying gRPC channel.
+
+class ModelRegistry:
+    """
+    Thread-safe get-or-create cache keyed by (factory, model name, system
+    instruction, tool schemas). Counts hits and misses for the reuse rate.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._models = {}
+        self._objects = {}
+        self.counters = {"hits": 0, "misses": 0}
+        self.warmed_at = None
+
+    def _count(self, hit):
+        self.counters["hits" if hit else "misses"] += 1
+
+    def model(self, model_name, system_instruction=None, tools=None):
+        """Shared GenerativeModel for this configuration."""
+        factory = _factory()  # Looked up per call so offline stand-ins can swap it
+        key = (id(factory), model_name, system_instruction,
+               json.dumps(_to_jsonable(tools), sort_keys=True) if tools else None)
+        with self._lock:
+            client = self._models.get(key)
+            self._count(client is not None)
+            if client is None:
+                client = factory(model_name, system_instruction=system_instruction, tools=tools)
+                self._models[key] = client
+            return client
+
+    def instance(self, cls, *args):
+        """Shared instance of `cls(*args)` (workers, the manager)."""
+        key = (id(_factory()), cls, args)
+        with self._lock:
+            obj = self._objects.get(key)
+            self._count(obj is not None)
+            if obj is None:
+                obj = cls(*args)
+                self._objects[key] = obj
+            return obj
+
+    def warm_up(self, ping=False):
+        """
+        Builds the manager (and with it every model client and worker).
+        ping: also send a count_tokens request per client to open its channel.
+        """
+        start = time.perf_counter()
+        get_manager()
+        if ping:
+            with self._lock:
+                clients = list(self._models.values())
+            for client in clients:
+                try:
+                    client.count_tokens("ping")
+                except Exception as e:
+                    logger.warning(f"Warm-up ping failed for {getattr(client, '_model_name', client)}: {e}")
+        self.warmed_at = time.time()
+        logger.info(f"♻️ Registry warmed in {time.perf_counter() - start:.2f}s ({len(self._models)} clients).")
+
+    def stats(self):
+        with self._lock:
+            total = self.counters["hits"] + self.counters["misses"]
+            return {
+                "models": len(self._models),
+                "instances": len(self._objects),
+                **self.counters,
+                "reuse_rate": self.counters["hits"] / total if total else None,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._objects.clear()
+
+# --- SHARED INSTANCE ---
+REGISTRY = ModelRegistry()
+
+def get_model(model_name, system_instruction=None, tools=None):
+    return REGISTRY.model(model_name, system_instruction=system_instruction, tools=tools)
+
+def get_worker(cls):
+    """Shared FinancialAnalyst / MarketResearcher (any zero-arg WorkerAgent subclass)."""
+    return REGISTRY.instance(cls)
+
+def get_manager():
+    """Shared BoardroomManager; use instead of constructing one per request."""
+    from manager_agent import BoardroomManager
+    return REGISTRY.instance(BoardroomManager)
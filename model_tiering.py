@@ -0,0 +1,146 @@
+import collections
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from llm_cache import _to_jsonable
+
+logger = logging.getLogger("Tiering")
+
+# --- CONFIGURATION ---
+FLASH = "gemini-2.5-flash"
+PRO = "gemini-2.5-pro"
+TIERING_MODE = os.getenv("BOARDROOM_TIERING", "conservative")         # conservative | auto | fixed
+FAST_MODE = os.getenv("BOARDROOM_FAST_MODE", "0") == "1"              # Flash CEO, escalate on a failed check
+LATENCY_BUDGET = float(os.getenv("BOARDROOM_LATENCY_BUDGET", "0")) or None  # Seconds per board meeting
+CEO_FLASH_MAX_TOKENS = int(os.getenv("TIER_CEO_FLASH_MAX_TOKENS", "1200"))  # auto mode: short reports synthesize on flash
+WORKER_PRO_MIN_TOKENS = int(os.getenv("TIER_WORKER_PRO_MIN_TOKENS", "32000"))  # Very long tool histories go to pro
+PRIOR_LATENCY = {FLASH: 6.0, PRO: 25.0}  # Seconds, until real samples exist
+SAMPLES = 200                            # Recent latencies kept per (stage, model)
+
+# Per-request hints (intent, deadline, fast mode), set by the manager and
+# inherited by the worker threads through the copied context.
+tier_context = contextvars.ContextVar("tier_context", default={})
+
+@contextlib.contextmanager
+def tier_scope(intent=None, latency_budget=None, fast_mode=None, started=None):
+    """Layers tiering hints over the current ones for the calls made inside."""
+    hints = dict(tier_context.get())
+    if intent is not None:
+        hints["intent"] = intent
+    if fast_mode is not None:
+        hints["fast_mode"] = fast_mode
+    if latency_budget:
+        hints["deadline"] = (started or time.perf_counter()) + latency_budget
+    token = tier_context.set(hints)
+    try:
+        yield hints
+    finally:
+        tier_context.reset(token)
+
+def estimate_tokens(contents):
+    """~4 characters per token; good enough to pick a tier without a network call."""
+    if isinstance(contents, str):
+        return len(contents) // 4
+    return len(json.dumps(_to_jsonable(contents), ensure_ascii=False, default=str)) // 4
+
+_POINT = re.compile(r"^\s*(?:[#>*_\s]*)(?:(?:point|step|priority)\s*)?([1-3])\s*[.):\-]", re.IGNORECASE | re.MULTILINE)
+
+def meets_structure(directive, min_chars=200):
+    """Cheap check for fast mode: a 3-point plan (points 1, 2 and 3 all present) of some substance."""
+    if not directive or len(directive.strip()) < min_chars:
+        return False
+    return {"1", "2", "3"}.issubset(_POINT.findall(directive))
+
+# ==============================================================================
+# 🎚️ TIERING POLICY
+# ==============================================================================
+
+class TieringPolicy:
+    """
+    Picks flash or pro per call from the prompt size, the routed intent and
+    the time left in the meeting's latency budget. Latencies are recorded
+    per (stage, model) so the budget check uses what the models actually do.
+    mode="conservative" (the default) keeps the CEO on its default model
+    unless fast mode or a latency budget asks for flash; mode="auto" also
+    moves short or single-intent syntheses to flash; mode="fixed" always
+    returns the caller's default model.
+    """
+    def __init__(self, mode=TIERING_MODE, fast_mode=FAST_MODE, latency_budget=LATENCY_BUDGET):
+        self.mode = mode
+        self.fast_mode = fast_mode
+        self.latency_budget = latency_budget
+        self._lock = threading.Lock()
+        self._latency = collections.defaultdict(lambda: collections.deque(maxlen=SAMPLES))
+        self.counters = collections.Counter()
+
+    def expected_latency(self, stage, model):
+        """p95 of recent latencies for this stage and model (prior if none)."""
+        with self._lock:
+            samples = sorted(self._latency[(stage, model)])
+        if not samples:
+            return PRIOR_LATENCY.get(model, PRIOR_LATENCY[PRO])
+        return samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+
+    def fast(self):
+        return tier_context.get().get("fast_mode", self.fast_mode)
+
+    def choose(self, stage, prompt_tokens, default):
+        """Returns (model_name, reason) for one call of `stage` ("ceo", "cfo", "cmo")."""
+        if self.mode == "fixed":
+            return default, "fixed"
+        hints = tier_context.get()
+        deadline = hints.get("deadline")
+        remaining = deadline - time.perf_counter() if deadline is not None else None
+        pro_too_slow = remaining is not None and self.expected_latency(stage, PRO) > remaining
+
+        if stage == "ceo":
+            if self.fast():
+                return FLASH, "fast_mode"
+            if pro_too_slow:
+                return FLASH, "latency_budget"
+            if self.mode != "auto":
+                return default, "default"
+            if prompt_tokens <= CEO_FLASH_MAX_TOKENS:
+                return FLASH, "small_prompt"
+            if hints.get("intent") in ("FINANCE", "MARKETING") and prompt_tokens <= 2 * CEO_FLASH_MAX_TOKENS:
+                return FLASH, "narrow_intent"
+            return PRO, "default"
+
+        if prompt_tokens >= WORKER_PRO_MIN_TOKENS and not pro_too_slow:
+            return PRO, "large_prompt"
+        return FLASH, "default"
+
+    def record(self, stage, model, reason, latency, escalated=False):
+        """Logs the tier decision and its latency and keeps the sample for budgeting."""
+        with self._lock:
+            self._latency[(stage, model)].append(latency)
+            self.counters[(stage, model)] += 1
+            if escalated:
+                self.counters[(stage, "escalations")] += 1
+        logger.info(f"🎚️ {stage}: {model} ({reason}{', escalated' if escalated else ''}) {latency:.2f}s")
+
+    def stats(self):
+        """{stage: {model: calls, ..., "escalations": n}}."""
+        with self._lock:
+            out = collections.defaultdict(dict)
+            for (stage, model), count in self.counters.items():
+                out[stage][model] = count
+            return dict(out)
+
+# --- SHARED INSTANCE ---
+_policy = None
+_policy_lock = threading.Lock()
+
+def get_policy():
+    """Process-wide policy, so latency samples accumulate across requests."""
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = TieringPolicy()
+        return _policy
@@ -1,6 +1,16 @@
 import logging
 import json
 import os
+import asyncio
+import atexit
+import bisect
+import collections
+import contextlib
+import contextvars
+import functools
+import threading
+import time
+import uuid
 from datetime import datetime
 
 # --- CONFIGURATION ---
@@ -61,4 +71,291 @@ def setup_observability():
     file_handler.setFormatter(JsonFormatter())
     root_logger.addHandler(file_handler)
 
-    logging.info(f"🔭 Observability initialized. Audit trail: {log_file}")
\ No newline at end of file
+    logging.info(f"🔭 Observability initialized. Audit trail: {log_file}")
+
+# ==============================================================================
+# ⏱️ STAGE METRICS & SPANS
+# ==============================================================================
+# A span times one stage (router, worker turn, tool call, CEO synthesis...).
+# Spans carry the run ID of the board meeting they belong to, feed in-process
+# histograms (exported as Prometheus text) and, when BOARDROOM_SPANS=1, are
+# also written to a JSONL file: buffered, flushed off the hot path in batches
+# and rotated by size (LOG_DIR is tmpfs, i.e. memory, on Cloud Run).
+
+SPANS_FILE = os.path.join(LOG_DIR, "spans.jsonl")
+EXPORT_SPANS = os.getenv("BOARDROOM_SPANS", "0") == "1"                      # Opt-in
+SPANS_BATCH = int(os.getenv("BOARDROOM_SPANS_BATCH", "256"))                 # Spans buffered per write
+SPANS_MAX_BYTES = int(os.getenv("BOARDROOM_SPANS_MAX_MB", "16")) * 1024 * 1024 # Then rotated to spans.jsonl.1
+SAMPLE_RESOURCES = os.getenv("BOARDROOM_SPAN_RESOURCES", "0") == "1"         # Per-span CPU/RSS (benchmark.py turns it on)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+RECENT_SAMPLES = 1024  # Per stage, for percentile summaries
+
+_current_run = contextvars.ContextVar("run_id", default=None)
+_current_span = contextvars.ContextVar("span", default=None)
+_spans_lock = threading.Lock()   # Guards the buffer only
+_spans_file_lock = threading.Lock()
+_spans_buffer = []
+
+def _rss_mb():
+    """Current resident set size in MB (Linux /proc), or None elsewhere."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+def new_run_id():
+    return uuid.uuid4().hex[:16]
+
+def current_run_id():
+    return _current_run.get()
+
+def current_span():
+    return _current_span.get()
+
+@contextlib.contextmanager
+def run_scope(run_id=None):
+    """Tags every span opened inside with `run_id` (a fresh one if omitted)."""
+    token = _current_run.set(run_id or new_run_id())
+    try:
+        yield _current_run.get()
+    finally:
+        try:
+            _current_run.reset(token)
+        except ValueError:
+            pass  # Generator closed from another context
+
+class Span:
+    """One timed stage. Use `set()` for attributes and `add_usage()` for LLM calls."""
+    def __init__(self, stage, attrs):
+        parent = _current_span.get()
+        self.stage = stage
+        self.run_id = _current_run.get()
+        self.span_id = uuid.uuid4().hex[:12]
+        self.parent_id = parent.span_id if parent else None
+        self.attrs = dict(attrs)
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.cache_hits = 0
+        self.llm_calls = 0
+        self.error = None
+        self.start_time = datetime.now().isoformat()
+        self._start = time.perf_counter()
+        self.duration = None
+        # CPU is this thread's time, so it is exact for a stage that stays on
+        # one thread (an upper bound on an event loop shared with other
+        # stages); RSS is the whole process's, so concurrent stages overlap.
+        self.cpu_s = self.rss_mb = self.rss_delta_mb = None
+        self._resources = (threading.get_ident(), time.thread_time(), _rss_mb()) if SAMPLE_RESOURCES else None
+
+    def _sample_resources(self):
+        thread, cpu_start, rss_start = self._resources
+        if threading.get_ident() == thread:  # A generator span may finish on another thread
+            self.cpu_s = time.thread_time() - cpu_start
+        self.rss_mb = _rss_mb()
+        if self.rss_mb is not None and rss_start is not None:
+            self.rss_delta_mb = self.rss_mb - rss_start
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add_usage(self, response, cache_hit=False):
+        """Adds one model response's usage_metadata (prompt/response tokens) to the span."""
+        self.llm_calls += 1
+        self.cache_hits += int(cache_hit)
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None and not cache_hit:
+            self.tokens_in += int(getattr(usage, "prompt_token_count", 0) or 0)
+            self.tokens_out += int(getattr(usage, "candidates_token_count", 0) or 0)
+
+    def to_dict(self):
+        return {
+            "run_id": self.run_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "stage": self.stage,
+            "start": self.start_time,
+            "duration": self.duration,
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "llm_calls": self.llm_calls,
+            "cache_hits": self.cache_hits,
+            "error": self.error,
+            "attrs": self.attrs,
+            **({"cpu_s": self.cpu_s, "rss_mb": self.rss_mb, "rss_delta_mb": self.rss_delta_mb}
+               if self._resources else {}),
+        }
+
+class MetricsRegistry:
+    """In-process per-stage histograms and counters."""
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def _stage(self, stage):
+        if stage not in self._stages:
+            self._stages[stage] = {
+                "buckets": [0] * len(self.buckets), "count": 0, "sum": 0.0,
+                "tokens_in": 0, "tokens_out": 0, "llm_calls": 0, "cache_hits": 0, "errors": 0,
+                "cpu_samples": 0, "cpu_s": 0.0, "rss_max_mb": None, "rss_delta_max_mb": None,
+                "recent": collections.deque(maxlen=RECENT_SAMPLES),
+            }
+        return self._stages[stage]
+
+    def record(self, span):
+        with self._lock:
+            m = self._stage(span.stage)
+            # Cumulative buckets: every bound >= duration counts this span
+            for i in range(bisect.bisect_left(self.buckets, span.duration), len(self.buckets)):
+                m["buckets"][i] += 1
+            m["count"] += 1
+            m["sum"] += span.duration
+            m["tokens_in"] += span.tokens_in
+            m["tokens_out"] += span.tokens_out
+            m["llm_calls"] += span.llm_calls
+            m["cache_hits"] += span.cache_hits
+            m["errors"] += int(span.error is not None)
+            m["recent"].append(span.duration)
+            if span.cpu_s is not None:
+                m["cpu_samples"] += 1
+                m["cpu_s"] += span.cpu_s
+            if span.rss_mb is not None:
+                m["rss_max_mb"] = max(m["rss_max_mb"] or 0.0, span.rss_mb)
+            if span.rss_delta_mb is not None:
+                m["rss_delta_max_mb"] = max(m["rss_delta_max_mb"] or 0.0, span.rss_delta_mb)
+
+    def summary(self):
+        """
+        {stage: count, mean, p50, p95, p99, tokens, cache hits, errors} from
+        recent samples; with SAMPLE_RESOURCES also CPU seconds (total and per
+        span), peak RSS and the largest RSS growth during one span (MB).
+        """
+        with self._lock:
+            stages = {k: (dict(v), sorted(v["recent"])) for k, v in self._stages.items()}
+        out = {}
+        for stage, (m, recent) in sorted(stages.items()):
+            pick = lambda q: recent[min(len(recent) - 1, int(q * len(recent)))] if recent else None
+            out[stage] = {
+                "count": m["count"], "mean": m["sum"] / m["count"] if m["count"] else None,
+                "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99),
+                "tokens_in": m["tokens_in"], "tokens_out": m["tokens_out"],
+                "llm_calls": m["llm_calls"], "cache_hits": m["cache_hits"], "errors": m["errors"],
+            }
+            if m["cpu_samples"] or m["rss_max_mb"] is not None:
+                out[stage].update({
+                    "cpu_s": m["cpu_s"],
+                    "cpu_s_mean": m["cpu_s"] / m["cpu_samples"] if m["cpu_samples"] else None,
+                    "rss_max_mb": m["rss_max_mb"], "rss_delta_max_mb": m["rss_delta_max_mb"],
+                })
+        return out
+
+    def prometheus_text(self):
+        """Prometheus text exposition format."""
+        lines = [
+            "# HELP boardroom_stage_duration_seconds Stage latency.",
+            "# TYPE boardroom_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            stages = {k: dict(v) for k, v in self._stages.items()}
+        for stage, m in sorted(stages.items()):
+            for le, count in zip(self.buckets, m["buckets"]):
+                lines.append(f'boardroom_stage_duration_seconds_bucket{{stage="{stage}",le="{le}"}} {count}')
+            lines.append(f'boardroom_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {m["count"]}')
+            lines.append(f'boardroom_stage_duration_seconds_sum{{stage="{stage}"}} {m["sum"]:.6f}')
+            lines.append(f'boardroom_stage_duration_seconds_count{{stage="{stage}"}} {m["count"]}')
+        for name, key, help_text in (
+            ("boardroom_stage_tokens_in_total", "tokens_in", "Prompt tokens."),
+            ("boardroom_stage_tokens_out_total", "tokens_out", "Response tokens."),
+            ("boardroom_stage_llm_calls_total", "llm_calls", "Model calls (including cache hits)."),
+            ("boardroom_stage_cache_hits_total", "cache_hits", "Model calls served from the response cache."),
+            ("boardroom_stage_errors_total", "errors", "Stages that raised."),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for stage, m in sorted(stages.items()):
+                lines.append(f'{name}{{stage="{stage}"}} {m[key]}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+METRICS = MetricsRegistry()
+
+def _export(span):
+    if not EXPORT_SPANS:
+        return
+    with _spans_lock:
+        _spans_buffer.append(span.to_dict())
+        full = len(_spans_buffer) >= SPANS_BATCH
+    if full:
+        flush_spans()
+
+def flush_spans():
+    """Writes buffered spans to SPANS_FILE (one write per batch), rotating it past SPANS_MAX_BYTES."""
+    global _spans_buffer
+    with _spans_lock:
+        batch, _spans_buffer = _spans_buffer, []
+    if not batch:
+        return
+    data = "".join(json.dumps(d, default=str) + "\n" for d in batch)
+    try:
+        with _spans_file_lock:
+            if os.path.exists(SPANS_FILE) and os.path.getsize(SPANS_FILE) + len(data) > SPANS_MAX_BYTES:
+                os.replace(SPANS_FILE, SPANS_FILE + ".1")  # One previous file kept
+            with open(SPANS_FILE, "a") as f:
+                f.write(data)
+    except OSError:
+        pass
+
+atexit.register(flush_spans)
+
+@contextlib.contextmanager
+def span(stage, **attrs):
+    """
+    Times a stage:
+        with span("ceo", model=MODEL_CEO) as s:
+            response = ...
+            s.add_usage(response)
+    Exceptions are recorded on the span and re-raised. A closed generator
+    or a cancelled task is marked attrs["cancelled"], not counted as an error.
+    """
+    s = Span(stage, attrs)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except (GeneratorExit, asyncio.CancelledError):
+        s.attrs["cancelled"] = True
+        raise
+    except Exception as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        s.duration = time.perf_counter() - s._start
+        if s._resources:
+            s._sample_resources()
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            pass  # Generator closed from another context
+        METRICS.record(s)
+        _export(s)
+
+def traced(stage):
+    """Decorator form of `span`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def write_prometheus(path=os.path.join(LOG_DIR, "metrics.prom")):
+    """Writes the current metrics for a node-exporter textfile collector."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(METRICS.prometheus_text())
+    os.replace(tmp_path, path)
+    return path
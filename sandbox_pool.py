@@ -0,0 +1,278 @@
+import contextlib
+import io
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger("Sandbox")
+
+# --- CONFIGURATION ---
+POOL_SIZE = int(os.getenv("SANDBOX_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXEC_TIMEOUT = float(os.getenv("SANDBOX_TIMEOUT", "20"))                 # Seconds, wall clock
+MEMORY_LIMIT = int(os.getenv("SANDBOX_MEMORY_MB", "1024")) * 1024 * 1024 # RLIMIT_AS per worker
+OUTPUT_LIMIT = 20_000     # Characters of stdout returned to the model
+MAX_RUNS = 50             # Recycle a worker after this many executions
+FRAME_SLOTS = 4           # Recent datasets kept parsed inside each worker
+STARTUP_TIMEOUT = 60      # Seconds allowed for a fresh worker to import pandas
+RESPAWN_INTERVAL = 1.0    # Seconds a caller waits for an idle worker before retrying failed spawns
+
+# forkserver: children fork from a clean server that has pandas preloaded,
+# so a recycle costs a fork, not a fresh interpreter + pandas import.
+if "forkserver" in multiprocessing.get_all_start_methods():
+    _ctx = multiprocessing.get_context("forkserver")
+    _ctx.set_forkserver_preload(["pandas", "numpy", "columnar", "sandbox_pool"])
+else:
+    _ctx = multiprocessing.get_context("spawn")
+
+# ==============================================================================
+# 🧪 WORKER PROCESS
+# ==============================================================================
+
+def _apply_limits(memory_limit):
+    try:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    except (ImportError, ValueError, OSError):
+        pass  # Non-POSIX platforms: timeout still applies
+
+def _worker_main(conn, memory_limit, output_limit):
+    """
+    Loop: receive {code, path, key}, exec against the dataset, reply {output}.
+    `path` is a columnar dir (memory-mapped, so RLIMIT_AS must cover the
+    mapping but resident memory stays bounded) or a CSV.
+    """
+    import pandas as pd
+    from columnar import read_frame
+
+    _apply_limits(memory_limit)
+    frames = OrderedDict()
+    conn.send("ready")
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if job is None:
+            return
+        try:
+            df = frames.get(job["key"])
+            if df is None:
+                df = read_frame(job["path"])
+                frames[job["key"]] = df
+                while len(frames) > FRAME_SLOTS:
+                    frames.popitem(last=False)
+            frames.move_to_end(job["key"])
+
+            # Per-process stdout, so capture never leaks between callers
+            buffer = io.StringIO()
+            with contextlib.redirect_stdout(buffer):
+                # Mapped columns are read-only, so a shallow copy is enough
+                frame = df.copy(deep=not df.attrs.get("memory_mapped", False))
+                exec(job["code"], {}, {"pd": pd, "df": frame})
+            output = buffer.getvalue()
+            if len(output) > output_limit:
+                output = output[:output_limit] + f"\n... [truncated {len(output) - output_limit} chars]"
+            conn.send({"output": output})
+        except MemoryError:
+            conn.send({"error": "memory limit exceeded"})
+        except Exception as e:
+            conn.send({"error": str(e)})
+
+# ==============================================================================
+# 🏊 POOL
+# ==============================================================================
+
+class _Worker:
+    def __init__(self, memory_limit, output_limit):
+        self.conn, child = _ctx.Pipe()
+        self.process = _ctx.Process(
+            target=_worker_main, args=(child, memory_limit, output_limit), daemon=True
+        )
+        self.process.start()
+        child.close()
+        self.runs = 0
+        self.ready = False
+        self.generation = None  # Pool generation it belongs to (set when registered)
+
+    def wait_ready(self):
+        """Blocks until the worker has imported pandas, so start-up never eats into a call's timeout."""
+        if not self.ready:
+            if not self.conn.poll(STARTUP_TIMEOUT) or self.conn.recv() != "ready":
+                raise OSError("worker failed to start")
+            self.ready = True
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=1)
+        self.conn.close()
+
+class SandboxPool:
+    """
+    Pre-started subprocess executors for model-written pandas code.
+    Each call gets a wall-clock timeout, an RLIMIT_AS memory cap, an output
+    cap and its own stdout. Workers are recycled after `max_runs` calls or
+    whenever they time out or die; a replacement that fails to spawn is
+    retried on later calls, so the pool returns to `size` workers.
+    """
+    def __init__(self, size=POOL_SIZE, timeout=EXEC_TIMEOUT, memory_limit=MEMORY_LIMIT,
+                 output_limit=OUTPUT_LIMIT, max_runs=MAX_RUNS):
+        self.size = size
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.output_limit = output_limit
+        self.max_runs = max_runs
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._missing = 0  # Workers whose replacement failed to spawn; retried by `_refill`
+        self._workers = set()  # Every live worker, idle or busy, so shutdown can stop them all
+        self._generation = 0   # Bumped by shutdown; workers of an older generation are retired
+        self.counters = {"runs": 0, "timeouts": 0, "crashes": 0, "recycles": 0, "spawn_failures": 0}
+
+    def start(self):
+        """Spawns the workers up front (call at startup to warm the pool)."""
+        with self._lock:
+            if self._started:
+                return
+            self._missing += self.size
+            self._started = True
+        self._refill()
+        logger.info(f"🧪 Sandbox pool ready ({self.size} workers).")
+
+    def _spawn(self):
+        return _Worker(self.memory_limit, self.output_limit)
+
+    def _refill(self):
+        """Spawns the missing workers; one that fails stays missing until the next call."""
+        with self._lock:
+            missing, self._missing = self._missing, 0
+            generation = self._generation
+        for _ in range(missing):
+            try:
+                worker = self._spawn()
+            except Exception as e:
+                logger.error(f"⚠️ Sandbox worker failed to spawn: {e}")
+                with self._lock:
+                    self.counters["spawn_failures"] += 1
+                    if generation == self._generation:
+                        self._missing += 1
+                continue
+            with self._lock:
+                current = generation == self._generation
+                if current:
+                    worker.generation = generation
+                    self._workers.add(worker)
+                    self._idle.put(worker)
+            if not current:
+                worker.kill()  # The pool was shut down while it started
+        with self._lock:
+            return self._missing < self.size
+
+    def _acquire(self):
+        """An idle worker, or None if none could be spawned. Waiters keep retrying failed spawns."""
+        while True:
+            self.start()  # Restarts the pool if it was shut down while we waited
+            if not self._refill():
+                return None
+            try:
+                worker = self._idle.get(timeout=RESPAWN_INTERVAL)
+            except queue.Empty:
+                continue
+            if worker.generation == self._generation:
+                return worker
+            worker.kill()  # Queued just before a shutdown, which already stopped its process
+
+    def _retire(self, worker):
+        with self._lock:
+            self._workers.discard(worker)
+        worker.kill()
+
+    def execute(self, code, path, key, timeout=None):
+        """Runs `code` with `df` loaded from `path` (cached in-worker under `key`)."""
+        timeout = self.timeout if timeout is None else timeout
+        worker = self._acquire()
+        if worker is None:
+            return "Execution Error: no sandbox worker could be started."
+        replace = False
+        try:
+            worker.wait_ready()
+            worker.conn.send({"code": code, "path": path, "key": key})
+            if not worker.conn.poll(timeout):
+                replace = True
+                self._count("timeouts")
+                return f"Execution Error: timed out after {timeout:.0f}s."
+            reply = worker.conn.recv()
+            worker.runs += 1
+            self._count("runs")
+            if worker.runs >= self.max_runs:
+                replace = True
+                self._count("recycles")
+            if "error" in reply:
+                return f"Execution Error: {reply['error']}"
+            return reply["output"] or "Code executed successfully but printed nothing. Did you forget 'print()'?"
+        except (EOFError, OSError, BrokenPipeError) as e:
+            replace = True
+            self._count("crashes")
+            return f"Execution Error: sandbox worker died ({str(e) or 'killed'})."
+        finally:
+            with self._lock:
+                current = worker.generation == self._generation
+                if current and not replace:
+                    self._idle.put(worker)
+                elif current:
+                    self._missing += 1
+            if not current or replace:
+                # After a shutdown the worker is only retired; otherwise it is
+                # respawned here, or by a later call if this spawn fails
+                self._retire(worker)
+                if current:
+                    self._refill()
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, workers=len(self._workers), missing=self._missing)
+
+    def shutdown(self):
+        """Stops every worker; a busy one is killed and its call returns a sandbox error."""
+        with self._lock:
+            self._generation += 1
+            workers, self._workers = self._workers, set()
+            idle = set()
+            while not self._idle.empty():
+                idle.add(self._idle.get_nowait())
+            self._missing = 0
+            self._started = False
+        for worker in workers:
+            if worker in idle:
+                worker.stop()
+            else:
+                worker.process.kill()  # Its caller's `execute` closes the pipe
+
+# --- SHARED INSTANCE ---
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Process-wide sandbox pool shared by every session."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SandboxPool()
+        return _pool
@@ -0,0 +1,238 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+from dotenv import load_dotenv
+
+from observability import setup_observability, run_scope, new_run_id, METRICS
+
+# ==============================================================================
+# 🌐 HEADLESS HTTP ENTRY POINT
+# ==============================================================================
+# The async pipeline behind a minimal HTTP/1.1 server on one event loop, for
+# callers that don't need the Streamlit UI. Meetings in flight hold no thread.
+#
+#   python server.py --port 8081
+#
+#   POST /datasets    body: raw CSV            -> {"dataset_id"}
+#   POST /meetings    {"niche", "goal", "location", "currency", "dataset_id"? (from /datasets),
+#                      "fast_mode"?, "timeout"?} -> {"intent", "cfo", "cmo", "ceo", "timings", "run_id"}
+#   GET  /healthz     -> {"status": "ok"}
+#   GET  /metrics     -> Prometheus text
+
+load_dotenv()
+logger = logging.getLogger("Server")
+
+# --- CONFIGURATION ---
+MAX_MEETINGS = int(os.getenv("BOARDROOM_MAX_MEETINGS", "256"))       # Concurrent meetings; more get 503
+MEETING_TIMEOUT = float(os.getenv("BOARDROOM_MEETING_TIMEOUT", "300")) # Seconds, unless the request sets one
+MAX_BODY_BYTES = int(os.getenv("BOARDROOM_MAX_BODY_MB", "64")) * 1024 * 1024
+READ_TIMEOUT = float(os.getenv("BOARDROOM_READ_TIMEOUT", "30"))     # Seconds for the headers, then per body chunk; 408 after
+READ_CHUNK = 1024 * 1024                                             # Bytes per body read
+REQUIRED_FIELDS = ("niche", "goal", "location", "currency")
+ACTIONABLE = ("FINANCE", "MARKETING", "STRATEGY")
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           408: "Request Timeout", 413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+           504: "Gateway Timeout"}
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class BoardroomServer:
+    def __init__(self, max_meetings=MAX_MEETINGS, timeout=MEETING_TIMEOUT, use_cache=True,
+                 read_timeout=READ_TIMEOUT):
+        self.timeout = timeout
+        self.read_timeout = read_timeout
+        self.use_cache = use_cache
+        self.max_meetings = max_meetings
+        self.in_flight = 0
+        self.manager = None
+
+    async def start(self, host, port):
+        from model_registry import get_manager
+        # Builds the shared clients (and imports the SDKs) off the loop, once
+        self.manager = await asyncio.to_thread(get_manager)
+        server = await asyncio.start_server(self.handle, host, port)
+        logger.info(f"🌐 Boardroom API on http://{host}:{port} (max {self.max_meetings} meetings).")
+        async with server:
+            await server.serve_forever()
+
+    # --- HTTP plumbing ---
+
+    async def handle(self, reader, writer):
+        try:
+            method, path, body = await self._read_request(reader)
+            status, payload = 200, await self._dispatch(method, path, body)
+        except HttpError as e:
+            status, payload = e.status, {"error": str(e)}
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        except Exception as e:
+            logger.exception("Request failed")
+            status, payload = 500, {"error": str(e)}
+        try:
+            if isinstance(payload, str):
+                data, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+            else:
+                data, content_type = json.dumps(payload, default=str).encode("utf-8"), "application/json"
+            writer.write(
+                f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1") + data
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        """
+        (method, path, body). A client that stalls (no headers within
+        read_timeout, or no body bytes for read_timeout) gets a 408, so an
+        idle connection never holds its handler.
+        """
+        try:
+            parts, headers = await asyncio.wait_for(self._read_head(reader), self.read_timeout)
+            length = headers.get("content-length") or "0"
+            if not length.isdigit():
+                raise HttpError(400, "invalid Content-Length")
+            length = int(length)
+            if length > MAX_BODY_BYTES:
+                raise HttpError(413, f"body over {MAX_BODY_BYTES} bytes")
+            body = await self._read_body(reader, length)
+        except asyncio.TimeoutError:
+            raise HttpError(408, f"request not received within {self.read_timeout:.0f}s")
+        return parts[0].upper(), parts[1].split("?", 1)[0], body
+
+    async def _read_head(self, reader):
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        parts = request_line.split()
+        if len(parts) != 3:
+            raise HttpError(400, "malformed request line")
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return parts, headers
+
+    async def _read_body(self, reader, length):
+        """Reads `length` bytes; the timeout applies per chunk, so a slow but steady upload still completes."""
+        chunks, remaining = [], length
+        while remaining:
+            chunk = await asyncio.wait_for(reader.read(min(READ_CHUNK, remaining)), self.read_timeout)
+            if not chunk:
+                raise asyncio.IncompleteReadError(b"".join(chunks), length)
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+
+    async def _dispatch(self, method, path, body):
+        routes = {
+            ("GET", "/healthz"): self.healthz,
+            ("GET", "/metrics"): self.metrics,
+            ("POST", "/datasets"): self.upload,
+            ("POST", "/meetings"): self.meeting,
+        }
+        if (method, path) not in routes:
+            known = {p for _, p in routes}
+            raise HttpError(405 if path in known else 404, f"{method} {path} not supported")
+        return await routes[(method, path)](body)
+
+    # --- Endpoints ---
+
+    async def healthz(self, body):
+        return {"status": "ok", "in_flight": self.in_flight}
+
+    async def metrics(self, body):
+        return METRICS.prometheus_text()
+
+    async def upload(self, body):
+        if not body:
+            raise HttpError(400, "empty CSV body")
+        from dataset_store import get_store
+        return {"dataset_id": await asyncio.to_thread(get_store().put_bytes, body)}
+
+    async def meeting(self, body):
+        request = self._parse_meeting(body)
+        if self.in_flight >= self.max_meetings:
+            raise HttpError(503, "too many meetings in flight; retry shortly")
+
+        self.in_flight += 1
+        try:
+            with run_scope(new_run_id()):
+                return await asyncio.wait_for(self._meeting(request), request["timeout"])
+        except asyncio.TimeoutError:
+            raise HttpError(504, "meeting timed out")
+        finally:
+            self.in_flight -= 1
+
+    def _parse_meeting(self, body):
+        """
+        Validates a meeting request. dataset_id must be the digest of a dataset
+        already uploaded through POST /datasets (never a path: the store would
+        read any file it names); timeout may shorten the server's, not extend it.
+        """
+        from dataset_store import get_store
+        try:
+            request = json.loads(body or b"{}")
+        except json.JSONDecodeError as e:
+            raise HttpError(400, f"invalid JSON: {e}")
+        if not isinstance(request, dict):
+            raise HttpError(400, "body must be a JSON object")
+        missing = [f for f in REQUIRED_FIELDS if not isinstance(request.get(f), str) or not request[f].strip()]
+        if missing:
+            raise HttpError(400, f"missing fields: {', '.join(missing)}")
+
+        dataset_id = request.get("dataset_id")
+        if dataset_id is not None and not (isinstance(dataset_id, str) and get_store().exists(dataset_id)):
+            raise HttpError(404, "unknown dataset_id; upload the CSV to /datasets first")
+
+        timeout = request.get("timeout")
+        if timeout is None:
+            request["timeout"] = self.timeout
+        else:
+            if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or not 0 < timeout < float("inf"):
+                raise HttpError(400, "timeout must be a positive number of seconds")
+            request["timeout"] = min(float(timeout), self.timeout)
+        return request
+
+    async def _meeting(self, request):
+        niche, goal = request["niche"], request["goal"]
+        intent = await self.manager.route_request_async(f"Goal: {goal}. Niche: {niche}", use_cache=self.use_cache)
+        if intent not in ACTIONABLE:
+            return {"intent": intent}
+        results = await self.manager.execute_workflow_async(
+            niche, goal, request["location"], request["currency"], request.get("dataset_id"),
+            use_cache=self.use_cache, intent=intent, fast_mode=request.get("fast_mode")
+        )
+        results["intent"] = intent
+        return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless HTTP API for the Virtual Boardroom.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8081")))
+    parser.add_argument("--max-meetings", type=int, default=MAX_MEETINGS)
+    parser.add_argument("--dry-run", action="store_true", help="Use the offline fake model (no Vertex calls).")
+    args = parser.parse_args(argv)
+
+    setup_observability()
+    # Fake responses never touch the response cache (fake_vertex isolates it too)
+    server = BoardroomServer(max_meetings=args.max_meetings, use_cache=not args.dry_run)
+    if args.dry_run:
+        from fake_model import fake_vertex
+        with fake_vertex():
+            asyncio.run(server.start(args.host, args.port))
+    else:
+        asyncio.run(server.start(args.host, args.port))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger("StageGraph")
+
+# --- CONFIGURATION ---
+MEMO_ENTRIES = 4  # Fingerprints kept per stage, so flipping back to an earlier goal is free too
+
+# ==============================================================================
+# 🧩 WORKFLOW STAGE GRAPH
+# ==============================================================================
+# The board meeting as a small DAG. Each stage declares the inputs it reads
+# (and the stages whose output it consumes); its output is memoized under a
+# fingerprint of exactly those, so editing the goal reruns only the CEO.
+#
+#   router ──▶ CFO ─┐
+#          └─▶ CMO ─┴─▶ CEO
+#
+# "dataset" is the dataset store digest, i.e. the CSV content hash; "market"
+# is the market-intelligence corpus version, so reloading it reruns the CMO.
+# The CEO's retrieved past directives are deliberately not an input: every
+# saved meeting adds one, so keyed on them the CEO memo could never hit.
+# Version 2 marks the prompt that carries them.
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    inputs: Tuple[str, ...]
+    after: Tuple[str, ...] = ()  # Upstream stages whose output feeds this one
+    version: int = 1             # Bump when the stage's prompt/tools change, to drop old outputs
+
+GRAPH: Dict[str, Stage] = {stage.name: stage for stage in (
+    Stage("router", ("request",)),
+    Stage("CFO", ("dataset", "currency", "niche"), version=2),
+    Stage("CMO", ("niche", "location", "market")),
+    Stage("CEO", ("goal", "location", "currency", "fast_mode"), after=("CFO", "CMO"), version=2),
+)}
+
+def output_hash(output):
+    return hashlib.sha256(json.dumps(output, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def fingerprint(stage_name, values, upstream=None):
+    """
+    Hash of a stage's declared inputs (taken from `values`) and the output
+    hashes of the stages it runs after (from `upstream`: {stage: output}).
+    """
+    stage = GRAPH[stage_name]
+    key = {
+        "stage": stage.name,
+        "version": stage.version,
+        "inputs": {name: values.get(name) for name in stage.inputs},
+        "after": {name: output_hash((upstream or {}).get(name)) for name in stage.after},
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class StageMemo:
+    """
+    Memoized stage outputs over a plain dict ({stage: {fingerprint: entry}}),
+    normally `BoardroomState.stages`, so they persist with the rest of the
+    session state. Entries are {"output", "elapsed"}; the newest
+    MEMO_ENTRIES fingerprints per stage are kept.
+    """
+    def __init__(self, store: Optional[dict] = None):
+        self.store = store if store is not None else {}
+        self._lock = threading.Lock()
+
+    def get(self, stage_name, fp):
+        """The memoized entry for this fingerprint, or None."""
+        with self._lock:
+            entry = self.store.get(stage_name, {}).get(fp)
+        if entry is not None:
+            logger.info(f"🧩 {stage_name}: inputs unchanged, reusing output.")
+        return entry
+
+    def put(self, stage_name, fp, output, elapsed=None):
+        with self._lock:
+            entries = self.store.setdefault(stage_name, {})
+            entries.pop(fp, None)  # Re-insert as newest
+            entries[fp] = {"output": output, "elapsed": elapsed}
+            while len(entries) > MEMO_ENTRIES:
+                entries.pop(next(iter(entries)))
+
+    def clear(self):
+        with self._lock:
+            self.store.clear()
+
+def as_memo(memo):
+    """Accepts a StageMemo, a dict to memoize into, or None (no memoization)."""
+    if memo is None or isinstance(memo, StageMemo):
+        return memo
+    return StageMemo(memo)
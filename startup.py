@@ -0,0 +1,165 @@
+import argparse
+import contextlib
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+logger = logging.getLogger("Startup")
+
+# ==============================================================================
+# 🚀 COLD START
+# ==============================================================================
+# Modules import only light dependencies; vertexai, pandas, model clients and
+# the sandbox pool are warmed here, in a background thread started once the
+# server is up, so the first page renders without waiting for them.
+#
+#   python startup.py --profile   # import-time breakdown + warm-up phases
+#   BOARDROOM_PROFILE_STARTUP=1   # log warm-up phases from the app
+
+PROFILE = os.getenv("BOARDROOM_PROFILE_STARTUP", "0") == "1"
+APP_MODULES = ("manager_agent", "memory_engine", "observability", "dataset_store", "sandbox_pool", "model_registry")
+
+PHASES = {}  # Warm-up phase -> seconds
+_ready = threading.Event()
+_thread = None
+_thread_lock = threading.Lock()
+
+@contextlib.contextmanager
+def phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASES[name] = time.perf_counter() - start
+        if PROFILE:
+            logger.info(f"🚀 {name}: {PHASES[name] * 1000:.0f} ms")
+
+def warm_up(ping=None):
+    """Imports the heavy SDKs and builds shared clients, workers and the sandbox pool."""
+    from model_registry import REGISTRY, init_vertex
+    from sandbox_pool import get_pool, POOL_SIZE
+
+    start = time.perf_counter()
+    with phase("import.pandas"):
+        import pandas  # noqa: F401
+    with phase("import.vertexai"):
+        import vertexai.generative_models  # noqa: F401
+    with phase("vertex.init"):
+        init_vertex()
+    with phase("registry"):
+        REGISTRY.warm_up(ping=bool(os.getenv("GCP_PROJECT_ID")) if ping is None else ping)
+    if POOL_SIZE > 0:
+        with phase("sandbox"):
+            get_pool().start()
+    with phase("market_index"):
+        from market_intel import get_provider
+        get_provider()
+    PHASES["total"] = time.perf_counter() - start
+    logger.info(f"🚀 Warm-up finished in {PHASES['total']:.2f}s.")
+
+def _warm():
+    try:
+        warm_up()
+    except Exception as e:
+        # Not fatal: the first request builds whatever is missing and reports the error
+        logger.warning(f"Background warm-up failed: {e}")
+    finally:
+        _ready.set()
+
+def warm_in_background():
+    """Starts the warm-up thread once per process; returns immediately."""
+    global _thread
+    with _thread_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_warm, name="boardroom-warmup", daemon=True)
+            _thread.start()
+
+def wait_ready(timeout=None):
+    """Blocks until background warm-up has finished (or `timeout` seconds). True if finished."""
+    if _thread is None:
+        return True
+    return _ready.wait(timeout)
+
+# ==============================================================================
+# 🔬 PROFILING
+# ==============================================================================
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def import_profile(modules=APP_MODULES, top=20):
+    """
+    Imports `modules` in a fresh interpreter with -X importtime and returns
+    [(module, cumulative_ms)] for the heaviest top-level and direct imports.
+    """
+    code = "; ".join(f"import {m}" for m in modules)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=os.path.dirname(os.path.abspath(__file__)),
+                          capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match and len(match.group(3)) <= 3:  # Depth 0-1: what our modules pull in directly
+            rows.append((match.group(4), int(match.group(2)) / 1000))
+    return sorted(rows, key=lambda r: r[1], reverse=True)[:top]
+
+def probe():
+    """
+    One cold start against the offline model: module imports, warm-up and a
+    first board meeting. Prints {phase: seconds} as JSON (used by benchmark.py).
+    """
+    process_start = time.perf_counter()
+    timings = {}
+    start = time.perf_counter()
+    import manager_agent  # noqa: F401
+    from fake_model import LatencyModel, fake_vertex
+    timings["import"] = time.perf_counter() - start
+
+    instant = {name: LatencyModel("fixed", median=0.0, per_token=0.0)
+               for name in ("gemini-2.5-flash", "gemini-2.5-pro")}
+    with fake_vertex(latency=instant):
+        start = time.perf_counter()
+        warm_up(ping=False)
+        timings["warm_up"] = time.perf_counter() - start
+
+        from model_registry import get_manager
+        start = time.perf_counter()
+        get_manager().execute_workflow("Coffee Shop", "Grow revenue", "London, UK", "GBP", None, use_cache=False)
+        timings["first_request"] = time.perf_counter() - start
+    timings["total"] = time.perf_counter() - process_start
+    timings["phases"] = dict(PHASES)
+    print(json.dumps(timings))
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start profiling for the Virtual Boardroom.")
+    parser.add_argument("--profile", action="store_true", help="Print import-time breakdown and warm-up phases")
+    parser.add_argument("--probe", action="store_true", help="Offline cold start; prints phase timings as JSON")
+    args = parser.parse_args()
+
+    if args.probe:
+        os.environ.setdefault("BOARDROOM_SPANS", "0")
+        logging.basicConfig(level=logging.WARNING)
+        probe()
+        return
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    print("Import time (cumulative ms):")
+    for module, ms in import_profile():
+        print(f"  {ms:9.1f}  {module}")
+    if args.profile:
+        global PROFILE
+        PROFILE = True
+        try:
+            warm_up()
+        except Exception as e:
+            print(f"Warm-up failed after {', '.join(PHASES) or 'no phases'}: {e}")
+        print("Warm-up phases (ms):")
+        for name, seconds in PHASES.items():
+            print(f"  {seconds * 1000:9.1f}  {name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+
+logger = logging.getLogger("StrategyHistory")
+
+# --- CONFIGURATION ---
+DIM = int(os.getenv("HISTORY_DIM", "512"))                # Hashed n-gram embedding width
+TOP_K = int(os.getenv("HISTORY_TOP_K", "3"))              # Past directives offered to the CEO
+HISTORY_TOKENS = int(os.getenv("HISTORY_TOKENS", "800"))  # Prompt budget for them (~4 chars/token)
+MIN_SCORE = 0.15                                          # Cosine below this is not "relevant"
+SESSIONS_CACHED = 64                                      # Per-session matrices kept in memory
+HEADER_WEIGHT = 2.0                                       # Niche/goal count this much more than body text
+_WORD = re.compile(r"[a-z0-9]+")
+
+# ==============================================================================
+# 🗄️ STRATEGY ARCHIVE (full directives + vector index)
+# ==============================================================================
+# Every compacted CEO directive is kept in full, on disk, with a hashed
+# unigram+bigram embedding (stored as float16 next to the row). Retrieval is
+# one matrix-vector product over the session's embeddings, which are loaded
+# once per process and then kept in sync by row ID; only the top-k texts
+# are read back from SQLite. numpy is imported on first use (cold start).
+
+def _features(text):
+    words = _WORD.findall((text or "").lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+def embed(*weighted_texts):
+    """
+    L2-normalized float32 vector of DIM from (text, weight) pairs: signed
+    feature hashing (crc32, stable across processes) with sublinear tf,
+    each text normalized before weighting.
+    """
+    import numpy as np
+
+    vector = np.zeros(DIM, dtype=np.float32)
+    for text, weight in weighted_texts:
+        features = _features(text)
+        if not features:
+            continue
+        hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32, count=len(features))
+        # The top hash bit picks the sign, so colliding features tend to cancel
+        signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+        tf = np.bincount(hashes % DIM, weights=signs, minlength=DIM).astype(np.float32)
+        part = np.sign(tf) * np.log1p(np.abs(tf))
+        # Each part normalized first, so a long body cannot drown the niche/goal
+        norm = np.linalg.norm(part)
+        if norm:
+            vector += weight * part / norm
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def _directive_vector(niche, goal, directive):
+    header = f"{niche} {goal}"
+    return embed((header, HEADER_WEIGHT), (directive, 1.0))
+
+class _SessionIndex:
+    """One session's embeddings as a growable (n, DIM) float32 matrix plus row IDs."""
+    def __init__(self):
+        import numpy as np
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.matrix = np.zeros((0, DIM), dtype=np.float32)
+        self.size = 0
+        self.last_id = 0
+
+    def extend(self, ids, vectors):
+        import numpy as np
+        if not len(ids):
+            return
+        needed = self.size + len(ids)
+        if needed > len(self.ids):
+            capacity = max(needed, 2 * len(self.ids), 64)
+            self.ids = np.resize(self.ids, capacity)
+            matrix = np.zeros((capacity, DIM), dtype=np.float32)
+            matrix[:self.size] = self.matrix[:self.size]
+            self.matrix = matrix
+        self.ids[self.size:needed] = ids
+        self.matrix[self.size:needed] = vectors
+        self.size = needed
+        self.last_id = int(ids[-1])
+
+class StrategyHistory:
+    """
+    Unbounded per-session archive of CEO directives with top-k retrieval
+    by niche and goal. Safe to share across threads; several processes
+    may share the database (each syncs new rows by ID before a search).
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # session_id -> _SessionIndex
+        self.counters = {"added": 0, "searches": 0}
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS directives ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, niche TEXT, goal TEXT, "
+                "directive TEXT NOT NULL, created_at TEXT NOT NULL, vector BLOB NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_directives_session ON directives(session_id, id)")
+
+    def add(self, session_id, niche, goal, directive, created_at=None):
+        """Archives one directive in full; returns its row ID."""
+        import numpy as np
+        vector = _directive_vector(niche, goal, directive)
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT INTO directives (session_id, niche, goal, directive, created_at, vector) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, niche or "", goal or "", directive, created_at or datetime.now().isoformat(),
+                 vector.astype(np.float16).tobytes())
+            )
+            self.counters["added"] += 1
+            return cursor.lastrowid
+
+    def _index(self, session_id):
+        """The session's in-memory index, topped up with rows added since the last call (lock held)."""
+        import numpy as np
+        index = self._sessions.pop(session_id, None) or _SessionIndex()
+        self._sessions[session_id] = index
+        while len(self._sessions) > SESSIONS_CACHED:
+            self._sessions.popitem(last=False)
+        rows = self._db.execute(
+            "SELECT id, vector FROM directives WHERE session_id = ? AND id > ? ORDER BY id",
+            (session_id, index.last_id)
+        ).fetchall()
+        if rows:
+            ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+            vectors = np.frombuffer(b"".join(r[1] for r in rows), dtype=np.float16).reshape(len(rows), DIM)
+            index.extend(ids, vectors.astype(np.float32))
+        return index
+
+    def search(self, session_id, niche, goal, k=TOP_K, min_score=MIN_SCORE, pending=()):
+        """
+        Top-k past directives as dicts (niche, goal, directive, created_at, score), best first.
+        pending: directives not archived yet (dicts with niche, goal, directive,
+        created_at), ranked alongside the archive; they are the newest, so they win ties.
+        """
+        import numpy as np
+        query = embed((f"{niche} {goal}", 1.0))
+        if not query.any():
+            return []
+        hits = []
+        for entry in pending:
+            score = float(_directive_vector(entry["niche"], entry["goal"], entry["directive"]) @ query) + 2e-4
+            if score >= min_score:
+                hits.append({**entry, "score": score})
+        with self._lock:
+            self.counters["searches"] += 1
+            index = self._index(session_id)
+            picked = []
+            if index.size:
+                # A tiny recency bias: among equally relevant directives, the newest wins
+                scores = index.matrix[:index.size] @ query + np.linspace(0.0, 1e-4, index.size, dtype=np.float32)
+                top = np.argpartition(-scores, min(k, index.size) - 1)[:k]
+                top = top[np.argsort(-scores[top])]
+                picked = [(int(index.ids[i]), float(scores[i])) for i in top if scores[i] >= min_score]
+            rows = self._db.execute(
+                f"SELECT id, niche, goal, directive, created_at FROM directives "
+                f"WHERE id IN ({', '.join('?' * len(picked))})", [i for i, _ in picked]
+            ).fetchall() if picked else []
+        by_id = {r[0]: r for r in rows}
+        hits.extend(
+            {"niche": by_id[i][1], "goal": by_id[i][2], "directive": by_id[i][3],
+             "created_at": by_id[i][4], "score": score}
+            for i, score in picked if i in by_id
+        )
+        return sorted(hits, key=lambda hit: -hit["score"])[:k]
+
+    def context(self, session_id, niche, goal, k=TOP_K, max_tokens=HISTORY_TOKENS, pending=()):
+        """
+        The most relevant past directives (and `pending` ones, see `search`)
+        as one prompt block of at most `max_tokens` (~4 chars each); the last
+        one that fits is cut short. Empty when nothing relevant is archived.
+        """
+        budget = max_tokens * 4
+        blocks = []
+        for hit in self.search(session_id, niche, goal, k, pending=pending):
+            header = f"[{(hit['created_at'] or '')[:10]}] {hit['niche']} — goal: {hit['goal']} (relevance {hit['score']:.2f})\n"
+            room = budget - len(header) - sum(len(b) + 2 for b in blocks)
+            if room < 80:
+                break
+            body = hit["directive"].strip()
+            if len(body) > room:
+                body = body[:room - 1].rsplit(" ", 1)[0] + "…"
+            blocks.append(header + body)
+        return "\n\n".join(blocks)
+
+    def count(self, session_id):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM directives WHERE session_id = ?", (session_id,)).fetchone()[0]
+
+    def clear(self, session_id):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM directives WHERE session_id = ?", (session_id,))
+            self._sessions.pop(session_id, None)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["sessions_cached"] = len(self._sessions)
+            stats["directives"] = self._db.execute("SELECT COUNT(*) FROM directives").fetchone()[0]
+        return stats
+
+# --- SHARED INSTANCES ---
+_archives = {}
+_archives_lock = threading.Lock()
+
+def get_history(db_path):
+    """Process-wide archive per database file (every MemoryService on it shares the index)."""
+    with _archives_lock:
+        if db_path not in _archives:
+            _archives[db_path] = StrategyHistory(db_path)
+        return _archives[db_path]